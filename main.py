@@ -1,9 +1,11 @@
 import argparse
+import json
 import logging
 import os
 import sys
 
 from resource_pack_packer import dependencies
+from resource_pack_packer.benchmark.runner import BENCHMARK_SIZES, run_benchmark
 from resource_pack_packer.console import choose_from_list, parse_dir
 from resource_pack_packer.packer import Packer
 from resource_pack_packer.settings import MAIN_SETTINGS, folder_dialog
@@ -28,6 +30,17 @@ def main():
                             help="A path to the current work directory")
         parser.add_argument("--close", action="store_true",
                             help="Should the terminal close after running")
+        parser.add_argument("--trace", type=str, nargs=1, default=None, metavar="trace_file",
+                            help="Save the time spent on each stage as a Chrome trace")
+        parser.add_argument("--profile", type=str, nargs=1, default=None, metavar="profile_directory",
+                            help="Save a cProfile dump of each stage of each config in a folder")
+        parser.add_argument("--watch", action="store_true",
+                            help="Rebuild the pack whenever its files, patches or configs change")
+        parser.add_argument("--benchmark", type=str, nargs="?", default=None, const="small",
+                            choices=BENCHMARK_SIZES.keys(), metavar="size",
+                            help="Build a generated pack and time each stage. Sizes: small, medium, large")
+        parser.add_argument("--benchmark-output", type=str, nargs=1, default=None, metavar="file",
+                            help="Where the benchmark results are saved as json, instead of printing them")
         args = parser.parse_args()
 
         # Setup logging
@@ -46,6 +59,16 @@ def main():
                 "locations", "working_directory", parse_dir(args.workdir[0]))
             MAIN_SETTINGS.save()
             return
+        elif args.benchmark is not None:
+            results = run_benchmark(args.benchmark)
+
+            if args.benchmark_output is not None:
+                with open(parse_dir(args.benchmark_output[0]), "w", encoding="utf-8") as file:
+                    json.dump(results, file, indent=2)
+                logger.info(f"Saved benchmark results: {parse_dir(args.benchmark_output[0])}")
+            else:
+                print(json.dumps(results, indent=2))
+            return
         elif args.build or args.setup:
             pack = None
             run_option = None
@@ -59,7 +82,15 @@ def main():
                 config = args.config
 
             if args.build:
-                Packer().start(pack, run_option, config, args.close)
+                trace = None
+                profile = None
+
+                if args.trace is not None:
+                    trace = parse_dir(args.trace[0])
+                if args.profile is not None:
+                    profile = parse_dir(args.profile[0])
+
+                Packer().start(pack, run_option, config, args.close, trace, profile, args.watch)
             if args.setup:
                 dependencies.setup(pack, config)
 
@@ -0,0 +1,227 @@
+import json
+import os
+import random
+import struct
+import zlib
+
+BENCHMARK_PACK = "Benchmark Pack"
+BENCHMARK_CONFIG = "benchmark.json"
+FACES = ("north", "east", "south", "west", "up", "down")
+
+
+def _write_json(file: str, data):
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+
+    with open(file, "w", encoding="utf-8") as output:
+        json.dump(data, output, indent=2, ensure_ascii=False)
+
+
+def _write_bytes(file: str, data: bytes):
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+
+    with open(file, "wb") as output:
+        output.write(data)
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def generate_png(rng: random.Random, size: int = 16) -> bytes:
+    """
+    Creates a valid png of random pixels
+    :param rng: The random generator for the pixels
+    :param size: The width and height of the image
+    :return: The png file
+    """
+    # Every row starts with a filter byte
+    rows = b"".join(b"\x00" + rng.randbytes(size * 4) for _ in range(size))
+    header = struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0)
+
+    return b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", zlib.compress(rows)) + \
+        _png_chunk(b"IEND", b"")
+
+
+def _generate_elements(rng: random.Random, count: int) -> list:
+    elements = []
+
+    for _ in range(count):
+        start = [rng.randrange(0, 8) for _ in range(3)]
+        end = [s + rng.randrange(1, 9) for s in start]
+        faces = {}
+
+        for direction in FACES:
+            face = {"uv": [0, 0, 16, 16], "texture": "#all"}
+
+            if rng.random() < 0.5:
+                face["cullface"] = direction
+            faces[direction] = face
+
+        elements.append({"from": start, "to": end, "faces": faces})
+    return elements
+
+
+def _generate_namespace(assets_dir: str, namespace: str, models: int, rng: random.Random):
+    models_dir = os.path.join(assets_dir, namespace, "models")
+
+    _write_json(os.path.join(models_dir, "block", "base.json"), {
+        "textures": {"particle": "#all"},
+        "elements": _generate_elements(rng, 1)
+    })
+
+    lang = {}
+
+    for i in range(models):
+        block = f"block_{i}"
+
+        _write_json(os.path.join(models_dir, "block", f"{block}.json"), {
+            "parent": f"{namespace}:block/base",
+            "textures": {"all": f"{namespace}:block/{block}"},
+            "elements": _generate_elements(rng, rng.randrange(1, 6))
+        })
+        _write_json(os.path.join(models_dir, "item", f"{block}.json"), {"parent": f"{namespace}:block/{block}"})
+
+        if i % 2 == 0:
+            blockstate = {"variants": {"": {"model": f"{namespace}:block/{block}"}}}
+        else:
+            blockstate = {"multipart": [
+                {"apply": {"model": f"{namespace}:block/{block}"}},
+                {"when": {"north": "true"}, "apply": {"model": f"{namespace}:block/base"}}
+            ]}
+        _write_json(os.path.join(assets_dir, namespace, "blockstates", f"{block}.json"), blockstate)
+
+        _write_bytes(os.path.join(assets_dir, namespace, "textures", "block", f"{block}.png"), generate_png(rng))
+        _write_bytes(os.path.join(assets_dir, namespace, "textures", "item", f"item_{i}.png"), generate_png(rng))
+
+        # Preprocessor models
+        if i % 10 == 0:
+            _write_json(os.path.join(models_dir, "rpp", f"flipped_{i}.rpp.json"), {
+                "identifier": f"{namespace}:block/flipped_{i}",
+                "modify": {"model": f"{namespace}:block/{block}", "type": "flip", "arguments": {"x": True}}
+            })
+        elif i % 10 == 5:
+            _write_json(os.path.join(models_dir, "rpp", "mixed", f"mixed_{i}.rpp.json"), {
+                "identifier": f"{namespace}:block/mixed_{i}",
+                "mixin": {"models": [
+                    f"{namespace}:block/{block}",
+                    {"identifier": f"{namespace}:block/moved_{i}",
+                     "modify": {"model": f"{namespace}:block/base", "type": "translate", "arguments": {"y": 4}}}
+                ]}
+            })
+
+        lang[f"block.{namespace}.{block}"] = f"Block {i}"
+
+    _write_json(os.path.join(assets_dir, namespace, "lang", "en_us.json"), lang)
+    _write_json(os.path.join(assets_dir, namespace, "sounds.json"), {
+        "block.benchmark": {"sounds": [f"{namespace}:block/benchmark"]}
+    })
+    _write_bytes(os.path.join(assets_dir, namespace, "sounds", "block", "benchmark.ogg"), rng.randbytes(4096))
+
+
+def _generate_patches(patch_dir: str, namespaces: list[str], rng: random.Random):
+    namespace = namespaces[0]
+    replace_dir = os.path.join(patch_dir, "replace_files")
+
+    # Replace
+    _write_json(os.path.join(replace_dir, "assets", namespace, "models", "block", "block_0.json"), {
+        "parent": f"{namespace}:block/base",
+        "textures": {"all": f"{namespace}:block/replaced"},
+        "elements": _generate_elements(rng, 2)
+    })
+    _write_bytes(os.path.join(replace_dir, "assets", namespace, "textures", "block", "replaced.png"),
+                 generate_png(rng))
+    _write_json(os.path.join(patch_dir, "replace.json"), {"patches": [
+        {"type": "replace", "patch": {"directory": "#workdir/patches/replace_files"}}
+    ]})
+
+    # Remove
+    _write_json(os.path.join(patch_dir, "remove.json"), {"patches": [
+        {"type": "remove", "patch": {"file_selector": {
+            "type": "path", "arguments": {"path": f"assets/{namespace}/textures/item", "regex": "item_[0-9]\\.png"}
+        }}}
+    ]})
+
+    # Mixin
+    _write_json(os.path.join(patch_dir, "mixin.json"), {"patches": [{"type": "mixin_json", "patch": {"mixins": [
+        {
+            "file_selector": {"type": "union", "arguments": {"selectors": [
+                {"type": "block", "arguments": {"blocks": [{"block": "block_1"}, {"block": "block_2"}]}},
+                {"type": "identifier", "arguments": {"models": list(map(lambda n: f"{n}:block/block_3", namespaces))}}
+            ]}},
+            "selector": {"type": "path", "arguments": {"location": "textures"}},
+            "modifiers": [{"type": "set", "arguments": {"data": {"particle": "#all"}}}]
+        },
+        {
+            "file_selector": {"type": "blockstate", "arguments": {"blockstate": f"{namespace}:block_1"}},
+            "selector": {"type": "path", "arguments": {"location": "textures/particle"}},
+            "modifiers": [{"type": "replace", "arguments": {"select": "#all", "replacement": "#all"}}]
+        }
+    ]}}]})
+
+    # Modifier
+    _write_json(os.path.join(patch_dir, "margin.json"), {"patches": [{"type": "modifier", "patch": {
+        "type": "model_margin",
+        "arguments": {
+            "file_selector": {"type": "path", "arguments": {"path": f"assets/{namespace}/models/block",
+                                                            "regex": "block_[0-9]+\\.json"}},
+            "offset": 0.01,
+            "random_offset": 0.005,
+            "seed": 1
+        }
+    }}]})
+
+
+def generate_workspace(directory: str, namespaces: int, models: int, seed: int = 0) -> tuple[str, str]:
+    """
+    Creates a working directory and minecraft folder with a synthetic pack, patches of every type and a config
+    :param directory: The folder to create the workspace in
+    :param namespaces: The amount of namespaces in the pack
+    :param models: The amount of models, blockstates and textures in each namespace
+    :param seed: The seed that the content of the pack is generated from
+    :return: The working directory and the minecraft folder
+    """
+    rng = random.Random(seed)
+    working_directory = os.path.join(directory, "work")
+    minecraft_directory = os.path.join(directory, "minecraft")
+    pack_dir = os.path.join(minecraft_directory, "resourcepacks", BENCHMARK_PACK)
+
+    namespace_names = ["minecraft"] + list(map(lambda i: f"benchmark_{i}", range(1, namespaces)))
+
+    _write_json(os.path.join(pack_dir, "pack.mcmeta"), {"pack": {"pack_format": 9, "description": BENCHMARK_PACK}})
+    _write_bytes(os.path.join(pack_dir, "pack.png"), generate_png(rng, 64))
+
+    for namespace in namespace_names:
+        _generate_namespace(os.path.join(pack_dir, "assets"), namespace, models, rng)
+
+    _generate_patches(os.path.join(working_directory, "patches"), namespace_names, rng)
+
+    run_option = {
+        "configs": "*",
+        "minify_json": True,
+        "delete_empty_folders": True,
+        "zip_pack": True,
+        "version": "benchmark",
+        "validate": False,
+        "deterministic": True
+    }
+
+    _write_json(os.path.join(working_directory, "configs", BENCHMARK_CONFIG), {
+        "directory": f"#packdir/{BENCHMARK_PACK}",
+        "name_scheme": "#name v#version - #mcversion",
+        "description": BENCHMARK_PACK,
+        "selectors": {"block_files": ["assets/minecraft/models/block/[block_name].json"]},
+        "configs": {
+            "latest": {"mc_versions": ["1.19.2"], "minify_json": True, "delete_empty_folders": True,
+                       "patches": ["replace", "remove", "mixin", "margin"]},
+            "legacy": {"mc_versions": ["1.12.2"], "minify_json": True, "delete_empty_folders": True,
+                       "textures": {"delete": True, "ignore": ["block"]}, "patches": ["replace", "remove"]},
+            "plain": {"mc_versions": ["1.16.5"], "patches": ["replace", "remove", "mixin"]}
+        },
+        "run_options": {
+            "disk": {**run_option, "in_memory": False},
+            "memory": {**run_option, "in_memory": True},
+            "validate": {**run_option, "validate": True}
+        }
+    })
+
+    return working_directory, minecraft_directory
@@ -0,0 +1,90 @@
+import logging
+import os
+import platform
+import shutil
+import tempfile
+from typing import Iterable, Optional
+
+from resource_pack_packer.benchmark.generator import BENCHMARK_CONFIG, generate_workspace
+from resource_pack_packer.packer import Packer
+from resource_pack_packer.settings import MAIN_SETTINGS
+from resource_pack_packer.util.copy import walk_files
+
+# Changed whenever the layout of the results changes
+RESULTS_VERSION = 1
+
+# The amount of namespaces and models in each namespace
+BENCHMARK_SIZES = {
+    "small": (2, 50),
+    "medium": (4, 250),
+    "large": (8, 1000)
+}
+
+
+def run_benchmark(size: str = "small", run_options: Iterable[str] = ("disk", "memory", "validate"), repeat: int = 1,
+                  directory: Optional[str] = None) -> dict:
+    """
+    Builds a synthetic pack and records how long each stage takes
+    :param size: The name of the size of the pack
+    :param run_options: The run options to build the pack with
+    :param repeat: How many times each run option is built
+    :param directory: Where the pack is generated, a temporary folder is used if this is None
+    :return: The results, which can be saved as json
+    """
+    logger = logging.getLogger("BENCHMARK")
+    namespaces, models = BENCHMARK_SIZES[size]
+
+    if directory is None:
+        workspace = tempfile.mkdtemp(prefix="rpp_benchmark_")
+    else:
+        workspace = directory
+
+    logger.info(f"Generating {size} pack...")
+    working_directory, minecraft_directory = generate_workspace(workspace, namespaces, models)
+    pack_files = walk_files(os.path.join(minecraft_directory, "resourcepacks"))
+
+    # The settings are only changed while the benchmark is running
+    previous_locations = {
+        "working_directory": MAIN_SETTINGS.get_property("locations", "working_directory"),
+        "minecraft": MAIN_SETTINGS.get_property("locations", "minecraft")
+    }
+    MAIN_SETTINGS.set_property("locations", "working_directory", working_directory)
+    MAIN_SETTINGS.set_property("locations", "minecraft", minecraft_directory)
+
+    runs = []
+
+    try:
+        for run_option in run_options:
+            for i in range(repeat):
+                logger.info(f"Running {run_option} [{i + 1}/{repeat}]")
+                packer = Packer()
+                packer.start(BENCHMARK_CONFIG, run_option, None, True)
+
+                runs.append({
+                    "run_option": run_option,
+                    "repeat": i,
+                    "total": packer.total_time,
+                    "shared": packer.shared_time,
+                    "configs": packer.stage_times
+                })
+    finally:
+        for key, value in previous_locations.items():
+            MAIN_SETTINGS.set_property("locations", key, value)
+
+        if directory is None:
+            shutil.rmtree(workspace)
+
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pack": {
+            "size": size,
+            "namespaces": namespaces,
+            "models": models,
+            "files": len(pack_files),
+            "bytes": sum(map(lambda f: f[1], pack_files))
+        },
+        "runs": runs
+    }
@@ -10,6 +10,7 @@ from resource_pack_packer.console import choose_from_list
 from resource_pack_packer.patch import PatchFile
 from resource_pack_packer.settings import MAIN_SETTINGS
 from resource_pack_packer.settings import parse_keyword
+from resource_pack_packer.util.archive import STORED_EXTENSIONS
 
 
 def parse_name_scheme_keywords(scheme: str, name: str, version: str, mc_version: str):
@@ -206,7 +207,10 @@ class Config:
 
 class RunOptions:
     def __init__(self, name: str, configs: Union[List[str], str], minify_json: bool, delete_empty_folders: bool,
-                 zip_pack: bool, out_dir: str, version: Optional[str], rerun: bool, validate: bool):
+                 zip_pack: bool, out_dir: str, version: Optional[str], rerun: bool, validate: bool,
+                 incremental: bool = False, copy_mode: str = "copy", in_memory: bool = False,
+                 compression_level: Optional[int] = None, stored_extensions: Optional[List[str]] = None,
+                 deterministic: bool = False, config_workers: Optional[int] = None):
         self.name = name
         self.configs = configs
         self.minify_json = minify_json
@@ -216,6 +220,18 @@ class RunOptions:
         self.version = version
         self.rerun = rerun
         self.validate = validate
+        self.incremental = incremental
+        self.copy_mode = copy_mode
+        self.in_memory = in_memory
+        self.compression_level = compression_level
+
+        if stored_extensions is None:
+            self.stored_extensions = list(STORED_EXTENSIONS)
+        else:
+            self.stored_extensions = stored_extensions
+
+        self.deterministic = deterministic
+        self.config_workers = config_workers
 
     def get_configs(self, configs: List[Config], logger: logging.Logger,
                     config_override: Optional[List[int | str] | str] = None) -> Tuple[List[Config], List[int]]:
@@ -286,6 +302,42 @@ class RunOptions:
             else:
                 validate = False
 
+            if "incremental" in value:
+                incremental = value["incremental"]
+            else:
+                incremental = False
+
+            if "copy_mode" in value:
+                copy_mode = value["copy_mode"]
+            else:
+                copy_mode = "copy"
+
+            if "in_memory" in value:
+                in_memory = value["in_memory"]
+            else:
+                # Zipped packs are assembled straight from the source pack, without copying it to a temp folder
+                in_memory = value["zip_pack"] and not incremental
+
+            if "compression_level" in value:
+                compression_level = value["compression_level"]
+            else:
+                compression_level = None
+
+            if "stored_extensions" in value:
+                stored_extensions = value["stored_extensions"]
+            else:
+                stored_extensions = None
+
+            if "deterministic" in value:
+                deterministic = value["deterministic"]
+            else:
+                deterministic = False
+
+            if "config_workers" in value:
+                config_workers = value["config_workers"]
+            else:
+                config_workers = None
+
             run_options.append(RunOptions(
                 key,
                 value["configs"],
@@ -295,7 +347,14 @@ class RunOptions:
                 out_dir,
                 version,
                 rerun,
-                validate
+                validate,
+                incremental,
+                copy_mode,
+                in_memory,
+                compression_level,
+                stored_extensions,
+                deterministic,
+                config_workers
             ))
         return run_options
 
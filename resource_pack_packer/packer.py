@@ -1,40 +1,51 @@
-import json
 import logging
 import os
 import shutil
-import zipfile
 from glob import glob
-from multiprocessing import pool
-from threading import Thread
+from concurrent.futures import ProcessPoolExecutor
 from timeit import default_timer
-from typing import Optional
+from typing import Callable, Iterable, Optional
 
 from resource_pack_packer.configs import PackInfo, parse_name_scheme_keywords, Config, RunOptions
 from resource_pack_packer.console import choose_from_list, input_log
-from resource_pack_packer.preprocessor import RPPModel, Model
-from resource_pack_packer.selectors import parse_minecraft_identifier
+from resource_pack_packer.patch import PatchType
+from resource_pack_packer.planner import BuildPlan, get_config_workers, get_stage_workers
+from resource_pack_packer.preprocessor import PreprocessorGraph
 from resource_pack_packer.settings import MAIN_SETTINGS, parse_dir_keywords
+from resource_pack_packer.tree import PackTree, DiskTree, MemoryTree
+from resource_pack_packer.util.archive import STORED_EXTENSIONS, ZipStats, ZipWriter, get_fixed_date_time, \
+    write_checksum
 from resource_pack_packer.util.cache import update_cache, get_cache
+from resource_pack_packer.util.copy import CopyMode, copy_files, walk_files
+from resource_pack_packer.util.manifest import BuildManifest, hash_data, scan_files, update_scan
+from resource_pack_packer.util.minify import minify_files
+from resource_pack_packer.util.regex import REGEX_CACHE
+from resource_pack_packer.util.timing import StageTimer, save_trace
+from resource_pack_packer.util.watch import create_watcher
 from resource_pack_packer.validation import validate
 
 
-def zip_dir(src, dest):
-    if not os.path.exists(os.path.dirname(dest)):
-        os.makedirs(os.path.dirname(dest))
+# The stages that every config shares, set in each process of the pool
+_base: Optional[tuple[BuildPlan, PackTree]] = None
 
-    with zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for root, dirs, files in os.walk(src):
-            for file in files:
-                zip_file.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file), src))
 
+def _set_base(base: Optional[tuple[BuildPlan, PackTree]]):
+    global _base
+    _base = base
 
-def minify_json(directory):
-    if directory.endswith(".json"):
-        with open(directory, "r", encoding="utf8") as json_file:
-            data = json.load(json_file)
 
-        with open(directory, "w", encoding="utf8") as json_file:
-            json.dump(data, json_file, ensure_ascii=False, indent=None)
+def zip_dir(src, dest, compression_level: Optional[int] = None,
+            stored_extensions: Iterable[str] = STORED_EXTENSIONS, deterministic: bool = False) -> ZipStats:
+    if deterministic:
+        fixed_date_time = get_fixed_date_time()
+    else:
+        fixed_date_time = None
+
+    with ZipWriter(dest, compression_level, stored_extensions, fixed_date_time=fixed_date_time) as zip_writer:
+        for file, size in sorted(walk_files(src)):
+            zip_writer.add_file(os.path.join(src, file), file)
+
+    return zip_writer.stats
 
 
 class Packer:
@@ -58,6 +69,15 @@ class Packer:
         self.run_option: Optional[RunOptions] = None
         self.configs: Optional[list[Config]] = None
 
+        self.profile_dir: Optional[str] = None
+        # The paths that changed since the last build, if they're known
+        self.changed_files: Optional[set[str]] = None
+
+        # Seconds spent on each stage of each config in the last build
+        self.stage_times: dict[str, dict[str, float]] = {}
+        self.shared_time = 0.0
+        self.total_time = 0.0
+
         if self.PACK_OVERRIDE:
             self.pack = pack
             self.parent = parent
@@ -70,7 +90,25 @@ class Packer:
               pack_override: Optional[str] = None,
               run_option_override: Optional[int | str] = None,
               config_override: Optional[list[int | str]] = None,
-              close: Optional[bool] = None):
+              close: Optional[bool] = None,
+              trace: Optional[str] = None,
+              profile: Optional[str] = None,
+              watch: bool = False,
+              changed_files: Optional[set[str]] = None):
+        """
+        Builds a pack
+        :param pack_override: The name of the pack's config file, asks if None
+        :param run_option_override: The name or index of the run option, asks if None
+        :param config_override: The names or indexes of the configs
+        :param close: If the user shouldn't be asked to rerun the build
+        :param trace: Where a Chrome trace of every stage is saved
+        :param profile: The folder where a cProfile dump of every stage is saved
+        :param watch: If the pack is rebuilt whenever the pack, patches or configs change
+        :param changed_files: The absolute paths that changed since the last build, so incremental builds only scan
+            them. The whole pack is scanned if None.
+        """
+        self.profile_dir = profile
+        self.changed_files = changed_files
         # Pack info
         if pack_override is None:
             config_files = glob(
@@ -122,8 +160,14 @@ class Packer:
             self.cache_dir = os.path.join(parse_dir_keywords(self.run_option.out_dir),
                                           ".rpp", f"{os.path.basename(self.pack_dir).lower().replace(' ', '_')}.json")
 
+            # Packs that are built incrementally are reused
+            if self.run_option.incremental:
+                kept_packs = set(map(self._get_pack_name, self.configs))
+            else:
+                kept_packs = set()
+
             # Clear previous dev packs
-            for item in get_cache(self.cache_dir):
+            for item in get_cache(self.cache_dir) - kept_packs:
                 cache_pack_dir = os.path.join(parse_dir_keywords(self.run_option.out_dir), item)
 
                 if os.path.exists(cache_pack_dir):
@@ -134,159 +178,598 @@ class Packer:
 
         self.clear_out()
         start_time = default_timer()
+        self.stage_times = {}
+        self.shared_time = 0.0
+        # The processes a config can start for its own stages, the cpu count if only one config is built
+        self.stage_workers = None
+        timers = []
 
         if len(self.configs) > 1:
-            with pool.Pool(processes=os.cpu_count()) as p:
-                p.map(self._pack, self.configs)
+            shared_timer = StageTimer("shared", 0, self._get_profile_dir("shared"))
+            base = self._build_base(shared_timer)
+            self.shared_time = default_timer() - start_time
+            timers.append(shared_timer)
+
+            workers = get_config_workers(len(self.configs), not self.run_option.in_memory,
+                                         self.run_option.config_workers)
+
+            self.stage_workers = get_stage_workers(workers)
+
+            # Unlike a multiprocessing pool, these processes aren't daemonic, so configs can start their own pools
+            with ProcessPoolExecutor(max_workers=workers, initializer=_set_base, initargs=(base,)) as executor:
+                results = list(executor.map(self._pack, self.configs))
+
+            if base is not None and base[1].on_disk:
+                shutil.rmtree(base[1].root)
         else:
-            self._pack(self.configs[0])
+            results = [self._pack(self.configs[0])]
+
+        cached_packs = []
+        for config, (timer, cached) in zip(self.configs, results):
+            self.stage_times[config.name] = timer.stages
+            timers.append(timer)
+
+            if cached:
+                cached_packs.append(self._get_pack_name(config))
 
-        self.logger.info(f"Time: {default_timer() - start_time} Seconds")
+        # Configs are built in their own processes, so dev packs are only recorded once every config is built
+        if len(cached_packs) > 0:
+            update_cache(cached_packs, self.cache_dir)
 
+        self.total_time = default_timer() - start_time
+        self.logger.info(f"Time: {self.total_time} Seconds")
+
+        if trace is not None:
+            save_trace(trace, timers)
+            self.logger.info(f"Saved trace: {trace}")
+
+        # Watch
+        if watch:
+            self._watch(selected_pack_name, selected_run_option, config_override, trace, profile)
         # Rerun
-        if self.run_option.rerun and not close:
+        elif self.run_option.rerun and not close:
             completion_input = choose_from_list(["rerun", "back"], "Waiting for input...")[0]
             if completion_input == "rerun":
-                self.start(selected_pack_name, selected_run_option, config_override)
+                self.start(selected_pack_name, selected_run_option, config_override, trace=trace, profile=profile)
+
+    def _watch(self, pack_name: str, run_option: int | str, config_override: Optional[list[int | str]],
+               trace: Optional[str], profile: Optional[str]):
+        """
+        Rebuilds the pack every time its files, patches or configs change, until it's interrupted.
+        Incremental run options only rebuild the files that changed.
+        """
+        directories = [self.pack_dir, self.PATCH_DIR,
+                       os.path.join(MAIN_SETTINGS.get_property("locations", "working_directory"), "configs")]
+
+        with create_watcher(directories, self.logger) as watcher:
+            self.logger.info("Watching for changes...")
+            # Files changed during the first build weren't seen by the watcher, so the first rebuild scans everything
+            scanned = False
 
-    def _pack(self, config: Config):
-        pack_name = parse_name_scheme_keywords(self.pack_info.name_scheme, os.path.basename(self.pack_dir),
-                                               self.version,
-                                               config.mc_version)
+            try:
+                while True:
+                    changes = watcher.wait()
+                    self.logger.info(f"Changed {len(changes)} file(s), rebuilding...")
+
+                    # A file could be saved halfway through being edited, so a failed build doesn't stop watching
+                    try:
+                        self.start(pack_name, run_option, config_override, True, trace, profile,
+                                   changed_files=changes if scanned else None)
+                        scanned = True
+                    except Exception:
+                        self.logger.exception("Build failed")
+                        # The changes might not have been built, so the next rebuild scans everything again
+                        scanned = False
+                    self.logger.info("Watching for changes...")
+            except KeyboardInterrupt:
+                self.logger.info("Stopped watching")
+
+    def _get_pack_name(self, config: Config) -> str:
+        return parse_name_scheme_keywords(self.pack_info.name_scheme, os.path.basename(self.pack_dir), self.version,
+                                          config.mc_version)
+
+    def _get_profile_dir(self, name: str) -> Optional[str]:
+        if self.profile_dir is None:
+            return None
+        return os.path.join(self.profile_dir, name)
+
+    def _pack(self, config: Config) -> tuple[StageTimer, bool]:
+        """
+        Builds a single config
+        :param config: The config to build
+        :return: The time spent on each stage, and if the pack is a dev pack that's cleared by later builds
+        """
+        pack_name = self._get_pack_name(config)
         logger = logging.getLogger(f"{os.path.basename(self.pack_dir)}\x1b[0m/\x1b[34m{config.name}\x1b[0m")
+        config_index = list(map(lambda c: c.name, self.configs)).index(config.name)
+        timer = StageTimer(config.name, config_index + 1, self._get_profile_dir(config.name))
+        # Patterns stay compiled between builds, but only this build's savings are reported
+        REGEX_CACHE.reset_stats()
 
         temp_pack_dir = os.path.join(self.TEMP_DIR, pack_name)
+        manifest_dir = None
 
         # Overrides output
         if parse_dir_keywords(self.run_option.out_dir) != parse_dir_keywords(MAIN_SETTINGS.get_property("locations", "out")):
             temp_pack_dir = os.path.join(parse_dir_keywords(self.run_option.out_dir), pack_name)
+
+            # Incremental build
+            if self.run_option.incremental and not self.run_option.zip_pack:
+                with timer.stage("incremental"):
+                    manifest_dir = self._get_manifest_dir(config)
+                    manifest = BuildManifest.load(manifest_dir)
+                    inputs = self._get_inputs_hash(config)
+
+                    if manifest is not None and manifest.inputs == inputs:
+                        if self.changed_files is None:
+                            source_files = scan_files(self.pack_dir, manifest.files)
+                        else:
+                            source_files = update_scan(self.pack_dir, manifest.files, self.changed_files)
+
+                        # A build that fails halfway through updating the pack can't be reused
+                        os.remove(manifest_dir)
+                        updated = self._pack_incremental(config, temp_pack_dir, manifest, source_files, logger)
+                    else:
+                        source_files = scan_files(self.pack_dir)
+                        updated = False
+
+                    if updated:
+                        BuildManifest(inputs, source_files, list(manifest.touched)).save(manifest_dir)
+                    # Prevents a partial build from being reused
+                    elif os.path.exists(manifest_dir):
+                        os.remove(manifest_dir)
+
+                if updated:
+                    if self.run_option.validate:
+                        with timer.stage("validate"):
+                            logger.info(f"Validating...")
+                            # References are checked against every file, so the whole pack is indexed
+                            validate(DiskTree(temp_pack_dir), logger.name, self._get_cache_dir(config, "validation"),
+                                     config.mc_version, self._get_texture_filter(config), self.stage_workers)
+                    return timer, True
+
             self.clear_temp(temp_pack_dir)
 
         # Copy Files
-        logger.info("Copying...")
-        Packer._copy_pack(self.pack_dir, temp_pack_dir)
-
-        # Delete Textures
-        if config.delete_textures:
-            logger.info("Deleting textures...")
-            Packer.delete(temp_pack_dir, "textures", config.ignore_textures, logger)
+        # Deleted textures are skipped instead of being copied and then deleted
+        with timer.stage("copy") as span:
+            # Incremental builds need to know which files came from the source pack
+            if _base is not None and manifest_dir is None:
+                plan, base = _base
+
+                if config.delete_textures and not plan.textures:
+                    exclude = self._get_texture_filter(config)
+                    skipped_files = list(filter(exclude, base.files()))
+                    self._log_skipped_textures(list(map(lambda f: (f, base.get_size(f)), skipped_files)), logger,
+                                               span)
+                else:
+                    exclude = None
+
+                logger.info("Forking shared stages...")
+                tree = base.fork(temp_pack_dir, CopyMode(self.run_option.copy_mode), exclude)
+                span["files"] = len(tree.files())
+            else:
+                plan = None
+                tree = self._load_tree(temp_pack_dir, logger, span, self._get_texture_filter(config))
 
         # Generate Meta
-        with open(os.path.join(temp_pack_dir, "pack.mcmeta"), "w") as file:
-            meta = {
-                "pack": {
-                    "pack_format": config.pack_format,
-                    "description": self.pack_info.description
-                }
-            }
-            if config.minify_json and self.run_option.minify_json:
-                indent = None
-            else:
-                indent = 2
-            json.dump(meta, file, ensure_ascii=False, indent=indent)
+        self._write_meta(tree, config)
 
         # Patch
-        if len(config.patches) > 0:
-            logger.info(f"Applying patches...")
+        if plan is None:
+            patches = config.patches
+        else:
+            patches = plan.get_patches(config)
 
-            for patch in config.patches:
-                patch.run(temp_pack_dir, logger.name, self.pack_info, config)
+        if len(patches) > 0:
+            with timer.stage("patches", tree):
+                logger.info(f"Applying patches...")
 
-        # Preprocessors
-        rpp_models = glob(os.path.join(temp_pack_dir, "assets", "*", "models", "rpp", "**"), recursive=True)
+                for patch in patches:
+                    patch.run(tree, logger.name, self.pack_info, config, timer)
 
-        # Remove folders and non-json files
-        parsed_rpp_models = list(filter(lambda m: True if os.path.isfile(m) and m.endswith(".rpp.json") else None,
-                                        rpp_models))
-        if len(parsed_rpp_models):
-            logger.info("Running preprocessors...")
+        # Preprocessors
+        if plan is None or not plan.preprocess:
+            with timer.stage("preprocessors", tree):
+                self._run_preprocessors(tree, logger)
 
-            for i, model in enumerate(parsed_rpp_models, start=1):
-                processed_model, identifier = RPPModel.parse_file(model).process(temp_pack_dir)
-                Model.save(processed_model,
-                           os.path.join(temp_pack_dir, parse_minecraft_identifier(identifier, "models", "json")))
-                os.remove(model)
-                logger.info(f"Processed model [{i}/{len(parsed_rpp_models)}]")
+        # Files changed by stages can't be updated incrementally
+        if manifest_dir is not None:
+            touched = self._get_touched_files(config, source_files, tree)
 
         # Minify Json
         if config.minify_json and self.run_option.minify_json:
-            logger.info("Minifying json files...")
-            Packer.minify_json_files(temp_pack_dir)
+            with timer.stage("minify", tree) as span:
+                logger.info("Minifying json files...")
+                span["minified"] = minify_files(tree, tree.files(), logger, self._get_cache_dir(config, "minify"),
+                                                self.stage_workers)
+                logger.info(f"Minified {span['minified']} file(s)")
+
+        # Write every changed json file once
+        with timer.stage("flush", tree):
+            tree.flush()
+        logger.info(f"Json cache: {tree.json_stats}")
+        logger.info(f"Regex cache: {REGEX_CACHE}")
+        logger.info(f"Selector cache: {tree.changes}")
 
         # Delete Empty Folders
-        if config.delete_empty_folders:
-            directories = glob(os.path.join(temp_pack_dir, "**"), recursive=True)
+        if config.delete_empty_folders and self.run_option.delete_empty_folders:
+            with timer.stage("empty_folders", tree) as span:
+                # Found from the index, so the pack isn't walked again
+                span["folders"] = tree.remove_empty_folders()
+                logger.info(f"Deleted {span['folders']} empty folder(s)")
 
-            for directory in directories:
-                if os.path.isdir(directory) and os.path.exists(directory):
-                    if len(glob(os.path.join(directory, "**"), recursive=True)) == 1:
-                        os.remove(directory)
+        cached = False
 
         # Zip
         if self.run_option.zip_pack:
-            output = os.path.normpath(os.path.join(self.OUT_DIR, pack_name + ".zip"))
-            zip_dir(temp_pack_dir, output)
+            with timer.stage("zip") as span:
+                output = os.path.normpath(os.path.join(self.OUT_DIR, pack_name + ".zip"))
+                if tree.on_disk:
+                    zip_stats = zip_dir(temp_pack_dir, output, self.run_option.compression_level,
+                                        self.run_option.stored_extensions, self.run_option.deterministic)
+                else:
+                    zip_stats = tree.write_zip(output, self.run_option.compression_level,
+                                               self.run_option.stored_extensions, self.run_option.deterministic)
+                logger.info(f"Zipped {zip_stats}")
+
+                span["files"] = zip_stats.files
+                span["bytes"] = zip_stats.size
+                span["compressed_bytes"] = zip_stats.compressed_size
+
+                if self.run_option.deterministic:
+                    logger.info(f"Pack hash: {write_checksum(output)}")
             logger.info(f"Completed pack: {output}")
-        elif self.run_option.out_dir == "#packdir":
+        else:
+            if not tree.on_disk:
+                with timer.stage("save", tree):
+                    tree.save(CopyMode(self.run_option.copy_mode))
+
+            cached = self.run_option.out_dir == "#packdir"
 
-            update_cache(pack_name, self.cache_dir)
+        if manifest_dir is not None:
+            BuildManifest(inputs, source_files, touched).save(manifest_dir)
 
         if self.run_option.validate:
-            logger.info(f"Validating...")
-            validate(temp_pack_dir, logger.name)
+            with timer.stage("validate", tree):
+                logger.info(f"Validating...")
+                validate(tree, logger.name, self._get_cache_dir(config, "validation"), config.mc_version,
+                         self._get_texture_filter(config), self.stage_workers)
+
+        return timer, cached
+
+    def _load_tree(self, directory: str, logger: logging.Logger, span: dict,
+                   exclude: Optional[Callable[[str], bool]] = None) -> PackTree:
+        """
+        Copies or loads the source pack
+        :param directory: Where the pack is built
+        :param logger: The config's logger
+        :param span: The info of the copy stage
+        :param exclude: Files that it returns True for are skipped
+        :return: The pack
+        """
+        files = walk_files(self.pack_dir)
+
+        if exclude is not None:
+            self._log_skipped_textures(list(filter(lambda f: exclude(f[0]), files)), logger, span)
+            files = list(filter(lambda f: not exclude(f[0]), files))
+
+        span["files"] = len(files)
+        span["bytes"] = sum(map(lambda f: f[1], files))
+
+        if self.run_option.in_memory:
+            logger.info("Loading...")
+            return MemoryTree.load(self.pack_dir, directory, files)
+        else:
+            logger.info("Copying...")
+            copy_stats = copy_files(self.pack_dir, directory, files, CopyMode(self.run_option.copy_mode))
+            logger.info(f"Copied {copy_stats}")
+            return DiskTree(directory, map(lambda f: f[0], files))
+
+    def _write_meta(self, tree: PackTree, config: Config):
+        meta = {
+            "pack": {
+                "pack_format": config.pack_format,
+                "description": self.pack_info.description
+            }
+        }
+        if config.minify_json and self.run_option.minify_json:
+            indent = None
+        else:
+            indent = 2
+        tree.write_json("pack.mcmeta", meta, indent=indent, ensure_ascii=False)
 
     @staticmethod
-    def _copy_pack(src: str, dest: str):
-        files = glob(os.path.join(src, "**"), recursive=True)
-
-        copy_threads = []
+    def _find_rpp_models(tree: PackTree) -> list[str]:
+        rpp_models = tree.glob(os.path.join("assets", "*", "models", "rpp", "**"), recursive=True)
 
-        for file in files:
-            if os.path.isfile(file):
-                thread = Thread(target=Packer._copy_file, args=[src, dest, file])
-                copy_threads.append(thread)
-                thread.start()
+        # Remove folders and non-json files
+        return list(filter(lambda m: True if tree.isfile(m) and m.endswith(".rpp.json") else None, rpp_models))
 
-        for thread in copy_threads:
-            thread.join()
+    @staticmethod
+    def _is_rpp_model(file: str) -> bool:
+        parts = os.path.normpath(file).split(os.sep)
+        return len(parts) > 4 and parts[0] == "assets" and parts[2] == "models" and parts[3] == "rpp" and \
+            file.endswith(".rpp.json")
 
     @staticmethod
-    def _copy_file(src, dest, file):
-        file_dest = file.replace(src, dest)
+    def _run_preprocessors(tree: PackTree, logger: logging.Logger):
+        parsed_rpp_models = Packer._find_rpp_models(tree)
+        if len(parsed_rpp_models):
+            logger.info("Running preprocessors...")
+            PreprocessorGraph(tree, parsed_rpp_models).run(logger)
 
-        try:
-            shutil.copy(file, file_dest)
-        except IOError:
-            try:
-                os.makedirs(os.path.dirname(file_dest))
-            except FileExistsError:
-                pass
-            shutil.copy(file, file_dest)
+    def _build_base(self, timer: StageTimer) -> Optional[tuple[BuildPlan, PackTree]]:
+        """
+        Runs the stages that every config shares once, so that each config can start from a copy of them
+        :param timer: Records the time spent on each shared stage
+        :return: The plan and the shared pack, or None if nothing is shared
+        """
+        # Incremental builds only redo the files that changed
+        if self.run_option.incremental:
+            return None
 
-    @staticmethod
-    def delete(directory, folder, ignore, logger: logging.Logger):
-        namespaces = glob(os.path.join(directory, "assets", "*"))
+        plan = BuildPlan.create(self.configs)
+
+        # Preprocessors are only worth sharing if there are any
+        if plan.preprocess and len(glob(os.path.join(self.pack_dir, "assets", "*", "models", "rpp"))) == 0:
+            plan.preprocess = False
+
+        if not plan.shares_work():
+            return None
+
+        logger = logging.getLogger(f"{os.path.basename(self.pack_dir)}\x1b[0m/\x1b[34mshared\x1b[0m")
+        logger.info(f"Shared stages: {plan}")
+
+        base_dir = os.path.join(self.TEMP_DIR, ".shared")
+        self.clear_temp(base_dir)
+
+        with timer.stage("copy") as span:
+            if plan.textures:
+                tree = self._load_tree(base_dir, logger, span, self._get_texture_filter(plan.config))
+            else:
+                tree = self._load_tree(base_dir, logger, span)
+
+        # Patches see the meta of the first config
+        self._write_meta(tree, plan.config)
+        meta = tree.read_bytes("pack.mcmeta")
+
+        if len(plan.patches) > 0:
+            with timer.stage("patches", tree):
+                logger.info(f"Applying patches...")
+
+                for patch in plan.patches:
+                    patch.run(tree, logger.name, self.pack_info, plan.config, timer)
 
-        for i, namespace in enumerate(namespaces, start=1):
-            if os.path.exists(os.path.join(namespace, folder)):
-                folders = glob(os.path.join(namespace, folder, "*"))
+        # Each config has its own meta, so it can't be changed by a shared patch
+        if tree.read_bytes("pack.mcmeta") != meta:
+            logger.warning("Patches change pack.mcmeta, configs will be built separately")
+            self.clear_temp(base_dir)
+            return None
 
-                for fold in folders:
-                    delete_files = True
-                    for ig in ignore:
-                        if os.path.basename(fold) == ig.lower():
-                            delete_files = False
+        if plan.preprocess:
+            with timer.stage("preprocessors", tree):
+                self._run_preprocessors(tree, logger)
 
-                    if delete_files:
-                        shutil.rmtree(fold)
-                logger.info(f"Deleted texture [{i}/{len(namespaces)}]: {os.path.basename(namespace)}")
+        with timer.stage("flush", tree):
+            tree.flush()
+        return plan, tree
+
+    def _get_manifest_dir(self, config: Config) -> str:
+        return os.path.join(parse_dir_keywords(self.run_option.out_dir), ".rpp", "manifests",
+                            os.path.basename(self.pack_dir).lower().replace(" ", "_"), f"{config.name}.json")
+
+    def _get_cache_dir(self, config: Config, stage: str) -> Optional[str]:
+        # Only dev builds are rebuilt often enough to be worth caching
+        if parse_dir_keywords(self.run_option.out_dir) == parse_dir_keywords(MAIN_SETTINGS.get_property("locations", "out")):
+            return None
+
+        return os.path.join(parse_dir_keywords(self.run_option.out_dir), ".rpp", stage,
+                            os.path.basename(self.pack_dir).lower().replace(" ", "_"), f"{config.name}.json")
+
+    def _get_inputs_hash(self, config: Config) -> str:
+        """
+        Hashes everything besides the source pack that a config's build depends on
+        :param config: The config being built
+        :return: The hash of the inputs
+        """
+        patches = []
+
+        for patch_file in config.patches:
+            for patch in patch_file.patches:
+                patch_data = {"type": patch.type, "patch": patch.patch}
+
+                # Files copied by replace patches
+                if patch.type == PatchType.REPLACE.value:
+                    patch_data["files"] = scan_files(parse_dir_keywords(patch.patch["directory"]))
+
+                patches.append(patch_data)
+
+        return hash_data({
+            "version": self.version,
+            "description": self.pack_info.description,
+            "block_files": self.pack_info.block_files,
+            "pack_format": config.pack_format,
+            "delete_textures": config.delete_textures,
+            "ignore_textures": config.ignore_textures,
+            "delete_empty_folders": config.delete_empty_folders,
+            "minify_json": config.minify_json and self.run_option.minify_json,
+            "patches": patches
+        })
 
     @staticmethod
-    def minify_json_files(temp_pack_dir):
-        files = glob(os.path.join(temp_pack_dir, "**"), recursive=True)
+    def _log_skipped_textures(files: list[tuple[str, int]], logger: logging.Logger, span: dict):
+        span["skipped_files"] = len(files)
+        span["skipped_bytes"] = sum(map(lambda f: f[1], files))
+        logger.info(f"Skipped {span['skipped_files']} deleted texture(s) ({span['skipped_bytes'] / 1048576:.1f} MiB)")
+
+    def _get_texture_filter(self, config: Config) -> Optional[Callable[[str], bool]]:
+        """
+        :param config: The config being built
+        :return: A function that checks if a file is removed by texture deletion, or None if no textures are deleted
+        """
+        if not config.delete_textures:
+            return None
+        return lambda f: self._is_deleted_texture(f, config)
+
+    @staticmethod
+    def _is_deleted_texture(file: str, config: Config) -> bool:
+        """
+        Checks if a file is removed by texture deletion
+        :param file: The path of the file relative to the pack
+        :param config: The config being built
+        :return: True if the file won't be in the built pack
+        """
+        if not config.delete_textures:
+            return False
+
+        parts = os.path.normpath(file).split(os.sep)
+        ignored = set(map(lambda ig: ig.lower(), config.ignore_textures))
+        # Hidden folders aren't deleted
+        return len(parts) > 4 and parts[0] == "assets" and parts[2] == "textures" and parts[3] not in ignored and \
+            not parts[1].startswith(".") and not parts[3].startswith(".")
+
+    def _get_touched_files(self, config: Config, source_files: dict, tree: PackTree) -> list[str]:
+        """
+        Finds every file that was added, removed or changed by a stage after being copied
+        :param config: The config being built
+        :param source_files: The scan of the source pack
+        :param tree: The built pack
+        :return: The relative paths of the touched files
+        """
+        touched = []
+        output_files = tree.files()
+
+        for file in output_files:
+            if file not in source_files:
+                touched.append(file)
+            elif not tree.is_unmodified(file) and source_files[file]["hash"] != tree.hash_file(file):
+                touched.append(file)
+
+        for file in source_files.keys() - set(output_files):
+            if not self._is_deleted_texture(file, config):
+                touched.append(file)
+
+        return touched
+
+    def _pack_incremental(self, config: Config, temp_pack_dir: str, manifest: BuildManifest, source_files: dict,
+                          logger: logging.Logger) -> bool:
+        """
+        Updates a previous build in place. Files that patches or preprocessors use only rerun the patches that
+        select them and the preprocessor models that read them.
+        If the previous build can't be updated it's left as it is, since a full build clears it.
+        :param config: The config being built
+        :param temp_pack_dir: The previous build
+        :param manifest: The manifest of the previous build, whose touched files are updated
+        :param source_files: The new scan of the source pack
+        :param logger: The config's logger
+        :return: True if the previous build was updated, False if a full build is required
+        """
+        if not os.path.isdir(temp_pack_dir):
+            return False
+
+        changed, added, removed = manifest.diff(source_files)
+
+        if len(changed) + len(added) + len(removed) == 0:
+            logger.info("Up to date")
+            return True
+
+        has_patches = len(config.patches) > 0
+        rpp_models = list(filter(self._is_rpp_model, source_files))
+        # Only json files are read by preprocessors
+        reads_changed = len(rpp_models) > 0 and any(map(lambda f: f.endswith(".json"), changed | added | removed))
+
+        # File selectors might select different files
+        if has_patches and len(added) + len(removed) > 0:
+            return False
+        # The files a changed preprocessor model wrote before aren't known
+        if any(map(self._is_rpp_model, changed | added | removed)):
+            return False
+
+        updated_files = list(filter(lambda f: not self._is_deleted_texture(f, config), changed | added))
+        patched = set()
+
+        if has_patches:
+            # Selectors look through the whole pack. Only changed files are copied, so the index stays the same.
+            tree = DiskTree(temp_pack_dir)
+            selected, read = set(), set()
+            for patch in config.patches:
+                patch_selected, patch_read = patch.get_files(tree, logger.name, self.pack_info)
+                selected |= patch_selected
+                read |= patch_read
+
+            for file in changed:
+                # The file decides which files are changed
+                if file in read:
+                    return False
+                # The file was changed by a stage that isn't a patch, or was removed
+                if file in manifest.touched and (file not in selected or not tree.isfile(file)):
+                    return False
+
+            # Preprocessor models added by patches aren't in the source pack
+            if reads_changed and any(map(self._is_rpp_model, selected)):
+                return False
+            patched = set(updated_files) & selected
+        elif any(map(lambda f: f in manifest.touched, changed | added | removed)):
+            return False
+
+        copy_files(self.pack_dir, temp_pack_dir, map(lambda f: (f, source_files[f]["size"]), updated_files),
+                   CopyMode(self.run_option.copy_mode))
+
+        for file in removed:
+            if os.path.isfile(os.path.join(temp_pack_dir, file)):
+                os.remove(os.path.join(temp_pack_dir, file))
+
+        if not has_patches:
+            # Preprocessors look through the whole pack, otherwise the rest of the pack isn't walked
+            if reads_changed:
+                tree = DiskTree(temp_pack_dir)
+            else:
+                tree = DiskTree(temp_pack_dir, updated_files)
+
+        if len(patched) > 0:
+            logger.info(f"Patching {len(patched)} file(s)...")
+            for patch in config.patches:
+                patch.run(tree, logger.name, self.pack_info, config, files=patched)
+
+            # Patches that change a file again can still rerun, so the file is only marked as touched
+            for file in patched:
+                if not tree.isfile(file) or tree.hash_file(file) != source_files[file]["hash"]:
+                    manifest.touched.add(file)
+
+        # Models that preprocessors wrote are minified again
+        written_files = []
+        if reads_changed:
+            # Preprocessor models are removed once they're run, so they're added again to find what they read
+            for file in rpp_models:
+                tree.copy_file(os.path.join(self.pack_dir, file), file)
+
+            rpp_files = self._find_rpp_models(tree)
+            graph = PreprocessorGraph(tree, rpp_files)
+            affected = graph.get_affected(set(changed | added | removed))
+
+            if affected is None:
+                return False
+            if len(affected) > 0:
+                logger.info(f"Running {len(affected)} preprocessor(s)...")
+                graph.run(logger, self.stage_workers, affected)
+                written_files = list(map(lambda i: graph.outputs[i], affected))
+
+            for file in rpp_files:
+                if tree.isfile(file):
+                    tree.remove(file)
+
+            # The folders of the preprocessor models are left empty again, which packs built in memory never have
+            if self.run_option.in_memory or (config.delete_empty_folders and self.run_option.delete_empty_folders):
+                tree.remove_empty_folders()
+
+        if config.minify_json and self.run_option.minify_json:
+            minify_files(tree, list(set(updated_files) | set(written_files)), logger, workers=self.stage_workers)
+        tree.flush()
 
-        for file in files:
-            minify_json(file)
+        logger.info(f"Updated {len(updated_files)} file(s), ran {len(written_files)} preprocessor(s) "
+                    f"and removed {len(removed)} file(s)")
+        return True
 
     def clear_temp(self, directory=None):
         """Clears the temp folder"""
@@ -2,16 +2,18 @@ import json
 import logging
 import os
 import random
-import re
-import shutil
 from enum import Enum
 from glob import glob
 from os import path
 
-from typing import List, Union, Tuple
+from typing import List, Union, Optional
 
-from resource_pack_packer.selectors import FileSelector, Direction
+from resource_pack_packer.selectors import FileSelector
 from resource_pack_packer.settings import parse_dir_keywords
+from resource_pack_packer.tree import PackTree
+from resource_pack_packer.util.geometry import add_margins
+from resource_pack_packer.util.json_path import JsonPath
+from resource_pack_packer.util.timing import StageTimer
 
 
 def check_option(root, option):
@@ -36,32 +38,88 @@ class Patch:
         self.pack_info = None
         self.config = None
 
-    def run(self, pack: str, logger: logging.Logger, pack_info, config):
+    def run(self, pack: PackTree, logger: logging.Logger, pack_info, config, files: Optional[set[str]] = None):
+        """
+        :param files: The relative paths of the only files that are changed, every selected file if None
+        """
         self.pack_info = pack_info
         self.config = config
         match self.type:
             case PatchType.REPLACE.value:
-                _patch_replace(pack, self, logger)
+                _patch_replace(pack, self, logger, files)
             case PatchType.REMOVE.value:
-                _patch_remove(pack, pack_info, self, logger)
+                _patch_remove(pack, pack_info, self, logger, files)
             case PatchType.MIXIN_JSON.value:
-                _patch_mixin_json(pack, pack_info, self, logger)
+                _patch_mixin_json(pack, pack_info, self, logger, files)
             case PatchType.MODIFIER.value:
-                _patch_modifier(pack, pack_info, self, logger)
+                _patch_modifier(pack, pack_info, self, logger, files)
             case _:
                 logger.error(f"Incorrect patch type: {self.type}")
 
+    def get_files(self, pack: PackTree, pack_info, logger: logging.Logger) -> tuple[set[str], set[str]]:
+        """
+        Finds the files that the patch changes, without changing them
+        :param pack: The pack
+        :param pack_info: The pack's info
+        :param logger: Where selector errors are logged
+        :return: The relative paths of the files that are changed, and of the files that are read to choose them
+        """
+        match self.type:
+            case PatchType.REPLACE.value:
+                return set(map(lambda f: pack.relpath(f[1]), _get_replaced_files(pack, self))), set()
+            case PatchType.REMOVE.value:
+                return _get_selector_files(FileSelector.parse(self.patch["file_selector"], pack), pack_info, logger)
+            case PatchType.MIXIN_JSON.value:
+                selected, read = set(), set()
+
+                for data in self.patch["mixins"]:
+                    mixin_selected, mixin_read = _get_selector_files(FileSelector.parse(data["file_selector"], pack),
+                                                                     pack_info, logger)
+                    selected |= mixin_selected
+                    read |= mixin_read
+                return selected, read
+            case PatchType.MODIFIER.value:
+                if self.patch["type"] == ModifierType.MODEL_MARGIN.value:
+                    selected, read = _get_selector_files(
+                        FileSelector.parse(self.patch["arguments"]["file_selector"], pack), pack_info, logger)
+                    # The offsets of a model depend on every model selected before it
+                    return selected, read | selected
+        return set(), set()
+
 
 class PatchFile:
     def __init__(self, patches: List[Patch], name: str):
         self.patches = patches
         self.name = name
 
-    def run(self, pack: str, logger_name: str, pack_info, config):
-        for i, patch in enumerate(self.patches, start=1):
-            logger = logging.getLogger(f"{logger_name}\x1b[0m/\x1b[34m{self.name}\x1b[0m")
-            patch.run(pack, logger, pack_info, config)
-            logger.info(f"Completed patch [{i}/{len(self.patches)}]")
+    def run(self, pack: PackTree, logger_name: str, pack_info, config, timer: Optional[StageTimer] = None,
+            files: Optional[set[str]] = None):
+        """
+        :param files: The relative paths of the only files that are changed, every selected file if None
+        """
+        if timer is None:
+            timer = StageTimer()
+
+        with timer.stage(self.name, pack, patch_file=self.name):
+            for i, patch in enumerate(self.patches, start=1):
+                logger = logging.getLogger(f"{logger_name}\x1b[0m/\x1b[34m{self.name}\x1b[0m")
+
+                with timer.stage(f"{self.name} [{i}/{len(self.patches)}]", pack, type=patch.type):
+                    patch.run(pack, logger, pack_info, config, files)
+                logger.info(f"Completed patch [{i}/{len(self.patches)}]")
+
+    def get_files(self, pack: PackTree, logger_name: str, pack_info) -> tuple[set[str], set[str]]:
+        """
+        :return: The relative paths of the files that the patches change, and of the files read to choose them
+        """
+        logger = logging.getLogger(f"{logger_name}\x1b[0m/\x1b[34m{self.name}\x1b[0m")
+        selected, read = set(), set()
+
+        for patch in self.patches:
+            patch_selected, patch_read = patch.get_files(pack, pack_info, logger)
+            selected |= patch_selected
+            read |= patch_read
+        return selected, read
 
     @staticmethod
     def parse_file(directory: str, name: str, logger: logging.Logger):
@@ -79,128 +137,71 @@ class PatchFile:
             logger.error(f"Patch can't be found: {directory}")
 
 
-# Replaces and adds files accordingly
-def _patch_replace(pack, patch, logger: logging.Logger):
+def _get_selector_files(selector: FileSelector, pack_info, logger: logging.Logger) -> tuple[set[str], set[str]]:
+    files = selector.run(pack_info, logger)
+    if files is None:
+        files = []
+    return set(map(selector.pack.relpath, files)), set(map(selector.pack.relpath, selector.get_read_files()))
+
+
+def _get_replaced_files(pack: PackTree, patch) -> list[tuple[str, str]]:
+    """
+    :return: Every file and folder in the patch's directory, with the location in the pack that it goes to
+    """
     patch_dir = parse_dir_keywords(patch.patch["directory"])
     patch_files = glob(path.join(patch_dir, "**"), recursive=True)
+    return list(map(lambda f: (f, f.replace(patch_dir, pack.root)), patch_files))
 
-    for file in patch_files:
-        # The location that the file should go to
-        pack_file = file.replace(patch_dir, pack)
+
+# Replaces and adds files accordingly
+def _patch_replace(pack: PackTree, patch, logger: logging.Logger, files: Optional[set[str]] = None):
+    for file, pack_file in _get_replaced_files(pack, patch):
+        if files is not None and pack.relpath(pack_file) not in files:
+            continue
 
         # Removes all files in pack that are in the patch.py
-        if path.isfile(pack_file) and path.exists(pack_file):
-            os.remove(pack_file)
+        if pack.isfile(pack_file):
+            pack.remove(pack_file)
 
         # Applies patch.py
         if path.isfile(file) and path.exists(file):
-            try:
-                shutil.copy(file, pack_file)
-            except IOError:
-                os.makedirs(path.dirname(pack_file))
-                shutil.copy(file, pack_file)
+            pack.copy_file(file, pack_file)
 
 
-def _remove_block(file):
-    if path.exists(file):
-        os.remove(file)
+def _remove_block(pack: PackTree, file):
+    if pack.exists(file):
+        pack.remove(file)
 
 
 # Removes all specified files
-def _patch_remove(pack, pack_info, patch, logger: logging.Logger):
+def _patch_remove(pack: PackTree, pack_info, patch, logger: logging.Logger, files: Optional[set[str]] = None):
     selector = FileSelector(patch.patch["file_selector"]["type"], patch.patch["file_selector"]["arguments"], pack)
-    files = selector.run(pack_info, logger)
+    selected_files = selector.run(pack_info, logger)
 
     filtered_files = []
-    for file in files:
-        if os.path.exists(file):
+    for file in selected_files:
+        if pack.exists(file) and (files is None or pack.relpath(file) in files):
             filtered_files.append(file)
 
     for i, file in enumerate(filtered_files, start=1):
         # Removes file
-        if path.isfile(file):
-            os.remove(file)
+        if pack.isfile(file):
+            pack.remove(file)
             logger.info(f"Removed file [{i}/{len(filtered_files)}]: {file}")
         # Removes folder
         else:
-            shutil.rmtree(file)
+            pack.rmtree(file)
             logger.info(f"Removed folder [{i}/{len(filtered_files)}]: {file}")
 
 
-def _get_json_file(file_dir: str) -> dict:
-    if path.isfile(file_dir) and path.exists(file_dir):
-        with open(file_dir, "r") as file:
-            return json.load(file)
-
-
-def _set_json_file(file_dir: str, data: dict):
-    if path.isfile(file_dir) and path.exists(file_dir):
-        with open(file_dir, "w", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False, indent="\t")
-
+def _get_json_file(pack: PackTree, file_dir: str) -> dict:
+    if pack.isfile(file_dir):
+        return pack.read_json(file_dir)
 
-def _set_json(root: Union[list, dict], location: list, data, merge: bool, add: bool) -> dict:
-    if len(location) > 1:
-        if location[0] == "*":
-            if isinstance(root, dict):
-                for key in root.keys():
-                    root[key] = _set_json(root[key], location[1:], data, merge, add)
-            elif isinstance(root, list):
-                for i in range(len(root)):
-                    root[i] = _set_json(root[i], location[1:], data, merge, add)
-        else:
-            if location[0] in root:
-                root[location[0]] = _set_json(root[location[0]], location[1:], data, merge, add)
-            elif add:
-                # If the location does not exist, then it won't attempt a merge (faster).
-                new_json = data
 
-                location.reverse()
-
-                for key in location:
-                    new_json = {key: new_json}
-
-                root |= new_json
-    else:
-        if location[0] == "*":
-            if isinstance(root, dict):
-                for key in root.keys():
-                    root[key] = data
-            elif isinstance(root, list):
-                for i in range(len(root)):
-                    root[i] = data
-        else:
-            if merge and isinstance(data, dict) and isinstance(root[location[0]], dict):
-                root[location[0]] |= data
-            else:
-                root[location[0]] = data
-    return root
-
-
-def _replace_json(root: Union[list, dict], location: list, select: str, replacement: str) -> dict:
-    if len(location) > 1:
-        if location[0] == "*":
-            if isinstance(root, dict):
-                for key in root.keys():
-                    root[key] = _replace_json(root[key], location[1:], select, replacement)
-            elif isinstance(root, list):
-                for i in range(len(root)):
-                    root[i] = _replace_json(root[i], location[1:], select, replacement)
-        else:
-            # Checks if the key exits
-            if location[0] in root:
-                root[location[0]] = _replace_json(root[location[0]], location[1:], select, replacement)
-    else:
-        if location[0] == "*":
-            if isinstance(root, dict):
-                for key, value in root.items():
-                    root[key] = re.sub(select, replacement, value)
-            elif isinstance(root, list):
-                for value, i in iter(root):
-                    root[i] = re.sub(select, replacement, value)
-        elif isinstance(root, dict):
-            root[location[0]] = re.sub(select, replacement, root[location[0]])
-    return root
+def _set_json_file(pack: PackTree, file_dir: str, data: dict):
+    if pack.isfile(file_dir):
+        pack.write_json(file_dir, data, indent="\t", ensure_ascii=False)
 
 
 def _check_json_node(root: dict, location: list) -> bool:
@@ -230,10 +231,15 @@ class MixinSelector:
         self.selector_type = selector_type
         self.arguments = arguments
 
-    def run(self, json_data, logger: logging.Logger) -> Union[list, None]:
+        # Paths are only parsed once, no matter how many files they're used on
         if self.selector_type == MixinSelectorType.PATH.value:
-            location = str(self.arguments["location"]).split("/")
-            return location
+            self.path = JsonPath(str(self.arguments["location"]))
+        else:
+            self.path = None
+
+    def run(self, json_data, logger: logging.Logger) -> Union[JsonPath, None]:
+        if self.path is not None:
+            return self.path
         else:
             logger.error(f"Incorrect selector type: {self.selector_type}")
 
@@ -252,9 +258,17 @@ class MixinModifier:
         self.modifier_type = modifier_type
         self.arguments = arguments
 
-    def run(self, file_directory: str, file: dict, json_directory: list, logger: logging.Logger):
-        modified_file = file
-
+    def run(self, pack: PackTree, file_directory: str, file: dict, json_directory: JsonPath, logger: logging.Logger):
+        _set_json_file(pack, file_directory, self.apply(file, json_directory, logger))
+
+    def apply(self, file: dict, json_directory: JsonPath, logger: logging.Logger) -> dict:
+        """
+        Changes a json file in memory
+        :param file: The parsed json file
+        :param json_directory: The location in the file that's changed
+        :param logger: Where errors are logged
+        :return: The changed json file
+        """
         match self.modifier_type:
             case MixinModifierType.SET.value:
                 merge = False
@@ -263,15 +277,15 @@ class MixinModifier:
 
                 add = True
                 if "add" in self.arguments:
-                    merge = self.arguments["add"]
+                    add = self.arguments["add"]
 
-                modified_file = _set_json(file, json_directory, self.arguments["data"], merge, add)
+                json_directory.set(file, self.arguments["data"], merge, add)
             case MixinModifierType.REPLACE.value:
-                modified_file = _replace_json(file, json_directory, self.arguments["select"], self.arguments["replacement"])
+                json_directory.replace(file, self.arguments["select"], self.arguments["replacement"])
             case _:
                 logger.error(f"Incorrect modifier type: {self.modifier_type}")
 
-        _set_json_file(file_directory, modified_file)
+        return file
 
     @staticmethod
     def parse(data: list):
@@ -280,17 +294,32 @@ class MixinModifier:
 
 class Mixin:
     def __init__(self, file_selector: FileSelector, selector: MixinSelector, modifiers: List[MixinModifier],
-                 pack: str):
+                 pack: PackTree):
         self.file_selector = file_selector
         self.selector = selector
         self.modifiers = modifiers
         self.pack = pack
 
     def run(self, pack_info, logger):
-        files = self.file_selector.run(pack_info, logger)
-        for file in files:
-            file_path = os.path.join(self.pack, file)
-            file_data = _get_json_file(file_path)
+        batch = MixinBatch(self.pack)
+        self.plan(pack_info, batch, logger)
+        batch.apply(logger)
+
+    def plan(self, pack_info, batch: "MixinBatch", logger: logging.Logger, files: Optional[set[str]] = None):
+        """
+        Adds the mixin's changes to a batch, without changing any files
+        :param pack_info: The pack's info
+        :param batch: The batch that the changes are added to
+        :param logger: Where warnings are logged
+        :param files: The relative paths of the only files that are changed, every selected file if None
+        """
+        selected_files = self.file_selector.run(pack_info, logger)
+        if files is not None:
+            selected_files = list(filter(lambda f: self.pack.relpath(f) in files, selected_files))
+
+        for file in selected_files:
+            file_path = os.path.join(self.pack.root, file)
+            file_data = _get_json_file(self.pack, file_path)
 
             # Checks if file exists
             if file_data is None:
@@ -298,60 +327,73 @@ class Mixin:
                 continue
 
             json_directory = self.selector.run(file_data, logger)
-
-            for modifier in self.modifiers:
-                modifier.run(file_path, file_data, json_directory, logger)
+            batch.add(file_path, file_data, json_directory, self.modifiers)
 
     @staticmethod
-    def parse(data: dict, pack: str):
+    def parse(data: dict, pack: PackTree):
         return Mixin(FileSelector.parse(data["file_selector"], pack),
                      MixinSelector.parse(data["selector"]),
                      MixinModifier.parse(data["modifiers"]), pack)
 
 
+class MixinBatch:
+    """
+    The changes of many mixins, grouped by file.
+    Each file is changed in memory in the order the changes were added, and then written once.
+    """
+
+    def __init__(self, pack: PackTree):
+        self.pack = pack
+        self.files: dict[str, tuple[str, dict, list[tuple[JsonPath, List[MixinModifier]]]]] = {}
+
+    def add(self, file_path: str, file_data: dict, json_directory: JsonPath, modifiers: List[MixinModifier]):
+        relative_path = self.pack.relpath(file_path)
+
+        if relative_path not in self.files:
+            self.files[relative_path] = (file_path, file_data, [])
+        self.files[relative_path][2].append((json_directory, modifiers))
+
+    def is_pending(self, files: List[str]) -> bool:
+        """
+        :param files: The paths of files
+        :return: If any of the files have changes that haven't been applied
+        """
+        return any(map(lambda f: self.pack.relpath(f) in self.files, files))
+
+    def apply(self, logger: logging.Logger):
+        for file_path, file_data, changes in self.files.values():
+            for json_directory, modifiers in changes:
+                for modifier in modifiers:
+                    file_data = modifier.apply(file_data, json_directory, logger)
+
+            _set_json_file(self.pack, file_path, file_data)
+        self.files = {}
+
+
 # Allows json files to be edited
-def _patch_mixin_json(pack: str, pack_info, patch: Patch, logger: logging.Logger):
+def _patch_mixin_json(pack: PackTree, pack_info, patch: Patch, logger: logging.Logger,
+                      files: Optional[set[str]] = None):
     mixins = patch.patch["mixins"]
+    batch = MixinBatch(pack)
 
     for i, data in enumerate(mixins, start=1):
         mixin = Mixin.parse(data, pack)
         logger.info(f"Completed mixin [{i}/{len(mixins)}]")
-        mixin.run(pack_info, logger)
 
+        # Selectors that read files have to see the changes of earlier mixins
+        if batch.is_pending(mixin.file_selector.get_read_files()):
+            batch.apply(logger)
+        mixin.plan(pack_info, batch, logger, files)
 
-def get_cube_direction(from_pos: Tuple[int], to_pos: Tuple[int]) -> Union[str, None]:
-    """
-    Takes a cube's position and returns which side of a block it's on
-    :param from_pos: The cube's from position
-    :param to_pos: The cube's to position
-    :return: The direction as a string. If no direction is found, then it will be None
-    """
-    if from_pos == [0, 0, 0] and to_pos == [16, 16, 16]:
-        return "center"
-    if from_pos[0] >= 0 and to_pos[0] <= 16 and from_pos[2] >= 0 and to_pos[2] <= 16:
-        if from_pos[1] <= 0:
-            return "down"
-        elif from_pos[1] >= 16:
-            return "up"
-    elif from_pos[0] >= 0 and to_pos[0] <= 16 and from_pos[1] >= 0 and to_pos[1] <= 16:
-        if from_pos[2] <= 0:
-            return "north"
-        elif from_pos[2] >= 16:
-            return "south"
-    elif from_pos[2] >= 0 and to_pos[2] <= 16 and from_pos[1] >= 0 and to_pos[1] <= 16:
-        if from_pos[0] <= 0:
-            return "west"
-        elif from_pos[0] >= 16:
-            return "east"
-
-    return None
+    batch.apply(logger)
 
 
 class ModifierType(Enum):
     MODEL_MARGIN = "model_margin"
 
 
-def _patch_modifier(pack: str, pack_info, patch: Patch, logger: logging.Logger):
+def _patch_modifier(pack: PackTree, pack_info, patch: Patch, logger: logging.Logger,
+                    files: Optional[set[str]] = None):
     type = patch.patch["type"]
     if type == ModifierType.MODEL_MARGIN.value:
         selector = FileSelector(patch.patch["arguments"]["file_selector"]["type"], patch.patch["arguments"]["file_selector"]["arguments"], pack)
@@ -365,62 +407,40 @@ def _patch_modifier(pack: str, pack_info, patch: Patch, logger: logging.Logger):
             seed = 0
 
         random.seed(seed)
+        batch = []
+        batch_models = set()
 
         for model in models:
-            if os.path.exists(model):
-                with open(model, "r") as file:
-                    model_data = json.load(file)
+            # A model that's selected twice is offset again from its new position
+            if pack.relpath(model) in batch_models:
+                _add_margins(pack, batch)
+                batch = []
+                batch_models = set()
+
+            if pack.exists(model):
+                model_data = pack.read_json(model)
                 # Check if model contains elements
                 if "elements" in model_data and len(model_data["elements"]) > 0:
-                    north_offset = random.uniform(0, random_offset) + offset
-                    east_offset = random.uniform(0, random_offset) + offset
-                    south_offset = random.uniform(0, random_offset) + offset
-                    west_offset = random.uniform(0, random_offset) + offset
-                    up_offset = random.uniform(0, random_offset) + offset
-                    down_offset = random.uniform(0, random_offset) + offset
-                    new_elements = []
-                    for element in model_data["elements"]:
-                        position_from = element["from"]
-                        position_to = element["to"]
-                        direction = get_cube_direction(position_from, position_to)
-                        calculated_offset = random.uniform(0, random_offset) + offset
-                        # Move cubes
-                        if direction != Direction.CENTER.value:
-                            # Center of block offset
-                            if direction == Direction.NORTH.value:
-                                position_from[2] -= north_offset
-                            elif direction == Direction.EAST.value:
-                                position_to[0] += east_offset
-                            elif direction == Direction.SOUTH.value:
-                                position_to[2] += south_offset
-                            elif direction == Direction.WEST.value:
-                                position_from[0] -= west_offset
-                            elif direction == Direction.UP.value:
-                                position_to[1] += up_offset
-                            elif direction == Direction.DOWN.value:
-                                position_from[1] -= down_offset
-                            # Center of face offset
-                            if position_from[0] == 0:
-                                position_from[0] -= calculated_offset
-                            if position_from[1] == 0:
-                                position_from[1] -= calculated_offset
-                            if position_from[2] == 0:
-                                position_from[2] -= calculated_offset
-                            if position_to[0] == 16:
-                                position_to[0] += calculated_offset
-                            if position_to[1] == 16:
-                                position_to[1] += calculated_offset
-                            if position_to[2] == 16:
-                                position_to[2] += calculated_offset
-                            element["from"] = position_from
-                            element["to"] = position_to
-                        new_elements.append(element)
-                    model_data["elements"] = new_elements
-                    with open(model, "w", encoding="utf-8") as file:
-                        json.dump(model_data, file, indent="\t")
+                    # Offsets are drawn in the same order as when models were offset one at a time
+                    face_offsets = list(map(lambda _: random.uniform(0, random_offset) + offset, range(6)))
+                    element_offsets = list(map(lambda _: random.uniform(0, random_offset) + offset,
+                                               model_data["elements"]))
+                    # Offsets are drawn for every model, so the models that are changed get the same ones
+                    if files is None or pack.relpath(model) in files:
+                        batch.append((model, model_data, face_offsets, element_offsets))
+                        batch_models.add(pack.relpath(model))
                 else:
                     logger.error(f"file lacks elements: {model}")
             else:
                 logger.warning(f"File couldn't be found: {model}")
+
+        _add_margins(pack, batch)
     else:
         logger.error(f"Incorrect modifier type: {type}")
+
+
+def _add_margins(pack: PackTree, batch: list[tuple[str, dict, list[float], list[float]]]):
+    add_margins(list(map(lambda m: (m[1]["elements"], m[2], m[3]), batch)))
+
+    for model, model_data, _, _ in batch:
+        pack.write_json(model, model_data, indent="\t", ensure_ascii=True)
@@ -0,0 +1,104 @@
+import os
+from typing import List, Optional
+
+from resource_pack_packer.configs import Config
+from resource_pack_packer.patch import PatchFile
+
+
+# Configs built on disk mostly wait on copying and writing files, so more of them are built at once than there are cpus
+IO_WORKERS_PER_CPU = 2
+
+
+def get_config_workers(config_count: int, on_disk: bool = False, workers: Optional[int] = None) -> int:
+    """
+    Gets the amount of configs that should be built at once.
+    There's no point in more processes than configs. In memory builds are bound by the cpu, so they get a process
+    per cpu.
+    :param config_count: The amount of configs being built
+    :param on_disk: If the configs are built in folders on disk
+    :param workers: The max amount of processes set by the run option
+    :return: The amount of processes
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) * (IO_WORKERS_PER_CPU if on_disk else 1)
+    return max(1, min(config_count, workers))
+
+
+def get_stage_workers(config_workers: int) -> int:
+    """
+    Gets the amount of processes that each config can start for its own stages, such as validation.
+    The cpus are split between the configs that are built at once, so they don't start more processes than cpus.
+    :param config_workers: The amount of configs being built at once
+    :return: The amount of processes
+    """
+    return max(1, (os.cpu_count() or 1) // config_workers)
+
+
+def _get_texture_key(config: Config) -> tuple:
+    if config.delete_textures:
+        return True, tuple(sorted(map(lambda t: t.lower(), config.ignore_textures)))
+    else:
+        return False,
+
+
+class BuildPlan:
+    """
+    The stages that every config runs in the same way, so they only have to be run once.
+    Stages are only shared in order: copying, deleting textures, patches and then preprocessors.
+    """
+
+    def __init__(self, config: Config, textures: bool, patches: List[PatchFile], preprocess: bool):
+        """
+        :param config: The config that the shared stages are run with
+        :param textures: If texture deletion is shared
+        :param patches: The patches at the start of every config
+        :param preprocess: If preprocessors are shared
+        """
+        self.config = config
+        self.textures = textures
+        self.patches = patches
+        self.preprocess = preprocess
+
+    def shares_work(self) -> bool:
+        """
+        :return: If any stage is shared other than copying
+        """
+        return (self.textures and self.config.delete_textures) or len(self.patches) > 0 or self.preprocess
+
+    def get_patches(self, config: Config) -> List[PatchFile]:
+        """
+        :param config: The config being built
+        :return: The patches that the config still has to run
+        """
+        return config.patches[len(self.patches):]
+
+    @staticmethod
+    def create(configs: List[Config]) -> "BuildPlan":
+        first = configs[0]
+
+        # Textures
+        if any(map(lambda c: _get_texture_key(c) != _get_texture_key(first), configs)):
+            return BuildPlan(first, False, [], False)
+
+        # Patches are shared up until the first one that isn't the same
+        patches = []
+        for i, patch in enumerate(first.patches):
+            if patch is None or any(map(lambda c: len(c.patches) <= i or c.patches[i] is None or
+                                        c.patches[i].name != patch.name, configs)):
+                break
+            patches.append(patch)
+
+        # Preprocessors run after every patch
+        preprocess = all(map(lambda c: len(c.patches) == len(patches), configs))
+
+        return BuildPlan(first, True, patches, preprocess)
+
+    def __str__(self) -> str:
+        stages = ["copy"]
+
+        if self.textures and self.config.delete_textures:
+            stages.append("delete textures")
+        stages += list(map(lambda p: f"patch {p.name}", self.patches))
+        if self.preprocess:
+            stages.append("preprocessors")
+        return ", ".join(stages)
@@ -1,8 +1,14 @@
-import json
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from copy import deepcopy
 from typing import Optional
 
 from resource_pack_packer.selectors import parse_minecraft_identifier, Direction
+from resource_pack_packer.tree import PackTree
+from resource_pack_packer.util.geometry import flip_elements, translate_elements
 
 
 def get_from_dict(dictionary: dict, key: str, default=None):
@@ -11,9 +17,85 @@ def get_from_dict(dictionary: dict, key: str, default=None):
     return default
 
 
-def find_model(identifier: str, temp_dir: str) -> str:
+def find_model(identifier: str, pack: PackTree, resolver: Optional["ModelResolver"] = None) -> str:
+    if resolver is not None:
+        return resolver.find(identifier)
+
     model_path = parse_minecraft_identifier(identifier, "models", "json")
-    return os.path.join(temp_dir, model_path)
+    return os.path.join(pack.root, model_path)
+
+
+class ModelResolver:
+    """
+    Resolves the elements of models through their parents once per build, so models that share parents don't
+    read the whole chain again.
+    """
+
+    def __init__(self, pack: PackTree):
+        self.pack = pack
+        self._paths: dict[str, str] = {}
+        self._elements: dict[str, list[dict]] = {}
+        # Each thread resolves its own chain of parents
+        self._local = threading.local()
+
+    def find(self, identifier: str) -> str:
+        """
+        :param identifier: A Minecraft identifier of a model
+        :return: The absolute path of the model
+        """
+        path = self._paths.get(identifier)
+
+        if path is None:
+            path = os.path.join(self.pack.root, parse_minecraft_identifier(identifier, "models", "json"))
+            self._paths[identifier] = path
+        return path
+
+    def get_elements(self, identifier: str) -> list[dict]:
+        """
+        Gets the elements of a model, or the elements of its closest parent that has any.
+        The elements are shared, so they have to be copied before being edited.
+        :param identifier: A Minecraft identifier of a model
+        :return: The resolved elements
+        """
+        path = self.pack.relpath(self.find(identifier))
+        elements = self._elements.get(path)
+
+        if elements is not None:
+            return elements
+
+        if not hasattr(self._local, "resolving"):
+            self._local.resolving = []
+        resolving = self._local.resolving
+
+        if path in resolving:
+            chain = resolving[resolving.index(path):] + [path]
+            raise ValueError(f"Model parents form a cycle: {' -> '.join(chain)}")
+
+        resolving.append(path)
+        try:
+            data = self.pack.read_json(path)
+            elements = get_from_dict(data, "elements", [])
+
+            # Every parent is resolved, even if its elements aren't used
+            if "parent" in data:
+                parent_elements = self.get_elements(data["parent"])
+
+                if len(elements) == 0:
+                    elements = parent_elements
+        finally:
+            resolving.pop()
+
+        self._elements[path] = elements
+        return elements
+
+    def invalidate(self, path: str):
+        """
+        Forgets resolved models after a model is written
+        :param path: The path of the model that was written
+        """
+        # Models are only resolved through a path after it's been resolved itself
+        if self.pack.relpath(path) in self._elements:
+            self._elements.clear()
 
 
 class Model:
@@ -23,38 +105,41 @@ class Model:
     display: Optional[dict]
 
     def __init__(self, parent: Optional[str], textures: Optional[dict], elements: list[dict], display: Optional[dict],
-                 temp_dir: str):
+                 pack: PackTree, resolver: Optional[ModelResolver] = None):
         self.parent = parent
         self.textures = textures
         self.elements = elements
         self.display = display
 
         if self.parent is not None:
-            self.apply_parent(temp_dir)
+            self.apply_parent(pack, resolver)
 
     @staticmethod
-    def parse(data: dict, temp_dir: str) -> "Model":
+    def parse(data: dict, pack: PackTree, resolver: Optional[ModelResolver] = None) -> "Model":
         return Model(get_from_dict(data, "parent"),
                      get_from_dict(data, "textures"),
                      get_from_dict(data, "elements", []),
                      get_from_dict(data, "display"),
-                     temp_dir)
+                     pack,
+                     resolver)
 
     @staticmethod
-    def parse_file(file, temp_dir: str) -> "Model":
-        with open(file, "r") as model:
-            data = json.load(model)
-        return Model.parse(data, temp_dir)
+    def parse_file(file, pack: PackTree, resolver: Optional[ModelResolver] = None) -> "Model":
+        # Models are edited in place, so they can't share data with the pack
+        return Model.parse(deepcopy(pack.read_json(file)), pack, resolver)
+
+    def apply_parent(self, pack: PackTree, resolver: Optional[ModelResolver] = None):
+        if resolver is None:
+            resolver = ModelResolver(pack)
 
-    def apply_parent(self, temp_dir: str):
-        parent_model = Model.parse_file(os.path.join(temp_dir, find_model(self.parent, temp_dir)), temp_dir)
+        parent_elements = resolver.get_elements(self.parent)
 
         # Apply elements to child
         if len(self.elements) == 0:
-            self.elements = parent_model.elements
+            self.elements = deepcopy(parent_elements)
 
     @staticmethod
-    def save(model: "Model", path: str):
+    def save(model: "Model", path: str, pack: PackTree):
         model_data = {}
         if model.parent is not None:
             model_data |= {"parent": model.parent}
@@ -65,8 +150,7 @@ class Model:
         if model.display is not None:
             model_data |= {"display": model.display}
 
-        with open(path, "w", encoding="utf-8") as file:
-            json.dump(model_data, file, indent=2, ensure_ascii=False)
+        pack.write_json(path, model_data, indent=2, ensure_ascii=False)
 
 
 class RPPModel:
@@ -84,10 +168,24 @@ class RPPModel:
         return RPPModel(get_from_dict(data, "identifier"), get_from_dict(data, "modify"), get_from_dict(data, "mixin"))
 
     @staticmethod
-    def parse_file(file: str) -> "RPPModel":
-        with open(file, "r") as model:
-            data = json.load(model)
-        return RPPModel.parse(data)
+    def parse_file(file: str, pack: PackTree) -> "RPPModel":
+        return RPPModel.parse(pack.read_json(file))
+
+    def get_reads(self) -> list[str]:
+        """
+        :return: The identifiers of every model that's read when processing
+        """
+        reads = []
+
+        if self.modify is not None:
+            reads.append(self.modify["model"])
+        elif self.mixin is not None:
+            for model in self.mixin["models"]:
+                if isinstance(model, str):
+                    reads.append(model)
+                else:
+                    reads += RPPModel.parse(model).get_reads()
+        return reads
 
     @staticmethod
     def _flip_uv_x(uv: list[float]) -> list[float]:
@@ -97,16 +195,14 @@ class RPPModel:
     def _flip_uv_y(uv: list[float]) -> list[float]:
         return [uv[0], uv[3], uv[2], uv[1]]
 
-    def _modify(self, temp_dir: str) -> Model:
-        model = Model.parse_file(find_model(self.modify["model"], temp_dir), temp_dir)
+    def _modify(self, pack: PackTree, resolver: ModelResolver) -> Model:
+        model = Model.parse_file(find_model(self.modify["model"], pack, resolver), pack, resolver)
         if self.modify["type"] == "translate":
             x = get_from_dict(self.modify["arguments"], "x", 0.0)
             y = get_from_dict(self.modify["arguments"], "y", 0.0)
             z = get_from_dict(self.modify["arguments"], "z", 0.0)
 
-            for element in model.elements:
-                element["from"] = [element["from"][0] + x, element["from"][1] + y, element["from"][2] + z]
-                element["to"] = [element["to"][0] + x, element["to"][1] + y, element["to"][2] + z]
+            translate_elements(model.elements, [x, y, z])
         elif self.modify["type"] == "flip":
             origin = get_from_dict(self.modify["arguments"], "origin", [8.0, 8.0, 8.0])
             x = get_from_dict(self.modify["arguments"], "x", False)
@@ -114,23 +210,9 @@ class RPPModel:
             z = get_from_dict(self.modify["arguments"], "z", False)
 
             # Flip elements
-            for element in model.elements:
-                if x:
-                    from_pos = element["from"][0]
-                    to_pos = element["to"][0]
-                    element["from"][0] = origin[0] + (origin[0] - to_pos)
-                    element["to"][0] = origin[0] + (origin[0] - from_pos)
-                if y:
-                    from_pos = element["from"][1]
-                    to_pos = element["to"][1]
-                    element["from"][1] = origin[1] + (origin[1] - to_pos)
-                    element["to"][1] = origin[1] + (origin[1] - from_pos)
-                if z:
-                    from_pos = element["from"][2]
-                    to_pos = element["to"][2]
-                    element["from"][2] = origin[2] + (origin[2] - to_pos)
-                    element["to"][2] = origin[2] + (origin[2] - from_pos)
+            flip_elements(model.elements, origin, [x, y, z])
 
+            for element in model.elements:
                 flipped_faces = {}
 
                 # Flip faces
@@ -168,7 +250,7 @@ class RPPModel:
                 element["faces"] = flipped_faces
         return model
 
-    def _mixin(self, temp_dir: str) -> Model:
+    def _mixin(self, pack: PackTree, resolver: ModelResolver) -> Model:
         parent = None
         textures = {}
         elements = []
@@ -177,10 +259,10 @@ class RPPModel:
         for model in self.mixin["models"]:
             # Minecraft model
             if isinstance(model, str):
-                parsed_model = Model.parse_file(find_model(model, temp_dir), temp_dir)
+                parsed_model = Model.parse_file(find_model(model, pack, resolver), pack, resolver)
             # RPP model
             else:
-                parsed_model = RPPModel.parse(model).process(temp_dir)[0]
+                parsed_model = RPPModel.parse(model).process(pack, resolver)[0]
 
             if parsed_model.parent is not None:
                 parent = parsed_model.parent
@@ -191,12 +273,233 @@ class RPPModel:
             if parsed_model.display is not None:
                 display |= parsed_model.display
 
-        return Model(parent, textures, elements, display, temp_dir)
+        return Model(parent, textures, elements, display, pack, resolver)
+
+    def process(self, pack: PackTree, resolver: Optional[ModelResolver] = None) -> tuple[Model, str]:
+        """
+        :param pack: The pack that models are read from
+        :param resolver: The models resolved so far in the build
+        :return: The processed model and its identifier
+        """
+        if resolver is None:
+            resolver = ModelResolver(pack)
 
-    def process(self, temp_dir: str) -> tuple[Model, str]:
         if self.modify is not None:
-            return self._modify(temp_dir), self.identifier
+            return self._modify(pack, resolver), self.identifier
         elif self.mixin is not None:
-            return self._mixin(temp_dir), self.identifier
+            return self._mixin(pack, resolver), self.identifier
         else:
-            return Model(None, None, [], None, temp_dir), self.identifier
+            return Model(None, None, [], None, pack), self.identifier
+
+
+class _ReadWriteLock:
+    """
+    Lets any amount of threads read at once, while a thread that writes has the lock to itself
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writers = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            # Waiting writers go first, so readers can't keep them out
+            self._condition.wait_for(lambda: self._writers == 0)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers += 1
+            self._condition.wait_for(lambda: self._readers == 0 and not self._writing)
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writers -= 1
+                self._writing = False
+                self._condition.notify_all()
+
+
+class PreprocessorGraph:
+    """
+    The order that preprocessor models have to run in, which gives the same output as running them one at a time.
+    A model runs after the models before it that write a model it reads, including through parents,
+    and before the models after it that write one.
+    """
+
+    def __init__(self, pack: PackTree, files: list[str], resolver: Optional[ModelResolver] = None):
+        """
+        :param pack: The pack that models are read from and written to
+        :param files: The preprocessor models, in the order they would run one at a time
+        :param resolver: The models resolved so far in the build
+        """
+        self.pack = pack
+        self.files = files
+        self.resolver = ModelResolver(pack) if resolver is None else resolver
+        self.models = list(map(lambda f: RPPModel.parse_file(f, pack), files))
+        self.outputs = list(map(lambda m: pack.relpath(self.resolver.find(m.identifier)), self.models))
+        self.dependencies: list[set[int]] = list(map(lambda _: set(), files))
+        self._lock = _ReadWriteLock()
+
+        self.writers: dict[str, list[int]] = {}
+        for i, output in enumerate(self.outputs):
+            # Models that write the same file still run in order
+            if output in self.writers:
+                self.dependencies[i].add(self.writers[output][-1])
+            self.writers.setdefault(output, []).append(i)
+
+        self.reads = list(map(lambda i: self._get_read_paths(i, self.writers), range(len(self.models))))
+        for i, paths in enumerate(self.reads):
+            for path in paths:
+                # Later models that write the file have to wait until it's been read
+                for writer in filter(lambda w: w > i, self.writers.get(path, [])):
+                    self.dependencies[writer].add(i)
+                self.dependencies[i].update(filter(lambda w: w < i, self.writers.get(path, [])))
+
+        self._check_cycles()
+
+    def _get_read_paths(self, i: int, writers: dict[str, list[int]]) -> set[str]:
+        """
+        Finds every model that a model might read, through the whole chain of parents
+        :param i: The index of the model
+        :param writers: The models that write each path
+        :return: The relative paths that might be read
+        """
+        pending = list(map(lambda m: self.pack.relpath(self.resolver.find(m)), self.models[i].get_reads()))
+        paths = set()
+
+        while len(pending) > 0:
+            path = pending.pop()
+            if path in paths:
+                continue
+            paths.add(path)
+
+            # The parent of a file that's written comes from what its writer read
+            for writer in filter(lambda w: w < i, writers.get(path, [])):
+                pending += map(lambda m: self.pack.relpath(self.resolver.find(m)), self.models[writer].get_reads())
+
+            # The file might still be read as it is if it's written after the model
+            if self.pack.isfile(path):
+                parent = get_from_dict(self.pack.read_json(path), "parent")
+                if parent is not None:
+                    pending.append(self.pack.relpath(self.resolver.find(parent)))
+        return paths
+
+    def get_affected(self, paths: set[str]) -> Optional[list[int]]:
+        """
+        Finds the models that have to run again after files changed in a pack that they already ran on.
+        Only the models that read a changed file, or a file written by another model that runs again, are run again.
+        :param paths: The relative paths of the files that changed
+        :return: The indexes of the models, or None if running only them wouldn't give the same output
+        """
+        # A changed file that's written by a model has already been replaced
+        if any(map(lambda p: p in self.writers, paths)):
+            return None
+
+        affected = set()
+        pending = list(filter(lambda i: len(self.reads[i] & paths) > 0, range(len(self.models))))
+
+        while len(pending) > 0:
+            i = pending.pop()
+            if i in affected:
+                continue
+            affected.add(i)
+
+            output = self.outputs[i]
+            # Later models that read the file, or write it after this model, have to run again too
+            pending += filter(lambda m: m > i and (output in self.reads[m] or self.outputs[m] == output),
+                              range(len(self.models)))
+
+        for i in affected:
+            # The pack only has the last version of a file, so it can't be read as it was before a later model wrote it
+            if any(map(lambda p: any(map(lambda w: w > i, self.writers.get(p, []))), self.reads[i])):
+                return None
+        return sorted(affected)
+
+    def _check_cycles(self):
+        remaining = list(map(len, self.dependencies))
+        dependents = self._get_dependents()
+        ready = list(filter(lambda i: remaining[i] == 0, range(len(self.files))))
+        ordered = 0
+
+        while len(ready) > 0:
+            ordered += 1
+            for dependent in dependents[ready.pop()]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+
+        if ordered < len(self.files):
+            cycle = list(map(lambda i: self.files[i], filter(lambda i: remaining[i] > 0, range(len(self.files)))))
+            raise ValueError(f"Preprocessor models depend on each other: {', '.join(cycle)}")
+
+    def _get_dependents(self) -> list[list[int]]:
+        dependents = list(map(lambda _: [], self.files))
+
+        for i, dependencies in enumerate(self.dependencies):
+            for dependency in sorted(dependencies):
+                dependents[dependency].append(i)
+        return dependents
+
+    def _process(self, i: int):
+        # Writes can't happen while other models read the pack or the resolver's models
+        with self._lock.read():
+            processed_model, identifier = self.models[i].process(self.pack, self.resolver)
+        model_path = self.resolver.find(identifier)
+
+        with self._lock.write():
+            Model.save(processed_model, model_path, self.pack)
+            self.resolver.invalidate(model_path)
+            self.pack.remove(self.files[i])
+
+    def run(self, logger: logging.Logger, workers: Optional[int] = None, models: Optional[list[int]] = None):
+        """
+        Runs every model as soon as the models it depends on have run.
+        The models run on threads, so processing them is still limited to one core by the GIL.
+        The threads keep the order between models and let reads from the disk overlap.
+        :param logger: Where progress is logged
+        :param workers: The amount of models that run at once
+        :param models: The indexes of the only models that are run, every model if None
+        """
+        if models is None:
+            models = list(range(len(self.files)))
+
+        selected = set(models)
+        remaining = list(map(lambda d: len(d & selected), self.dependencies))
+        dependents = list(map(lambda d: list(filter(lambda i: i in selected, d)), self._get_dependents()))
+        processed = 0
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        # The pack is shared in memory, so models run on threads rather than processes
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for i in filter(lambda m: remaining[m] == 0, models):
+                futures[executor.submit(self._process, i)] = i
+
+            while len(futures) > 0:
+                done = wait(futures, return_when=FIRST_COMPLETED)[0]
+
+                for future in sorted(done, key=lambda f: futures[f]):
+                    i = futures.pop(future)
+                    future.result()
+
+                    processed += 1
+                    logger.info(f"Processed model [{processed}/{len(models)}]")
+
+                    for dependent in dependents[i]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            futures[executor.submit(self._process, dependent)] = dependent
@@ -3,9 +3,13 @@ import logging
 import os
 import re
 from enum import Enum
-from glob import glob
 from typing import List, Optional
 
+from resource_pack_packer.tree import PackTree
+from resource_pack_packer.util.regex import compile_regex
+
+NAMESPACE_REGEX = re.compile("^[a-z0-9_.-]*(?=:)")
+
 
 def parse_minecraft_identifier(identifier: str, folder: str, extension: str):
     """
@@ -17,8 +21,7 @@ def parse_minecraft_identifier(identifier: str, folder: str, extension: str):
     :return: Relative path from resource pack
     """
     file_path = os.path.normpath(identifier)
-    namespace_regex = re.compile("^[a-z]*(?=:)")
-    namespace_match = re.match(namespace_regex, file_path)
+    namespace_match = NAMESPACE_REGEX.match(file_path)
     if namespace_match is not None:
         span = namespace_match.span()
         namespace = file_path[span[0]:span[1]]
@@ -37,17 +40,48 @@ class FileSelectorType(Enum):
     BLOCKSTATE = "blockstate"
 
 
+# Selectors that are cheap enough that their results aren't saved
+UNCACHED_SELECTOR_TYPES = (FileSelectorType.FILE.value, FileSelectorType.IDENTIFIER.value)
+
+
 class FileSelector:
     """
     Select a collection of files from a patch file.
+    The results are reused until files are added or removed, or a file the selector reads is changed.
     """
 
-    def __init__(self, selector_type: str, arguments: dict, pack: str):
+    def __init__(self, selector_type: str, arguments: dict, pack: PackTree):
         self.selector_type = selector_type
         self.arguments = arguments
         self.pack = pack
 
     def run(self, pack_info, logger: logging.Logger) -> Optional[List[str]]:
+        if self.selector_type in UNCACHED_SELECTOR_TYPES:
+            return self._select(pack_info, logger)
+
+        key = self._get_key(pack_info)
+        files = self.pack.changes.get_result(key)
+
+        if files is None:
+            selected_files = self._select(pack_info, logger)
+
+            # Errors are logged every time
+            if selected_files is None:
+                return None
+
+            files = tuple(map(self.pack.relpath, selected_files))
+            self.pack.changes.set_result(key, files, map(self.pack.relpath, self.get_read_files()))
+
+        return list(map(lambda f: os.path.join(self.pack.root, f), files))
+
+    def _get_key(self, pack_info) -> tuple[str, str, Optional[tuple[str]]]:
+        if pack_info.block_files is None:
+            block_files = None
+        else:
+            block_files = tuple(pack_info.block_files)
+        return "selector", json.dumps([self.selector_type, self.arguments], sort_keys=True), block_files
+
+    def _select(self, pack_info, logger: logging.Logger) -> Optional[List[str]]:
         match self.selector_type:
             case FileSelectorType.FILE.value:
                 return self.arguments["files"]
@@ -59,18 +93,12 @@ class FileSelector:
                 else:
                     recursive = False
 
-                files = glob(os.path.join(self.pack, file_path, "*"), recursive=recursive)
-
                 if "regex" in self.arguments:
-                    regex = re.compile(self.arguments["regex"])
-
-                    sorted_files = []
-                    for file in files:
-                        if regex.match(os.path.relpath(file, os.path.join(self.pack, file_path))) is not None:
-                            sorted_files.append(file)
-                    return sorted_files
+                    regex = compile_regex(self.arguments["regex"])
                 else:
-                    return files
+                    regex = None
+
+                return self.pack.glob(os.path.join(file_path, "*"), recursive=recursive, regex=regex)
             case FileSelectorType.IDENTIFIER.value:
                 if "models" in self.arguments:
                     models = self.arguments["models"]
@@ -87,9 +115,9 @@ class FileSelector:
                 else:
                     lang_files = []
 
-                parsed_models = list(map(lambda m: os.path.join(self.pack, parse_minecraft_identifier(m, "models", "json")), models))
-                parsed_blockstates = list(map(lambda b: os.path.join(self.pack, parse_minecraft_identifier(b, "blockstates", "json")), blockstates))
-                parsed_lang_files = list(map(lambda l: os.path.join(self.pack, parse_minecraft_identifier(l, "lang", "json")), lang_files))
+                parsed_models = list(map(lambda m: os.path.join(self.pack.root, parse_minecraft_identifier(m, "models", "json")), models))
+                parsed_blockstates = list(map(lambda b: os.path.join(self.pack.root, parse_minecraft_identifier(b, "blockstates", "json")), blockstates))
+                parsed_lang_files = list(map(lambda l: os.path.join(self.pack.root, parse_minecraft_identifier(l, "lang", "json")), lang_files))
 
                 return parsed_models + parsed_blockstates + parsed_lang_files
             case FileSelectorType.BLOCK.value:
@@ -116,8 +144,8 @@ class FileSelector:
                         for block_file in pack_info.block_files:
                             parsed_block_file = block_file.replace("[block_name]", block_single)
                             parsed_block_file = parsed_block_file.replace("[block_name_plural]", block_plural)
-                            if os.path.exists(os.path.join(self.pack, parsed_block_file)):
-                                parsed_block_files.append(os.path.join(self.pack, parsed_block_file))
+                            if self.pack.exists(parsed_block_file):
+                                parsed_block_files.append(os.path.join(self.pack.root, parsed_block_file))
                     else:
                         logger.error("block_files is not set")
                         return
@@ -134,35 +162,53 @@ class FileSelector:
                         if selector_output is not None:
                             files |= set(selector_output)
 
-                return list(files)
+                # Sets aren't ordered, so the output is sorted to keep builds the same
+                return sorted(files)
             case FileSelectorType.BLOCKSTATE.value:
                 files = set()
 
                 if "blockstate" in self.arguments:
-                    blockstate = os.path.join(self.pack, parse_minecraft_identifier(self.arguments["blockstate"], "blockstates", "json"))
+                    blockstate = os.path.join(self.pack.root, parse_minecraft_identifier(self.arguments["blockstate"], "blockstates", "json"))
 
                     if "include_blockstate" in self.arguments:
                         if self.arguments["include_blockstate"]:
                             files.add(blockstate)
 
                     # Check if the blockstate exists
-                    if os.path.exists(blockstate):
-                        with open(blockstate, "r") as blockstate_file:
-                            blockstate_data = json.load(blockstate_file)
+                    if self.pack.exists(blockstate):
+                        blockstate_data = self.pack.read_json(blockstate)
 
                         if "multipart" in blockstate_data:
                             for state in blockstate_data["multipart"]:
                                 if "apply" in state:
                                     if "model" in state["apply"]:
-                                        files.add(os.path.join(self.pack, parse_minecraft_identifier(state["apply"]["model"], "models", "json")))
+                                        files.add(os.path.join(self.pack.root, parse_minecraft_identifier(state["apply"]["model"], "models", "json")))
 
-                return list(files)
+                return sorted(files)
             case _:
                 logger.error(f"Incorrect file selector type: {self.selector_type}")
                 return
 
+    def get_read_files(self) -> List[str]:
+        """
+        :return: The files whose contents are read when the selector runs
+        """
+        match self.selector_type:
+            case FileSelectorType.UNION.value:
+                files = []
+
+                if "selectors" in self.arguments:
+                    for selectors in self.arguments["selectors"]:
+                        files += FileSelector.parse(selectors, self.pack).get_read_files()
+                return files
+            case FileSelectorType.BLOCKSTATE.value:
+                if "blockstate" in self.arguments:
+                    return [os.path.join(self.pack.root, parse_minecraft_identifier(self.arguments["blockstate"],
+                                                                                    "blockstates", "json"))]
+        return []
+
     @staticmethod
-    def parse(data: dict, pack: str):
+    def parse(data: dict, pack: PackTree):
         return FileSelector(data["type"], data["arguments"], pack)
 
 
@@ -1,14 +1,12 @@
 import logging
 import os
-import tkinter
-from tkinter import filedialog
 from typing import Optional
 
 from resource_pack_packer.console import parse_dir
 from resource_pack_packer.lib.jsetting.settings import Settings
 
-root = tkinter.Tk()
-root.withdraw()
+# Only created once a dialog is opened, so that packs can be built without a display
+_tk_root = None
 
 logger = logging.getLogger("SETTINGS")
 
@@ -31,6 +29,14 @@ def parse_dir_keywords(directory):
 
 
 def folder_dialog(title="Select Folder", directory=os.path.abspath(os.sep)) -> Optional[str]:
+    global _tk_root
+    import tkinter
+    from tkinter import filedialog
+
+    if _tk_root is None:
+        _tk_root = tkinter.Tk()
+        _tk_root.withdraw()
+
     logging.info(f"Select Folder: {title}")
     selected_path = filedialog.askdirectory(title=title, initialdir=directory)
 
@@ -57,19 +63,22 @@ MAIN_SETTINGS = Settings(0, os.path.join(PROGRAM_PATH, "settings.json"))\
         "out_dir": "#packdir",
         "version": "DEV",
         "rerun": True,
-        "validate": True
+        "validate": True,
+        "incremental": True
     })\
     .add_property("run_options", "build", {
         "configs": "*",
         "minify_json": True,
         "delete_empty_folders": True,
-        "zip_pack": True
+        "zip_pack": True,
+        "deterministic": True
     })\
     .add_property("run_options", "build_single", {
         "configs": "?",
         "minify_json": True,
         "delete_empty_folders": True,
-        "zip_pack": True
+        "zip_pack": True,
+        "deterministic": True
     })\
     .add_property("tokens", "curseforge")
 
@@ -0,0 +1,806 @@
+import abc
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from bisect import bisect_left, insort
+from fnmatch import fnmatchcase
+from timeit import default_timer
+from typing import Callable, Iterable, Optional
+
+from resource_pack_packer.util.archive import STORED_EXTENSIONS, ZipStats, ZipWriter, get_fixed_date_time
+from resource_pack_packer.util.copy import CopyMode, copy_files, copy_tree, is_hidden, walk_files
+from resource_pack_packer.util.manifest import hash_file
+
+
+def _match_glob(parts: list[str], pattern: list[str]) -> bool:
+    """
+    Matches a split path against a split glob pattern in the same way as glob
+    """
+    if len(pattern) == 0:
+        return len(parts) == 0
+
+    if pattern[0] == "**":
+        # Matches zero or more folders
+        for i in range(len(parts) + 1):
+            if i > 0 and parts[i - 1].startswith("."):
+                break
+            if _match_glob(parts[i:], pattern[1:]):
+                return True
+        return False
+
+    if len(parts) == 0:
+        return False
+
+    # Glob wildcards don't match hidden files
+    if parts[0].startswith(".") and not pattern[0].startswith("."):
+        return False
+
+    return fnmatchcase(parts[0], pattern[0]) and _match_glob(parts[1:], pattern[1:])
+
+
+def _has_magic(part: str) -> bool:
+    return "*" in part or "?" in part or "[" in part
+
+
+class PackIndex:
+    """
+    Every file and folder in a pack, so that finding files doesn't touch the disk.
+    Paths are relative to the pack and kept sorted, so every path in a folder can be found with a binary search.
+    """
+
+    def __init__(self, files: Iterable[str], folders: Iterable[str] = ()):
+        self._files = set(files)
+        self._folders = set(folders)
+
+        for file in self._files:
+            self._folders |= set(_get_parents(file))
+        self._paths = sorted(self._files | self._folders)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def isfile(self, relative_path: str) -> bool:
+        return relative_path in self._files
+
+    def isdir(self, relative_path: str) -> bool:
+        return relative_path == "." or relative_path in self._folders
+
+    def files(self) -> list[str]:
+        return list(filter(lambda p: p in self._files, self._paths))
+
+    def add_file(self, relative_path: str):
+        if relative_path in self._files:
+            return
+
+        self._files.add(relative_path)
+        insort(self._paths, relative_path)
+
+        for folder in _get_parents(relative_path):
+            if folder in self._folders:
+                break
+            self._folders.add(folder)
+            insort(self._paths, folder)
+
+    def remove_file(self, relative_path: str):
+        # The file's folder is kept, the same as on disk
+        if relative_path in self._files:
+            self._files.remove(relative_path)
+            del self._paths[bisect_left(self._paths, relative_path)]
+
+    def remove_folder(self, relative_path: str) -> int:
+        """
+        Removes a folder and everything in it
+        :return: The amount of files removed
+        """
+        start, end = self._get_range(relative_path)
+        removed = 0
+
+        for path in self._paths[start:end]:
+            if path in self._files:
+                self._files.remove(path)
+                removed += 1
+            else:
+                self._folders.discard(path)
+        del self._paths[start:end]
+
+        if relative_path in self._folders:
+            self._folders.remove(relative_path)
+            del self._paths[bisect_left(self._paths, relative_path)]
+        return removed
+
+    def get_empty_folders(self) -> list[str]:
+        """
+        :return: Every folder that only contains empty folders, with the deepest folders first
+        """
+        used_folders = set()
+        empty_folders = []
+
+        # Every path comes after the folders it's in, so folders are checked after everything in them
+        for path in reversed(self._paths):
+            if path in self._files or path in used_folders:
+                used_folders.add(os.path.dirname(path))
+            else:
+                empty_folders.append(path)
+        return empty_folders
+
+    def under(self, folder: str) -> list[str]:
+        """
+        :param folder: The folder to search
+        :return: The sorted paths of every file and folder inside the folder
+        """
+        start, end = self._get_range(folder)
+        return self._paths[start:end]
+
+    def glob(self, pattern: str, recursive: bool = False, regex: Optional[re.Pattern] = None) -> list[str]:
+        """
+        Finds files and folders in the same way as glob
+        :param pattern: A glob pattern relative to the pack
+        :param recursive: If '**' matches any amount of folders
+        :param regex: If set, only paths that it matches are kept.
+        It's matched against the start of the path relative to the pattern's folder.
+        :return: The sorted relative paths that match
+        """
+        matches = self._glob(pattern, recursive)
+
+        if regex is None:
+            return matches
+
+        folder = os.path.dirname(pattern)
+        start = 0 if folder == "" else len(folder) + 1
+        return list(filter(lambda p: regex.match(p[start:] if p.startswith(folder + os.sep) else
+                                                 os.path.relpath(p, folder)) is not None, matches))
+
+    def _glob(self, pattern: str, recursive: bool) -> list[str]:
+        split_pattern = pattern.split(os.sep)
+
+        # Without recursion '**' is the same as '*'
+        if not recursive:
+            split_pattern = list(map(lambda p: "*" if p == "**" else p, split_pattern))
+
+        # Only the folder before the first wildcard is searched
+        literal_length = 0
+        while literal_length < len(split_pattern) and not _has_magic(split_pattern[literal_length]):
+            literal_length += 1
+
+        folder = os.path.join(*split_pattern[:literal_length]) if literal_length > 0 else "."
+        remaining_pattern = split_pattern[literal_length:]
+
+        if len(remaining_pattern) == 0:
+            return [folder] if folder in self._files or folder in self._folders else []
+
+        matches = []
+        # '**' can match the folder itself
+        if folder != "." and folder in self._folders and _match_glob([], remaining_pattern):
+            matches.append(folder)
+
+        start = 0 if folder == "." else len(folder) + 1
+        for path in self.under(folder):
+            if _match_glob(path[start:].split(os.sep), remaining_pattern):
+                matches.append(path)
+        return matches
+
+    def _get_range(self, folder: str) -> tuple[int, int]:
+        if folder == ".":
+            return 0, len(self._paths)
+
+        # Every path that starts with the folder and a separator is between these two
+        return (bisect_left(self._paths, folder + os.sep),
+                bisect_left(self._paths, folder + chr(ord(os.sep) + 1)))
+
+
+def _get_parents(relative_path: str) -> list[str]:
+    parents = []
+    folder = os.path.dirname(relative_path)
+
+    while folder != "":
+        parents.append(folder)
+        folder = os.path.dirname(folder)
+    return parents
+
+
+class JsonCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.parse_time = 0.0
+        self.writes = 0
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.parse_time:.3f} seconds parsing, {self.writes} writes"
+
+
+class IOStats:
+    """
+    Counts the files and bytes that go through a tree
+    """
+
+    def __init__(self):
+        self.files_read = 0
+        self.bytes_read = 0
+        self.files_written = 0
+        self.bytes_written = 0
+        self.files_removed = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return dict(vars(self))
+
+
+class ChangeLog:
+    """
+    Records when each file of a pack last changed, so that results worked out from the pack
+    can be reused until a file they depend on changes
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        # The last version that added or removed a file
+        self._structure_version = 0
+        self._versions: dict[str, int] = {}
+        self._results: dict = {}
+
+    def record(self, relative_path: str, structure: bool = False):
+        """
+        :param relative_path: The file that changed
+        :param structure: If files were added or removed
+        """
+        self.version += 1
+        self._versions[relative_path] = self.version
+
+        if structure:
+            self._structure_version = self.version
+
+    def changed_since(self, version: int, files: Iterable[str]) -> bool:
+        """
+        :param version: The version to compare against
+        :param files: The relative paths of the files whose contents matter
+        :return: True if files have been added or removed, or any of the files has changed
+        """
+        if self._structure_version > version:
+            return True
+        return any(map(lambda f: self._versions.get(f, 0) > version, files))
+
+    def get_result(self, key):
+        """
+        :param key: What the result was saved as
+        :return: The result if nothing it depends on has changed, otherwise None
+        """
+        result = self._results.get(key)
+
+        if result is None or self.changed_since(result[1], result[2]):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result[0]
+
+    def set_result(self, key, value, files: Iterable[str]):
+        """
+        :param key: What the result is saved as
+        :param value: The result, which mustn't be changed afterwards
+        :param files: The relative paths of the files the result was read from
+        """
+        self._results[key] = (value, self.version, tuple(files))
+
+    def copy(self) -> "ChangeLog":
+        changes = ChangeLog()
+        changes.version = self.version
+        changes._structure_version = self._structure_version
+        changes._versions = dict(self._versions)
+        changes._results = dict(self._results)
+        return changes
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+
+class _Document:
+    __slots__ = ("data", "dirty", "indent", "ensure_ascii")
+
+    def __init__(self, data, dirty: bool, indent=None, ensure_ascii: bool = False):
+        self.data = data
+        self.dirty = dirty
+        self.indent = indent
+        self.ensure_ascii = ensure_ascii
+
+    def serialize(self) -> bytes:
+        return json.dumps(self.data, ensure_ascii=self.ensure_ascii, indent=self.indent).encode("utf-8")
+
+
+class PackTree(abc.ABC):
+    """
+    The files of a pack that is being built. Every stage reads and writes the pack through this.
+    Paths can either be relative to the pack or absolute paths inside the pack's root.
+
+    Json files are only parsed once. Written json is kept in memory until the tree is flushed,
+    so a file that is edited many times is only serialized once.
+    Which files exist is answered by an index that is built once and kept up to date by every change.
+    """
+    root: str
+    on_disk: bool
+
+    def __init__(self, root: str):
+        self.root = os.path.normpath(root)
+        self.json_stats = JsonCacheStats()
+        self.io_stats = IOStats()
+        self._documents: dict[str, _Document] = {}
+        self._index: Optional[PackIndex] = None
+        self.changes = ChangeLog()
+
+    @property
+    def index(self) -> PackIndex:
+        if self._index is None:
+            self._index = self._build_index()
+        return self._index
+
+    def relpath(self, path: str) -> str:
+        if os.path.isabs(path):
+            return os.path.normpath(os.path.relpath(path, self.root))
+        return os.path.normpath(path)
+
+    def abspath(self, path: str) -> str:
+        return os.path.join(self.root, self.relpath(path))
+
+    def exists(self, path: str) -> bool:
+        return self.isfile(path) or self.isdir(path)
+
+    def isfile(self, path: str) -> bool:
+        return self.index.isfile(self.relpath(path))
+
+    def isdir(self, path: str) -> bool:
+        return self.index.isdir(self.relpath(path))
+
+    def files(self) -> list[str]:
+        """
+        :return: The relative path of every file in the pack
+        """
+        return self.index.files()
+
+    def glob(self, pattern: str, recursive: bool = False, regex: Optional[re.Pattern] = None) -> list[str]:
+        """
+        Finds files and folders in the same way as glob
+        :param pattern: A glob pattern relative to the pack
+        :param recursive: If '**' matches any amount of folders
+        :param regex: If set, only paths that it matches from the pattern's folder are kept
+        :return: The sorted absolute paths that match
+        """
+        matches = self.index.glob(self.relpath(pattern), recursive, regex)
+        return list(map(lambda p: os.path.join(self.root, p), matches))
+
+    def read_bytes(self, path: str) -> bytes:
+        relative_path = self.relpath(path)
+        document = self._documents.get(relative_path)
+
+        if document is not None and document.dirty:
+            return document.serialize()
+        return self._read_file(relative_path)
+
+    def write_bytes(self, path: str, data: bytes):
+        relative_path = self.relpath(path)
+        self._documents.pop(relative_path, None)
+        self.changes.record(relative_path, not self.isfile(relative_path))
+        self._write_bytes(relative_path, data)
+        self.index.add_file(relative_path)
+
+        self.io_stats.files_written += 1
+        self.io_stats.bytes_written += len(data)
+
+    def read_json(self, path: str):
+        """
+        Parses a json file. The returned data is shared, so it must be written back if it is changed.
+        :param path: The path of the file
+        :return: The parsed data
+        """
+        relative_path = self.relpath(path)
+        document = self._documents.get(relative_path)
+
+        if document is not None:
+            self.json_stats.hits += 1
+            return document.data
+
+        self.json_stats.misses += 1
+        start_time = default_timer()
+        data = json.loads(self._read_file(relative_path).decode("utf-8"))
+        self.json_stats.parse_time += default_timer() - start_time
+
+        self._documents[relative_path] = _Document(data, False)
+        return data
+
+    def get_cached_json(self, path: str):
+        """
+        :return: The parsed data of a json file if it has already been parsed, otherwise None
+        """
+        document = self._documents.get(self.relpath(path))
+        if document is None:
+            return None
+        return document.data
+
+    def write_json(self, path: str, data, indent=None, ensure_ascii: bool = False):
+        relative_path = self.relpath(path)
+
+        self.changes.record(relative_path, not self.isfile(relative_path))
+
+        # The file's contents are written when the tree is flushed
+        if not self.isfile(relative_path):
+            self._write_bytes(relative_path, b"")
+            self.index.add_file(relative_path)
+        self._documents[relative_path] = _Document(data, True, indent, ensure_ascii)
+        self.io_stats.files_written += 1
+
+    def flush(self):
+        """
+        Writes every changed json file
+        """
+        for relative_path, document in self._documents.items():
+            if document.dirty:
+                data = document.serialize()
+                self._write_bytes(relative_path, data)
+                document.dirty = False
+                self.json_stats.writes += 1
+                self.io_stats.bytes_written += len(data)
+
+    def copy_file(self, src: str, path: str):
+        """
+        Adds a file from outside the pack
+        :param src: The file to add
+        :param path: Where the file goes in the pack
+        """
+        relative_path = self.relpath(path)
+        self._documents.pop(relative_path, None)
+        self.changes.record(relative_path, not self.isfile(relative_path))
+        self._copy_file(src, relative_path)
+        self.index.add_file(relative_path)
+
+        self.io_stats.files_written += 1
+        self.io_stats.bytes_written += os.path.getsize(src)
+
+    def remove(self, path: str):
+        relative_path = self.relpath(path)
+        self._documents.pop(relative_path, None)
+        self._remove(relative_path)
+        self.index.remove_file(relative_path)
+        self.changes.record(relative_path, True)
+        self.io_stats.files_removed += 1
+
+    def rmtree(self, path: str):
+        relative_path = self.relpath(path)
+        prefix = relative_path + os.sep
+
+        for document in list(self._documents.keys()):
+            if document.startswith(prefix):
+                del self._documents[document]
+        self._rmtree(relative_path)
+        self.io_stats.files_removed += self.index.remove_folder(relative_path)
+        self.changes.record(relative_path, True)
+
+    def remove_empty_folders(self) -> int:
+        """
+        Removes every folder without any files in it
+        :return: The amount of folders removed
+        """
+        empty_folders = self.index.get_empty_folders()
+
+        for folder in empty_folders:
+            self._rmdir(folder)
+            self.index.remove_folder(folder)
+            self.changes.record(folder, True)
+        return len(empty_folders)
+
+    def hash_file(self, path: str) -> str:
+        relative_path = self.relpath(path)
+        document = self._documents.get(relative_path)
+
+        if document is not None and document.dirty:
+            return hashlib.sha256(document.serialize()).hexdigest()
+        return self._hash_file(relative_path)
+
+    def is_unmodified(self, path: str) -> bool:
+        """
+        :return: True if the file is known to still match the source pack
+        """
+        relative_path = self.relpath(path)
+        document = self._documents.get(relative_path)
+
+        if document is not None and document.dirty:
+            return False
+        return self._is_unmodified(relative_path)
+
+    def get_size(self, path: str) -> int:
+        relative_path = self.relpath(path)
+        document = self._documents.get(relative_path)
+
+        if document is not None and document.dirty:
+            return len(document.serialize())
+        return self._get_size(relative_path)
+
+    @abc.abstractmethod
+    def fork(self, root: str, copy_mode: CopyMode = CopyMode.COPY,
+             exclude: Optional[Callable[[str], bool]] = None) -> "PackTree":
+        """
+        Creates a copy of the pack that can be changed without changing this pack
+        :param root: Where the copy is on disk
+        :param copy_mode: How files are copied
+        :param exclude: Files that it returns True for aren't copied
+        :return: The copy
+        """
+
+    @abc.abstractmethod
+    def _build_index(self) -> PackIndex:
+        pass
+
+    def _read_file(self, relative_path: str) -> bytes:
+        data = self._read_bytes(relative_path)
+        self.io_stats.files_read += 1
+        self.io_stats.bytes_read += len(data)
+        return data
+
+    @abc.abstractmethod
+    def _read_bytes(self, relative_path: str) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def _write_bytes(self, relative_path: str, data: bytes):
+        pass
+
+    @abc.abstractmethod
+    def _copy_file(self, src: str, relative_path: str):
+        pass
+
+    @abc.abstractmethod
+    def _remove(self, relative_path: str):
+        pass
+
+    @abc.abstractmethod
+    def _rmtree(self, relative_path: str):
+        pass
+
+    @abc.abstractmethod
+    def _rmdir(self, relative_path: str):
+        pass
+
+    def _hash_file(self, relative_path: str) -> str:
+        return hashlib.sha256(self._read_bytes(relative_path)).hexdigest()
+
+    @abc.abstractmethod
+    def _get_size(self, relative_path: str) -> int:
+        pass
+
+    def _is_unmodified(self, relative_path: str) -> bool:
+        return False
+
+
+class DiskTree(PackTree):
+    """
+    A pack that has been copied to a folder. Files must only be changed through the tree once it's created,
+    otherwise the index won't know about them.
+    """
+    on_disk = True
+
+    def __init__(self, root: str, files: Optional[Iterable[str]] = None):
+        """
+        :param root: The pack's folder
+        :param files: The relative path of every file in the folder if they're already known
+        """
+        super().__init__(root)
+        if files is not None:
+            self._index = PackIndex(map(os.path.normpath, files))
+
+    def _build_index(self) -> PackIndex:
+        files = []
+        folders = []
+
+        for directory, folder_names, file_names in os.walk(self.root, followlinks=True):
+            relative_directory = os.path.relpath(directory, self.root)
+            if relative_directory == ".":
+                relative_directory = ""
+
+            # Hidden files and folders are skipped, the same as walk_files
+            folder_names[:] = filter(lambda f: not f.startswith("."), folder_names)
+            file_names = filter(lambda f: not f.startswith("."), file_names)
+
+            folders += map(lambda f: os.path.join(relative_directory, f), folder_names)
+            files += map(lambda f: os.path.join(relative_directory, f), file_names)
+        return PackIndex(files, folders)
+
+    def _read_bytes(self, relative_path: str) -> bytes:
+        with open(os.path.join(self.root, relative_path), "rb") as file:
+            return file.read()
+
+    def fork(self, root: str, copy_mode: CopyMode = CopyMode.COPY,
+             exclude: Optional[Callable[[str], bool]] = None) -> "DiskTree":
+        self.flush()
+        copy_tree(self.root, root, copy_mode, exclude=exclude)
+        tree = DiskTree(root, filter(lambda f: exclude is None or not exclude(f), self.files()))
+
+        # Empty folders and excluded files aren't copied, so results that found them can't be reused
+        if len(tree.index) == len(self.index):
+            tree.changes = self.changes.copy()
+        return tree
+
+    def _write_bytes(self, relative_path: str, data: bytes):
+        file = os.path.join(self.root, relative_path)
+
+        # Files could be hard linked to another pack
+        if os.path.lexists(file):
+            os.remove(file)
+
+        with open(file, "wb") as output:
+            output.write(data)
+
+    def _copy_file(self, src: str, relative_path: str):
+        file = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+
+        if os.path.lexists(file):
+            os.remove(file)
+        shutil.copy(src, file)
+
+    def _remove(self, relative_path: str):
+        os.remove(os.path.join(self.root, relative_path))
+
+    def _rmtree(self, relative_path: str):
+        shutil.rmtree(os.path.join(self.root, relative_path))
+
+    def _rmdir(self, relative_path: str):
+        os.rmdir(os.path.join(self.root, relative_path))
+
+    def _hash_file(self, relative_path: str) -> str:
+        return hash_file(os.path.join(self.root, relative_path))
+
+    def _get_size(self, relative_path: str) -> int:
+        return os.path.getsize(os.path.join(self.root, relative_path))
+
+
+class _Entry:
+    __slots__ = ("source", "data")
+
+    def __init__(self, source: Optional[str] = None, data: Optional[bytes] = None):
+        self.source = source
+        self.data = data
+
+
+class MemoryTree(PackTree):
+    """
+    A pack that is only kept in memory. Files are read from their source when needed,
+    and nothing is written to disk until the pack is saved or zipped.
+    """
+    on_disk = False
+
+    def __init__(self, root: str, source_dir: str, entries: dict[str, _Entry]):
+        super().__init__(root)
+        self.source_dir = source_dir
+        self.entries = entries
+
+    @staticmethod
+    def load(src: str, root: str, files: Optional[list[tuple[str, int]]] = None) -> "MemoryTree":
+        """
+        Creates a tree of the files in a folder without reading them
+        :param src: The folder to load
+        :param root: Where the pack would be on disk
+        :param files: The files in the folder if they have already been found
+        :return: The loaded tree
+        """
+        if files is None:
+            files = walk_files(src)
+
+        entries = {}
+        for file, size in files:
+            # Hidden files are never part of the pack
+            if not is_hidden(file):
+                entries[os.path.normpath(file)] = _Entry(os.path.join(src, file))
+        return MemoryTree(root, src, entries)
+
+    def fork(self, root: str, copy_mode: CopyMode = CopyMode.COPY,
+             exclude: Optional[Callable[[str], bool]] = None) -> "MemoryTree":
+        self.flush()
+
+        # Entries are replaced instead of changed, so they can be shared
+        if exclude is None:
+            tree = MemoryTree(root, self.source_dir, dict(self.entries))
+        else:
+            tree = MemoryTree(root, self.source_dir, dict(filter(lambda e: not exclude(e[0]), self.entries.items())))
+
+        # Results that found excluded files can't be reused
+        if len(tree.entries) == len(self.entries):
+            tree.changes = self.changes.copy()
+        return tree
+
+    def _build_index(self) -> PackIndex:
+        return PackIndex(self.entries.keys())
+
+    def _read_bytes(self, relative_path: str) -> bytes:
+        entry = self.entries.get(relative_path)
+
+        if entry is None:
+            raise FileNotFoundError(os.path.join(self.root, relative_path))
+        if entry.data is not None:
+            return entry.data
+
+        with open(entry.source, "rb") as file:
+            return file.read()
+
+    def _write_bytes(self, relative_path: str, data: bytes):
+        self.entries[relative_path] = _Entry(data=data)
+
+    def _copy_file(self, src: str, relative_path: str):
+        self.entries[relative_path] = _Entry(source=src)
+
+    def _remove(self, relative_path: str):
+        if relative_path not in self.entries:
+            raise FileNotFoundError(os.path.join(self.root, relative_path))
+        del self.entries[relative_path]
+
+    def _rmtree(self, relative_path: str):
+        for file in self.index.under(relative_path):
+            self.entries.pop(file, None)
+
+    def _rmdir(self, relative_path: str):
+        # Folders only exist in the index
+        pass
+
+    def _get_size(self, relative_path: str) -> int:
+        entry = self.entries[relative_path]
+
+        if entry.data is not None:
+            return len(entry.data)
+        return os.path.getsize(entry.source)
+
+    def _is_unmodified(self, relative_path: str) -> bool:
+        entry = self.entries[relative_path]
+        return entry.data is None and entry.source == os.path.join(self.source_dir, relative_path)
+
+    def save(self, copy_mode: CopyMode = CopyMode.COPY):
+        """
+        Writes the pack to its root folder
+        :param copy_mode: How unchanged files are copied from the source
+        """
+        self.flush()
+        unchanged_files = []
+
+        for file, entry in self.entries.items():
+            if entry.data is None and entry.source == os.path.join(self.source_dir, file):
+                unchanged_files.append((file, 0))
+                continue
+
+            file_dest = os.path.join(self.root, file)
+            os.makedirs(os.path.dirname(file_dest), exist_ok=True)
+
+            if entry.data is None:
+                shutil.copy(entry.source, file_dest)
+            else:
+                with open(file_dest, "wb") as output:
+                    output.write(entry.data)
+
+        # Unchanged files are copied straight from the source pack
+        copy_files(self.source_dir, self.root, unchanged_files, copy_mode)
+
+    def write_zip(self, dest: str, compression_level: Optional[int] = None,
+                  stored_extensions: Iterable[str] = STORED_EXTENSIONS, deterministic: bool = False) -> ZipStats:
+        """
+        Zips the pack without writing it to disk first
+        :param dest: The zip file
+        :param compression_level: The zlib compression level
+        :param stored_extensions: The file extensions that are stored without compression
+        :param deterministic: If every file gets the same time and permissions
+        :return: The amount of files and bytes zipped
+        """
+        self.flush()
+
+        if deterministic:
+            fixed_date_time = get_fixed_date_time()
+            date_time = fixed_date_time
+        else:
+            fixed_date_time = None
+            date_time = time.localtime(time.time())[:6]
+
+        with ZipWriter(dest, compression_level, stored_extensions, fixed_date_time=fixed_date_time) as zip_writer:
+            for file, entry in sorted(self.entries.items()):
+                if entry.data is None:
+                    zip_writer.add_file(entry.source, file)
+                else:
+                    zip_writer.add_data(file, entry.data, date_time)
+
+        return zip_writer.stats
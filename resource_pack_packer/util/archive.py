@@ -0,0 +1,263 @@
+import os
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from resource_pack_packer.util.manifest import hash_file
+
+# These barely shrink when deflated, so they are stored as is
+STORED_EXTENSIONS = (".png", ".ogg")
+# The earliest time a zip can store
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+# The records of the zip format, the same as zipfile writes them
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+ZIP64_END_RECORD = struct.Struct("<4sQ2H2L4Q")
+ZIP64_END_LOCATOR = struct.Struct("<4sLQL")
+ZIP64_EXTRA_ID = 1
+ZIP64_VERSION = 45
+# Names that aren't ascii are stored as utf-8
+UTF8_FLAG = 0x800
+# Sizes, offsets and counts past these need the zip64 records
+ZIP64_LIMIT = zipfile.ZIP64_LIMIT
+ZIP_FILECOUNT_LIMIT = zipfile.ZIP_FILECOUNT_LIMIT
+
+
+def _get_dos_date_time(date_time: tuple) -> tuple[int, int]:
+    return (date_time[0] - 1980) << 9 | date_time[1] << 5 | date_time[2], \
+        date_time[3] << 11 | date_time[4] << 5 | date_time[5] // 2
+
+
+def _encode_name(info: zipfile.ZipInfo) -> tuple[bytes, int]:
+    try:
+        return info.filename.encode("ascii"), info.flag_bits
+    except UnicodeEncodeError:
+        return info.filename.encode("utf-8"), info.flag_bits | UTF8_FLAG
+
+
+def _get_zip64_extra(values: list[int]) -> bytes:
+    if len(values) == 0:
+        return b""
+    return struct.pack(f"<HH{len(values)}Q", ZIP64_EXTRA_ID, 8 * len(values), *values)
+
+
+def get_fixed_date_time() -> tuple:
+    """
+    Gets the time used for every file in a deterministic zip.
+    SOURCE_DATE_EPOCH is used if it's set.
+    :return: The date and time of every file
+    """
+    if "SOURCE_DATE_EPOCH" in os.environ:
+        return max(ZIP_EPOCH, time.gmtime(int(os.environ["SOURCE_DATE_EPOCH"]))[:6])
+    else:
+        return ZIP_EPOCH
+
+
+class ZipStats:
+    def __init__(self):
+        self.files = 0
+        self.size = 0
+        self.compressed_size = 0
+
+    def __str__(self) -> str:
+        return f"{self.files} files ({self.size / 1048576:.1f} MiB -> {self.compressed_size / 1048576:.1f} MiB)"
+
+
+class ZipWriter:
+    """
+    Writes a zip file while its members are compressed on a pool of workers.
+    Members are written in the same order that they are added, so the same input always gives the same zip.
+    If a fixed date and time is given, every member also gets the same time and permissions.
+    The zip's records are written here rather than by zipfile, since zipfile can't add members that are already
+    compressed.
+    """
+
+    def __init__(self, dest: str, compression_level: Optional[int] = None,
+                 stored_extensions: Iterable[str] = STORED_EXTENSIONS, workers: Optional[int] = None,
+                 fixed_date_time: Optional[tuple] = None):
+        if not os.path.exists(os.path.dirname(dest)):
+            os.makedirs(os.path.dirname(dest))
+
+        if compression_level is None:
+            compression_level = zlib.Z_DEFAULT_COMPRESSION
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        self.compression_level = compression_level
+        self.stored_extensions = tuple(map(lambda e: e.lower(), stored_extensions))
+        self.fixed_date_time = fixed_date_time
+        self.stats = ZipStats()
+
+        self._file = open(dest, "wb")
+        self._members: list[zipfile.ZipInfo] = []
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = deque()
+        # Limits how many compressed members are held in memory
+        self._max_pending = workers * 4
+
+    def add_file(self, src: str, name: str):
+        """
+        Adds a file from disk
+        :param src: The file to add
+        :param name: The path of the file in the zip
+        """
+        self._submit(self._compress_file, src, name)
+
+    def add_data(self, name: str, data: bytes, date_time: tuple, mode: int = 0o644):
+        """
+        Adds a file from memory
+        :param name: The path of the file in the zip
+        :param data: The contents of the file
+        :param date_time: The modification time of the file
+        :param mode: The permissions of the file
+        """
+        info = zipfile.ZipInfo(name, date_time)
+        info.external_attr = (mode & 0xFFFF) << 16
+        self._submit(self._compress, info, data)
+
+    def close(self):
+        while len(self._pending) > 0:
+            self._write_next()
+
+        self._executor.shutdown()
+        self._write_central_directory()
+        self._file.close()
+
+    def _submit(self, function, *args):
+        self._pending.append(self._executor.submit(function, *args))
+
+        while len(self._pending) > self._max_pending:
+            self._write_next()
+
+    def _compress_file(self, src: str, name: str) -> tuple[zipfile.ZipInfo, bytes]:
+        info = zipfile.ZipInfo.from_file(src, name)
+
+        with open(src, "rb") as file:
+            data = file.read()
+        return self._compress(info, data)
+
+    def _compress(self, info: zipfile.ZipInfo, data: bytes) -> tuple[zipfile.ZipInfo, bytes]:
+        if self.fixed_date_time is not None:
+            info.date_time = self.fixed_date_time
+            info.external_attr = 0o644 << 16
+            # The same on every platform
+            info.create_system = 3
+
+        info.file_size = len(data)
+        info.CRC = zlib.crc32(data)
+
+        if info.filename.lower().endswith(self.stored_extensions):
+            info.compress_type = zipfile.ZIP_STORED
+            compressed = data
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+            compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, -15)
+            compressed = compressor.compress(data) + compressor.flush()
+
+        info.compress_size = len(compressed)
+        return info, compressed
+
+    def _write_next(self):
+        info, compressed = self._pending.popleft().result()
+        name, flag_bits = _encode_name(info)
+        date, time_ = _get_dos_date_time(info.date_time)
+        file_size = info.file_size
+        compress_size = info.compress_size
+        extra = b""
+
+        # Sizes that don't fit are moved to the zip64 extra field
+        if file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+            extra = _get_zip64_extra([file_size, compress_size])
+            file_size = compress_size = 0xFFFFFFFF
+            info.extract_version = max(info.extract_version, ZIP64_VERSION)
+            info.create_version = max(info.create_version, ZIP64_VERSION)
+
+        info.header_offset = self._file.tell()
+        self._file.write(LOCAL_HEADER.pack(b"PK\x03\x04", info.extract_version, info.reserved, flag_bits,
+                                           info.compress_type, time_, date, info.CRC, compress_size, file_size,
+                                           len(name), len(extra)))
+        self._file.write(name)
+        self._file.write(extra)
+        self._file.write(compressed)
+        self._members.append(info)
+
+        self.stats.files += 1
+        self.stats.size += info.file_size
+        self.stats.compressed_size += info.compress_size
+
+    def _write_central_directory(self):
+        start = self._file.tell()
+
+        for info in self._members:
+            name, flag_bits = _encode_name(info)
+            date, time_ = _get_dos_date_time(info.date_time)
+            file_size = info.file_size
+            compress_size = info.compress_size
+            header_offset = info.header_offset
+            zip64_values = []
+
+            if file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+                zip64_values += [file_size, compress_size]
+                file_size = compress_size = 0xFFFFFFFF
+            if header_offset > ZIP64_LIMIT:
+                zip64_values.append(header_offset)
+                header_offset = 0xFFFFFFFF
+
+            extract_version = info.extract_version
+            create_version = info.create_version
+            if len(zip64_values) > 0:
+                extract_version = max(extract_version, ZIP64_VERSION)
+                create_version = max(create_version, ZIP64_VERSION)
+
+            extra = _get_zip64_extra(zip64_values)
+            self._file.write(CENTRAL_HEADER.pack(b"PK\x01\x02", create_version, info.create_system, extract_version,
+                                                 info.reserved, flag_bits, info.compress_type, time_, date, info.CRC,
+                                                 compress_size, file_size, len(name), len(extra), 0, 0,
+                                                 info.internal_attr, info.external_attr, header_offset))
+            self._file.write(name)
+            self._file.write(extra)
+
+        end = self._file.tell()
+        count = len(self._members)
+        size = end - start
+
+        if count > ZIP_FILECOUNT_LIMIT or start > ZIP64_LIMIT or size > ZIP64_LIMIT:
+            self._file.write(ZIP64_END_RECORD.pack(b"PK\x06\x06", ZIP64_END_RECORD.size - 12, ZIP64_VERSION,
+                                                   ZIP64_VERSION, 0, 0, count, count, size, start))
+            self._file.write(ZIP64_END_LOCATOR.pack(b"PK\x06\x07", 0, end, 1))
+            count = min(count, 0xFFFF)
+            size = min(size, 0xFFFFFFFF)
+            start = min(start, 0xFFFFFFFF)
+
+        self._file.write(END_RECORD.pack(b"PK\x05\x06", 0, 0, count, count, size, start, 0))
+
+    def __enter__(self) -> "ZipWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown()
+            self._file.close()
+
+
+def write_checksum(archive: str) -> str:
+    """
+    Writes the hash of a zip next to it in the same format as sha256sum
+    :param archive: The zip file
+    :return: The sha256 hex digest of the zip
+    """
+    archive_hash = hash_file(archive)
+
+    with open(archive + ".sha256", "w", encoding="utf-8") as file:
+        file.write(f"{archive_hash}  {os.path.basename(archive)}\n")
+    return archive_hash
@@ -0,0 +1,159 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from timeit import default_timer
+from typing import Callable, Iterable, Optional
+
+# Stages rewrite these in place, so they can't share an inode with the source pack
+LINK_UNSAFE_EXTENSIONS = (".json", ".mcmeta")
+
+
+class CopyMode(Enum):
+    COPY = "copy"
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+
+
+class CopyStats:
+    def __init__(self, files: int, size: int, seconds: float):
+        self.files = files
+        self.size = size
+        self.seconds = seconds
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.files} files ({self.size / 1048576:.1f} MiB) in {self.seconds:.3f} seconds, " \
+               f"{self.files_per_second:.0f} files/s, {self.bytes_per_second / 1048576:.1f} MiB/s"
+
+
+def get_default_workers() -> int:
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def is_hidden(relative_path: str) -> bool:
+    """
+    :param relative_path: A path relative to the directory being walked
+    :return: True if the file or any folder it's in is hidden, which glob skips
+    """
+    return any(map(lambda p: p.startswith("."), os.path.normpath(relative_path).split(os.sep)))
+
+
+def walk_files(src: str) -> list[tuple[str, int]]:
+    """
+    Lists every file in a directory. Hidden files and folders are skipped, the same as glob.
+    :param src: The directory to walk
+    :return: The relative path and size of every file
+    """
+    files = []
+    directories = [""]
+
+    while len(directories) > 0:
+        directory = directories.pop()
+
+        with os.scandir(os.path.join(src, directory)) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                relative_path = os.path.join(directory, entry.name)
+
+                if entry.is_dir():
+                    directories.append(relative_path)
+                elif entry.is_file():
+                    files.append((relative_path, entry.stat().st_size))
+
+    return files
+
+
+def _reflink_file(src: str, dest: str):
+    with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+        remaining = os.fstat(src_file.fileno()).st_size
+
+        while remaining > 0:
+            copied = os.copy_file_range(src_file.fileno(), dest_file.fileno(), remaining)
+
+            if copied == 0:
+                break
+            remaining -= copied
+
+    shutil.copymode(src, dest)
+
+
+def _copy_file(src: str, dest: str, mode: CopyMode):
+    if mode == CopyMode.HARDLINK and not src.endswith(LINK_UNSAFE_EXTENSIONS):
+        try:
+            os.link(src, dest)
+            return
+        # Different filesystems or links aren't supported
+        except OSError:
+            pass
+    elif mode == CopyMode.REFLINK and hasattr(os, "copy_file_range"):
+        try:
+            _reflink_file(src, dest)
+            return
+        except OSError:
+            pass
+
+    shutil.copy(src, dest)
+
+
+def copy_files(src: str, dest: str, files: Iterable[tuple[str, int]], mode: CopyMode = CopyMode.COPY,
+               workers: Optional[int] = None) -> CopyStats:
+    """
+    Copies files between directories on a bounded pool of workers
+    :param src: The directory to copy from
+    :param dest: The directory to copy to
+    :param files: The relative path and size of every file to copy
+    :param mode: How the files are copied
+    :param workers: The max amount of files copied at once
+    :return: The amount of files and bytes copied
+    """
+    start_time = default_timer()
+    files = list(files)
+
+    # Every directory is only made once
+    directories = set(map(lambda f: os.path.dirname(os.path.join(dest, f[0])), files))
+    for directory in sorted(directories):
+        os.makedirs(directory, exist_ok=True)
+
+    def copy(file: tuple[str, int]):
+        file_dest = os.path.join(dest, file[0])
+
+        if os.path.lexists(file_dest):
+            os.remove(file_dest)
+        _copy_file(os.path.join(src, file[0]), file_dest, mode)
+
+    if workers is None:
+        workers = get_default_workers()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Raises any errors from the workers
+        for _ in executor.map(copy, files):
+            pass
+
+    return CopyStats(len(files), sum(map(lambda f: f[1], files)), default_timer() - start_time)
+
+
+def copy_tree(src: str, dest: str, mode: CopyMode = CopyMode.COPY, workers: Optional[int] = None,
+              exclude: Optional[Callable[[str], bool]] = None) -> CopyStats:
+    """
+    Copies every file in a directory
+    :param src: The directory to copy from
+    :param dest: The directory to copy to
+    :param mode: How the files are copied
+    :param workers: The max amount of files copied at once
+    :param exclude: Files that it returns True for aren't copied
+    :return: The amount of files and bytes copied
+    """
+    files = walk_files(src)
+
+    if exclude is not None:
+        files = list(filter(lambda f: not exclude(f[0]), files))
+    return copy_files(src, dest, files, mode, workers)
@@ -0,0 +1,220 @@
+from typing import Tuple, Union
+
+from resource_pack_packer.selectors import Direction
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Smaller batches are faster without numpy
+MIN_VECTORIZED_ELEMENTS = 32
+
+
+def get_cube_direction(from_pos: Tuple[int], to_pos: Tuple[int]) -> Union[str, None]:
+    """
+    Takes a cube's position and returns which side of a block it's on
+    :param from_pos: The cube's from position
+    :param to_pos: The cube's to position
+    :return: The direction as a string. If no direction is found, then it will be None
+    """
+    if from_pos == [0, 0, 0] and to_pos == [16, 16, 16]:
+        return "center"
+    if from_pos[0] >= 0 and to_pos[0] <= 16 and from_pos[2] >= 0 and to_pos[2] <= 16:
+        if from_pos[1] <= 0:
+            return "down"
+        elif from_pos[1] >= 16:
+            return "up"
+    elif from_pos[0] >= 0 and to_pos[0] <= 16 and from_pos[1] >= 0 and to_pos[1] <= 16:
+        if from_pos[2] <= 0:
+            return "north"
+        elif from_pos[2] >= 16:
+            return "south"
+    elif from_pos[2] >= 0 and to_pos[2] <= 16 and from_pos[1] >= 0 and to_pos[1] <= 16:
+        if from_pos[0] <= 0:
+            return "west"
+        elif from_pos[0] >= 16:
+            return "east"
+
+    return None
+
+
+def _use_numpy(elements: list) -> bool:
+    return numpy is not None and len(elements) >= MIN_VECTORIZED_ELEMENTS
+
+
+def _load(positions: list[list]) -> tuple:
+    # Which values are ints is kept, so that they're saved the same way as without numpy
+    values = numpy.array(positions, dtype=numpy.float64)
+    ints = numpy.array(list(map(lambda p: list(map(lambda v: type(v) is int, p)), positions)), dtype=bool)
+    return values, ints
+
+
+def _store(values, ints) -> list[list]:
+    positions = []
+
+    for row, int_row in zip(values.tolist(), ints.tolist()):
+        positions.append(list(map(lambda v, i: int(v) if i else v, row, int_row)))
+    return positions
+
+
+def translate_elements(elements: list[dict], offset: list):
+    """
+    Moves every element of a model
+    :param elements: The model's elements, which are edited
+    :param offset: The x, y and z offset
+    """
+    if not _use_numpy(elements):
+        for element in elements:
+            element["from"] = [element["from"][0] + offset[0], element["from"][1] + offset[1],
+                               element["from"][2] + offset[2]]
+            element["to"] = [element["to"][0] + offset[0], element["to"][1] + offset[1], element["to"][2] + offset[2]]
+        return
+
+    offset_values = numpy.array(offset, dtype=numpy.float64)
+    offset_ints = numpy.array(list(map(lambda v: type(v) is int, offset)), dtype=bool)
+
+    for key in ("from", "to"):
+        values, ints = _load(list(map(lambda e: e[key], elements)))
+
+        for element, position in zip(elements, _store(values + offset_values, ints & offset_ints)):
+            element[key] = position
+
+
+def flip_elements(elements: list[dict], origin: list, axes: list[bool]):
+    """
+    Mirrors the position of every element of a model. Faces aren't changed.
+    :param elements: The model's elements, which are edited
+    :param origin: The point that elements are mirrored around
+    :param axes: If the x, y and z axes are flipped
+    """
+    if not _use_numpy(elements):
+        for element in elements:
+            for axis in range(3):
+                if axes[axis]:
+                    from_pos = element["from"][axis]
+                    to_pos = element["to"][axis]
+                    element["from"][axis] = origin[axis] + (origin[axis] - to_pos)
+                    element["to"][axis] = origin[axis] + (origin[axis] - from_pos)
+        return
+
+    origin_values = numpy.array(origin, dtype=numpy.float64)
+    origin_ints = numpy.array(list(map(lambda v: type(v) is int, origin)), dtype=bool)
+    flipped = numpy.array(axes, dtype=bool)
+
+    from_values, from_ints = _load(list(map(lambda e: e["from"], elements)))
+    to_values, to_ints = _load(list(map(lambda e: e["to"], elements)))
+
+    new_from = numpy.where(flipped, origin_values + (origin_values - to_values), from_values)
+    new_to = numpy.where(flipped, origin_values + (origin_values - from_values), to_values)
+    new_from_ints = numpy.where(flipped, origin_ints & to_ints, from_ints)
+    new_to_ints = numpy.where(flipped, origin_ints & from_ints, to_ints)
+
+    for element, from_pos, to_pos in zip(elements, _store(new_from, new_from_ints), _store(new_to, new_to_ints)):
+        element["from"][:] = from_pos
+        element["to"][:] = to_pos
+
+
+def add_margins(models: list[tuple[list[dict], list[float], list[float]]]):
+    """
+    Moves the elements on the sides of blocks outwards, so that they don't z-fight with neighbouring blocks.
+    Every model is offset at once.
+    :param models: The elements of each model, which are edited, along with the north, east, south, west, up
+    and down offsets of the model and the offset of each element
+    """
+    all_elements = []
+    for elements, _, _ in models:
+        all_elements += elements
+
+    if not _use_numpy(all_elements):
+        for elements, face_offsets, element_offsets in models:
+            _add_model_margins(elements, face_offsets, element_offsets)
+        return
+
+    counts = list(map(lambda m: len(m[0]), models))
+    face_offsets = numpy.repeat(numpy.array(list(map(lambda m: m[1], models)), dtype=numpy.float64), counts, axis=0)
+    element_offsets = numpy.array(sum(map(lambda m: list(m[2]), models), []), dtype=numpy.float64)
+
+    from_values, from_ints = _load(list(map(lambda e: e["from"], all_elements)))
+    to_values, to_ints = _load(list(map(lambda e: e["to"], all_elements)))
+
+    # The same checks as get_cube_direction
+    center = numpy.all(from_values == 0, axis=1) & numpy.all(to_values == 16, axis=1)
+    inside_x = (from_values[:, 0] >= 0) & (to_values[:, 0] <= 16)
+    inside_y = (from_values[:, 1] >= 0) & (to_values[:, 1] <= 16)
+    inside_z = (from_values[:, 2] >= 0) & (to_values[:, 2] <= 16)
+    vertical = ~center & inside_x & inside_z
+    horizontal_z = ~center & ~(inside_x & inside_z) & inside_x & inside_y
+    horizontal_x = ~center & ~(inside_x & inside_z) & ~(inside_x & inside_y) & inside_z & inside_y
+
+    below = from_values[:, 1] <= 0
+    behind = from_values[:, 2] <= 0
+    left = from_values[:, 0] <= 0
+    directions = (
+        # North, east, south, west, up and down
+        (horizontal_z & behind, from_values, from_ints, 2, -1),
+        (horizontal_x & ~left & (from_values[:, 0] >= 16), to_values, to_ints, 0, 1),
+        (horizontal_z & ~behind & (from_values[:, 2] >= 16), to_values, to_ints, 2, 1),
+        (horizontal_x & left, from_values, from_ints, 0, -1),
+        (vertical & ~below & (from_values[:, 1] >= 16), to_values, to_ints, 1, 1),
+        (vertical & below, from_values, from_ints, 1, -1)
+    )
+
+    # Every mask is found before any position is moved
+    for face, (mask, values, ints, axis, sign) in enumerate(directions):
+        if sign < 0:
+            values[mask, axis] -= face_offsets[mask, face]
+        else:
+            values[mask, axis] += face_offsets[mask, face]
+        ints[mask, axis] = False
+
+    for axis in range(3):
+        mask = ~center & (from_values[:, axis] == 0)
+        from_values[mask, axis] -= element_offsets[mask]
+        from_ints[mask, axis] = False
+
+    for axis in range(3):
+        mask = ~center & (to_values[:, axis] == 16)
+        to_values[mask, axis] += element_offsets[mask]
+        to_ints[mask, axis] = False
+
+    for element, from_pos, to_pos in zip(all_elements, _store(from_values, from_ints), _store(to_values, to_ints)):
+        element["from"][:] = from_pos
+        element["to"][:] = to_pos
+
+
+def _add_model_margins(elements: list[dict], face_offsets: list[float], element_offsets: list[float]):
+    north_offset, east_offset, south_offset, west_offset, up_offset, down_offset = face_offsets
+
+    for element, calculated_offset in zip(elements, element_offsets):
+        position_from = element["from"]
+        position_to = element["to"]
+        direction = get_cube_direction(position_from, position_to)
+        # Move cubes
+        if direction != Direction.CENTER.value:
+            # Center of block offset
+            if direction == Direction.NORTH.value:
+                position_from[2] -= north_offset
+            elif direction == Direction.EAST.value:
+                position_to[0] += east_offset
+            elif direction == Direction.SOUTH.value:
+                position_to[2] += south_offset
+            elif direction == Direction.WEST.value:
+                position_from[0] -= west_offset
+            elif direction == Direction.UP.value:
+                position_to[1] += up_offset
+            elif direction == Direction.DOWN.value:
+                position_from[1] -= down_offset
+            # Center of face offset
+            if position_from[0] == 0:
+                position_from[0] -= calculated_offset
+            if position_from[1] == 0:
+                position_from[1] -= calculated_offset
+            if position_from[2] == 0:
+                position_from[2] -= calculated_offset
+            if position_to[0] == 16:
+                position_to[0] += calculated_offset
+            if position_to[1] == 16:
+                position_to[1] += calculated_offset
+            if position_to[2] == 16:
+                position_to[2] += calculated_offset
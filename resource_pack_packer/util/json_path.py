@@ -0,0 +1,174 @@
+import copy
+import json
+import re
+from typing import Optional, Union
+
+from resource_pack_packer.util.regex import compile_regex
+
+SEGMENT_REGEX = re.compile(r"(?P<key>[^\[]*)(?:\[(?P<filter_key>[^=\]]+)(?:=(?P<filter_value>[^\]]*))?])?")
+
+
+def _get_children(node) -> list[tuple[Union[dict, list], Union[str, int]]]:
+    if isinstance(node, dict):
+        return list(map(lambda k: (node, k), node.keys()))
+    elif isinstance(node, list):
+        return list(map(lambda i: (node, i), range(len(node))))
+    return []
+
+
+def _matches_filter(value, expected: str) -> bool:
+    # Strings are compared as they are, everything else as json
+    if isinstance(value, str):
+        return value == expected
+    return json.dumps(value) == expected
+
+
+class _PathSegment:
+    def __init__(self, key: str, filter_key: Optional[str] = None, filter_value: Optional[str] = None):
+        self.key = key
+        self.filter_key = filter_key
+        self.filter_value = filter_value
+
+    @property
+    def is_plain(self) -> bool:
+        return self.key not in ("*", "**") and self.filter_key is None
+
+    def _filter(self, container: Union[dict, list], key: Union[str, int]) -> bool:
+        if self.filter_key is None:
+            return True
+
+        child = container[key]
+        if not isinstance(child, dict) or self.filter_key not in child:
+            return False
+        return self.filter_value is None or _matches_filter(child[self.filter_key], self.filter_value)
+
+    def get_index(self, node) -> Optional[Union[str, int]]:
+        """
+        :param node: A json object or list
+        :return: The key or index that the segment refers to in the node, or None if it can't
+        """
+        if isinstance(node, dict):
+            return self.key
+        elif isinstance(node, list):
+            try:
+                index = int(self.key)
+            except ValueError:
+                return None
+
+            if -len(node) <= index < len(node):
+                return index
+        return None
+
+    def locate(self, nodes: list) -> list[tuple[Union[dict, list], Union[str, int]]]:
+        """
+        :param nodes: The json objects and lists to search
+        :return: The container and key of every child that matches the segment
+        """
+        locations = []
+
+        for node in nodes:
+            if self.key == "*":
+                locations += _get_children(node)
+            elif self.key == "**":
+                # Every descendant in the order they appear
+                stack = list(reversed(_get_children(node)))
+
+                while len(stack) > 0:
+                    container, key = stack.pop()
+                    locations.append((container, key))
+                    stack += reversed(_get_children(container[key]))
+            else:
+                index = self.get_index(node)
+
+                if index is not None and (isinstance(node, list) or index in node):
+                    locations.append((node, index))
+
+        return list(filter(lambda l: self._filter(l[0], l[1]), locations))
+
+
+class JsonPath:
+    """
+    A location in json files, which is parsed once and can be used with any amount of files.
+    Segments are split by '/' and can be:
+    a key, a list index, '*' for every child or '**' for every descendant.
+    A segment can end with a filter, like '*[texture=#all]' or '*[cullface]',
+    which only keeps objects with that key and value.
+    """
+
+    def __init__(self, location: str):
+        self.location = location
+        self.segments = []
+
+        for segment in location.split("/"):
+            match = SEGMENT_REGEX.fullmatch(segment)
+            if match is None:
+                raise ValueError(f"Invalid json path: {location}")
+            self.segments.append(_PathSegment(**match.groupdict()))
+
+    def find(self, root) -> list[tuple[Union[dict, list], Union[str, int]]]:
+        """
+        :param root: The parsed json file
+        :return: The container and key of every match
+        """
+        nodes = [root]
+
+        for segment in self.segments[:-1]:
+            nodes = list(map(lambda l: l[0][l[1]], segment.locate(nodes)))
+        return self.segments[-1].locate(nodes)
+
+    def set(self, root, data, merge: bool = False, add: bool = True):
+        """
+        Sets every match to a value
+        :param root: The parsed json file
+        :param data: The new value
+        :param merge: If objects are merged with the new value instead of being replaced
+        :param add: If missing objects are created, when the rest of the path is only keys
+        """
+        # Data is copied into every match, since files are kept until the pack is flushed and might change again
+        nodes = [root]
+
+        for i, segment in enumerate(self.segments[:-1]):
+            next_nodes = []
+
+            for node in nodes:
+                locations = segment.locate([node])
+
+                if len(locations) == 0 and add and isinstance(node, dict) and \
+                        all(map(lambda s: s.is_plain, self.segments[i:])):
+                    new_json = copy.deepcopy(data)
+                    for remaining_segment in reversed(self.segments[i:]):
+                        new_json = {remaining_segment.key: new_json}
+                    node |= new_json
+
+                next_nodes += list(map(lambda l: l[0][l[1]], locations))
+            nodes = next_nodes
+
+        final_segment = self.segments[-1]
+        for node in nodes:
+            if final_segment.is_plain:
+                index = final_segment.get_index(node)
+                locations = [] if index is None else [(node, index)]
+            else:
+                locations = final_segment.locate([node])
+
+            for container, key in locations:
+                existing = container.get(key) if isinstance(container, dict) else container[key]
+
+                if merge and isinstance(data, dict) and isinstance(existing, dict):
+                    existing |= copy.deepcopy(data)
+                else:
+                    container[key] = copy.deepcopy(data)
+
+    def replace(self, root, select: str, replacement: str):
+        """
+        Replaces text in every match that's a string
+        :param root: The parsed json file
+        :param select: The regex to replace
+        :param replacement: What the regex is replaced with
+        """
+        for container, key in self.find(root):
+            if isinstance(container[key], str):
+                container[key] = compile_regex(select).sub(replacement, container[key])
+
+    def __str__(self) -> str:
+        return self.location
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+from typing import Iterable, Optional
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(src: str) -> str:
+    """
+    Hashes the contents of a file
+    :param src: The path of the file
+    :return: The sha256 hex digest of the file
+    """
+    file_hash = hashlib.sha256()
+    with open(src, "rb") as file:
+        for chunk in iter(lambda: file.read(1048576), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def hash_data(data) -> str:
+    """
+    Hashes json serializable data in a stable way
+    :param data: Json serializable data
+    :return: The sha256 hex digest of the data
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _scan_file(file: str, old_info: Optional[dict]) -> dict:
+    stat = os.stat(file)
+
+    if old_info is not None and old_info["size"] == stat.st_size and old_info["mtime"] == stat.st_mtime_ns:
+        file_hash = old_info["hash"]
+    else:
+        file_hash = hash_file(file)
+
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": file_hash
+    }
+
+
+def scan_files(directory: str, previous: Optional[dict] = None) -> dict:
+    """
+    Records the size, modification time and hash of every file in a directory.
+    Hashes from the previous scan are reused if the size and modification time didn't change.
+    :param directory: The directory to scan
+    :param previous: The files of a previous scan
+    :return: A dict of relative paths to file info
+    """
+    if previous is None:
+        previous = {}
+
+    files = {}
+
+    for root, dirs, file_names in os.walk(directory):
+        # Hidden files and folders aren't copied, so they aren't scanned either
+        dirs[:] = filter(lambda d: not d.startswith("."), dirs)
+
+        for file_name in filter(lambda f: not f.startswith("."), file_names):
+            file = os.path.join(root, file_name)
+            relative_file = os.path.relpath(file, directory)
+            files[relative_file] = _scan_file(file, previous.get(relative_file))
+    return files
+
+
+def update_scan(directory: str, previous: dict, paths: Iterable[str]) -> dict:
+    """
+    Scans only the files and folders that are known to have changed since a previous scan,
+    so the rest of the directory isn't walked
+    :param directory: The directory that was scanned
+    :param previous: The files of the previous scan
+    :param paths: The absolute paths of the files and folders that changed. Paths outside the directory are skipped.
+    :return: A dict of relative paths to file info
+    """
+    files = dict(previous)
+
+    for path in paths:
+        relative_path = os.path.relpath(path, directory)
+
+        # Everything could have changed
+        if relative_path == os.curdir:
+            return scan_files(directory, previous)
+        if relative_path.split(os.sep)[0] == os.pardir or \
+                any(map(lambda p: p.startswith("."), relative_path.split(os.sep))):
+            continue
+
+        # A folder that changed is scanned again
+        prefix = relative_path + os.sep
+        for file in list(filter(lambda f: f == relative_path or f.startswith(prefix), files.keys())):
+            del files[file]
+
+        if os.path.isdir(path):
+            folder_previous = dict(map(lambda f: (os.path.relpath(f, relative_path), previous[f]),
+                                       filter(lambda f: f.startswith(prefix), previous.keys())))
+            for file, info in scan_files(path, folder_previous).items():
+                files[os.path.join(relative_path, file)] = info
+        elif os.path.isfile(path):
+            files[relative_path] = _scan_file(path, previous.get(relative_path))
+    return files
+
+
+class BuildManifest:
+    """
+    Records the state of a config's last build, so that unchanged files don't have to be rebuilt.
+    """
+
+    def __init__(self, inputs: str, files: dict, touched: list[str]):
+        self.inputs = inputs
+        self.files = files
+        self.touched = set(touched)
+
+    def diff(self, files: dict) -> tuple[set[str], set[str], set[str]]:
+        """
+        Compares a new scan of the source pack to the manifest
+        :param files: The new scan of the source pack
+        :return: The changed, added and removed files
+        """
+        changed = set()
+        added = set()
+
+        for file, info in files.items():
+            if file not in self.files:
+                added.add(file)
+            elif self.files[file]["hash"] != info["hash"]:
+                changed.add(file)
+
+        removed = set(self.files.keys()) - set(files.keys())
+        return changed, added, removed
+
+    def save(self, src: str):
+        if not os.path.exists(os.path.dirname(src)):
+            os.makedirs(os.path.dirname(src))
+
+        with open(src, "w", encoding="utf-8") as file:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "inputs": self.inputs,
+                "files": self.files,
+                "touched": sorted(self.touched)
+            }, file, ensure_ascii=False)
+
+    @staticmethod
+    def load(src: str) -> Optional["BuildManifest"]:
+        if not os.path.exists(src):
+            return None
+
+        try:
+            with open(src, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+
+        return BuildManifest(data["inputs"], data["files"], data["touched"])
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from multiprocessing import Pool
+from typing import Iterable, Optional
+
+from resource_pack_packer.tree import PackTree
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MINIFIED_EXTENSIONS = (".json", ".mcmeta", ".lang")
+JSON_EXTENSIONS = (".json", ".mcmeta")
+# Smaller chunks cost more to send to a process than they take to minify
+MIN_CHUNK_SIZE = 64
+MINIFY_CACHE_VERSION = 1
+# orjson turns integers that don't fit in 64 bits into floats
+LONG_NUMBER_REGEX = re.compile(rb"[0-9]{19}")
+
+
+def _parse_json(data: bytes):
+    text = data.decode("utf-8")
+
+    # orjson is stricter, so anything it can't parse is tried again with the stdlib.
+    # Both give the same data, so the output is the same either way.
+    if orjson is not None and LONG_NUMBER_REGEX.search(data) is None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def minify_data(file: str, data: bytes) -> Optional[bytes]:
+    """
+    Removes the formatting of a json or lang file
+    :param file: The path of the file
+    :param data: The file's contents
+    :return: The minified contents, or None if the file isn't valid
+    """
+    if file.endswith(".lang"):
+        # Empty lines and comments are skipped by the game
+        lines = data.split(b"\n")
+        return b"\n".join(filter(lambda l: l not in (b"", b"\r") and not l.startswith(b"#"), lines))
+
+    try:
+        return json.dumps(_parse_json(data), ensure_ascii=False).encode("utf-8")
+    except ValueError:
+        return None
+
+
+def _minify_chunk(chunk: list[tuple[str, bytes]]) -> list[Optional[bytes]]:
+    return list(map(lambda f: minify_data(f[0], f[1]), chunk))
+
+
+class MinifyCache:
+    """
+    Remembers the hashes of files that are already minified, so that they aren't parsed again
+    """
+
+    def __init__(self, minified: Optional[Iterable[str]] = None):
+        """
+        :param minified: The hashes of the files that were already minified in the last build
+        """
+        self.minified = set() if minified is None else set(minified)
+        self.hits = 0
+        self._used = set()
+
+    def is_minified(self, key: str) -> bool:
+        if key in self.minified:
+            self._used.add(key)
+            self.hits += 1
+            return True
+        return False
+
+    def add(self, key: str):
+        self._used.add(key)
+
+    def save(self, src: str):
+        # Files that weren't in this build are dropped
+        if not os.path.exists(os.path.dirname(src)):
+            os.makedirs(os.path.dirname(src))
+
+        with open(src, "w", encoding="utf-8") as file:
+            json.dump({"version": MINIFY_CACHE_VERSION, "minified": sorted(self._used)}, file)
+
+    @staticmethod
+    def load(src: str) -> "MinifyCache":
+        if not os.path.exists(src):
+            return MinifyCache()
+
+        try:
+            with open(src, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return MinifyCache()
+
+        if data.get("version") != MINIFY_CACHE_VERSION:
+            return MinifyCache()
+
+        return MinifyCache(data["minified"])
+
+
+def minify_files(pack: PackTree, files: Iterable[str], logger: logging.Logger, cache_dir: Optional[str] = None,
+                 workers: Optional[int] = None) -> int:
+    """
+    Minifies every json, mcmeta and lang file. Files are minified in parallel.
+    :param pack: The pack to minify
+    :param files: The files to minify. Files with other extensions are skipped.
+    :param logger: The logger that invalid files are reported to
+    :param cache_dir: Where the hashes of already minified files are kept between builds
+    :param workers: The max amount of processes, the cpu count if None
+    :return: The amount of files that were changed
+    """
+    cache = MinifyCache() if cache_dir is None else MinifyCache.load(cache_dir)
+    pending_files = []
+    minified = 0
+
+    for file in files:
+        if not file.endswith(MINIFIED_EXTENSIONS):
+            continue
+
+        # Files that have already been parsed are only serialized again
+        data = pack.get_cached_json(file)
+        if data is not None and file.endswith(JSON_EXTENSIONS):
+            pack.write_json(file, data, indent=None, ensure_ascii=False)
+            minified += 1
+            continue
+
+        file_data = pack.read_bytes(file)
+        key = hashlib.sha256(file_data).hexdigest()
+
+        if not cache.is_minified(key):
+            pending_files.append((pack.relpath(file), file_data, key))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunk_size = max(MIN_CHUNK_SIZE, math.ceil(len(pending_files) / (workers * 4)))
+    chunks = []
+
+    for i in range(0, len(pending_files), chunk_size):
+        chunks.append(list(map(lambda f: (f[0], f[1]), pending_files[i:i + chunk_size])))
+
+    # A single chunk isn't worth starting a pool for
+    if len(chunks) <= 1 or workers == 1:
+        chunk_results = map(_minify_chunk, chunks)
+    else:
+        with Pool(processes=min(workers, len(chunks))) as p:
+            chunk_results = p.map(_minify_chunk, chunks)
+
+    results = []
+    for chunk_result in chunk_results:
+        results += chunk_result
+
+    for (file, file_data, key), result in zip(pending_files, results):
+        if result is None:
+            logger.warning(f"Couldn't minify invalid file: {file}")
+        elif result == file_data:
+            cache.add(key)
+        else:
+            pack.write_bytes(file, result)
+            cache.add(hashlib.sha256(result).hexdigest())
+            minified += 1
+
+    if cache_dir is not None:
+        cache.save(cache_dir)
+        logger.info(f"Skipped {cache.hits} already minified file(s)")
+    return minified
@@ -0,0 +1,59 @@
+import re
+import threading
+from collections import OrderedDict
+
+# The most patterns that are kept compiled at once
+REGEX_CACHE_SIZE = 256
+
+
+class RegexCache:
+    """
+    Compiled patterns shared by patches and selectors, so a pattern is only compiled once.
+    The least recently used patterns are dropped once the cache is full.
+    """
+
+    def __init__(self, max_size: int = REGEX_CACHE_SIZE):
+        self.max_size = max_size
+        self.compiles = 0
+        self.saved = 0
+        self._patterns: OrderedDict[tuple[str, int], re.Pattern] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, pattern: str, flags: int = 0) -> re.Pattern:
+        key = (pattern, flags)
+
+        with self._lock:
+            compiled = self._patterns.get(key)
+
+            if compiled is not None:
+                self._patterns.move_to_end(key)
+                self.saved += 1
+                return compiled
+
+            compiled = re.compile(pattern, flags)
+            self.compiles += 1
+            self._patterns[key] = compiled
+
+            if len(self._patterns) > self.max_size:
+                self._patterns.popitem(last=False)
+            return compiled
+
+    def reset_stats(self):
+        self.compiles = 0
+        self.saved = 0
+
+    def __str__(self) -> str:
+        return f"{self.compiles} compiled, {self.saved} compiles saved"
+
+
+REGEX_CACHE = RegexCache()
+
+
+def compile_regex(pattern: str, flags: int = 0) -> re.Pattern:
+    """
+    Compiles a pattern, or reuses it if it's already been compiled
+    :param pattern: The regex
+    :param flags: The regex flags
+    :return: The compiled pattern
+    """
+    return REGEX_CACHE.compile(pattern, flags)
@@ -0,0 +1,99 @@
+import cProfile
+import json
+import os
+from contextlib import contextmanager
+from timeit import default_timer
+from typing import Optional
+
+
+class StageTimer:
+    """
+    Records how long each stage of a build takes.
+    Every stage is also recorded as a span, which can be saved as a Chrome trace.
+    """
+
+    def __init__(self, name: str = "", pid: int = 0, profile_dir: Optional[str] = None):
+        """
+        :param name: The name of the build in the trace
+        :param pid: The row of the build in the trace
+        :param profile_dir: Where a cProfile dump of each stage is saved, if set
+        """
+        self.name = name
+        self.pid = pid
+        self.profile_dir = profile_dir
+        self.stages: dict[str, float] = {}
+        self.spans: list[dict] = []
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, name: str, tree=None, **args):
+        """
+        Times a stage. Stages inside of another stage are only recorded as spans.
+        :param name: The name of the stage
+        :param tree: The pack that the files and bytes are counted from
+        :param args: Extra info about the stage, which can be added to while it runs
+        """
+        if tree is not None:
+            before = tree.io_stats.to_dict()
+
+        # Only one profiler can run at a time
+        profiler = None
+        if self.profile_dir is not None and self._depth == 0:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        self._depth += 1
+        start_time = default_timer()
+
+        try:
+            yield args
+        finally:
+            seconds = default_timer() - start_time
+            self._depth -= 1
+
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+
+            if tree is not None:
+                for key, value in tree.io_stats.to_dict().items():
+                    if value != before[key]:
+                        args[key] = value - before[key]
+
+            if self._depth == 0:
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+            self.spans.append({
+                "name": name,
+                "cat": "stage" if self._depth == 0 else "substage",
+                "ph": "X",
+                "ts": start_time * 1000000,
+                "dur": seconds * 1000000,
+                "pid": self.pid,
+                "tid": 0,
+                "args": args
+            })
+
+    def get_trace_events(self) -> list[dict]:
+        """
+        :return: The spans, along with the name of the build
+        """
+        return [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.name}}] + self.spans
+
+
+def save_trace(src: str, timers: list[StageTimer]):
+    """
+    Saves the spans of builds as a Chrome trace, which can be opened in chrome://tracing or Perfetto
+    :param src: The trace file
+    :param timers: The timers of each build
+    """
+    events = []
+    for timer in timers:
+        events += timer.get_trace_events()
+
+    if os.path.dirname(src) != "" and not os.path.exists(os.path.dirname(src)):
+        os.makedirs(os.path.dirname(src))
+
+    with open(src, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
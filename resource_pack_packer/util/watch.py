@@ -0,0 +1,237 @@
+import abc
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from typing import Optional
+
+# Changes closer together than this are rebuilt together
+WATCH_DEBOUNCE = 0.2
+# How often folders are checked without inotify
+WATCH_POLL_INTERVAL = 0.5
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+             IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        # Checks that inotify is available
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher(abc.ABC):
+    """
+    Waits for files in folders to change. Hidden files and folders are ignored, since they aren't part of the pack.
+    """
+
+    def __init__(self, directories: list[str]):
+        self.directories = list(filter(os.path.isdir, directories))
+
+    def wait(self, debounce: float = WATCH_DEBOUNCE) -> set[str]:
+        """
+        Waits until a file changes, and then until no file has changed for the debounce time
+        :param debounce: The seconds without changes before returning
+        :return: The paths that changed
+        """
+        changes = set()
+        while len(changes) == 0:
+            changes |= self._poll(None)
+
+        while True:
+            new_changes = self._poll(debounce)
+            if len(new_changes) == 0:
+                return changes
+            changes |= new_changes
+
+    def close(self):
+        pass
+
+    @abc.abstractmethod
+    def _poll(self, timeout: Optional[float]) -> set[str]:
+        """
+        :param timeout: The most seconds to wait for a change, or None to wait until a file changes
+        :return: The paths that changed
+        """
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class InotifyWatcher(FileWatcher):
+    """
+    Watches folders with inotify, so that changes are seen straight away
+    """
+
+    def __init__(self, directories: list[str], libc: ctypes.CDLL):
+        super().__init__(directories)
+        self._libc = libc
+        self._watches: dict[int, str] = {}
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "Couldn't start inotify")
+
+        try:
+            for directory in self.directories:
+                self._add_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: str):
+        watch = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+
+        if watch < 0:
+            raise OSError(ctypes.get_errno(), f"Couldn't watch folder: {directory}")
+        self._watches[watch] = directory
+
+    def _add_tree(self, directory: str) -> set[str]:
+        """
+        Watches a folder and every folder in it, since inotify doesn't watch folders recursively
+        :return: The files that are already in the folders
+        """
+        files = set()
+
+        for folder, dirs, file_names in os.walk(directory):
+            self._add_watch(folder)
+            dirs[:] = filter(lambda d: not d.startswith("."), dirs)
+            files |= set(map(lambda f: os.path.join(folder, f), filter(lambda f: not f.startswith("."), file_names)))
+        return files
+
+    def _poll(self, timeout: Optional[float]) -> set[str]:
+        readable = select.select([self._fd], [], [], timeout)[0]
+        if len(readable) == 0:
+            return set()
+
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return set()
+
+        changes = set()
+        offset = 0
+
+        while offset < len(data):
+            watch, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + name_length
+
+            # Events were lost, so anything could have changed
+            if mask & IN_Q_OVERFLOW:
+                changes |= set(self.directories)
+                continue
+
+            directory = self._watches.get(watch)
+            # Editor swap files and version control shouldn't start a build
+            if directory is None or name.startswith(b"."):
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if len(name) > 0 else directory
+            changes.add(path)
+
+            # New folders have to be watched, and files could've been added before the watch was
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    changes |= self._add_tree(path)
+                except OSError:
+                    pass
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                del self._watches[watch]
+
+        return changes
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(FileWatcher):
+    """
+    Watches folders by checking the modification time of every file
+    """
+
+    def __init__(self, directories: list[str], interval: float = WATCH_POLL_INTERVAL):
+        super().__init__(directories)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+
+        for directory in self.directories:
+            for folder, dirs, file_names in os.walk(directory):
+                dirs[:] = filter(lambda d: not d.startswith("."), dirs)
+
+                for file_name in filter(lambda f: not f.startswith("."), file_names):
+                    path = os.path.join(folder, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll(self, timeout: Optional[float]) -> set[str]:
+        start_time = time.monotonic()
+
+        while True:
+            if timeout is None:
+                time.sleep(self.interval)
+            else:
+                time.sleep(max(0.0, min(self.interval, timeout - (time.monotonic() - start_time))))
+
+            snapshot = self._scan()
+            changes = set(filter(lambda p: self._snapshot.get(p) != snapshot.get(p),
+                                 self._snapshot.keys() | snapshot.keys()))
+            self._snapshot = snapshot
+
+            if len(changes) > 0 or (timeout is not None and time.monotonic() - start_time >= timeout):
+                return changes
+
+
+def create_watcher(directories: list[str], logger: logging.Logger) -> FileWatcher:
+    """
+    Watches folders with inotify if it's available, otherwise by polling
+    :param directories: The folders to watch. Folders that don't exist are skipped.
+    :param logger: The logger that the fallback is reported to
+    :return: The watcher, which must be closed
+    """
+    libc = _load_libc()
+
+    if libc is not None:
+        try:
+            return InotifyWatcher(directories, libc)
+        except OSError as error:
+            logger.warning(f"Couldn't use inotify, checking for changes every {WATCH_POLL_INTERVAL} seconds: {error}")
+
+    return PollingWatcher(directories)
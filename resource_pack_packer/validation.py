@@ -1,15 +1,25 @@
+import hashlib
 import json
 import logging
+import math
 import os
 from enum import Enum
 from functools import singledispatch
-from glob import glob
 from multiprocessing import Pool
-from typing import Optional
+from typing import Callable, Optional
 
 import jsonschema
 from resource_pack_packer.console import add_to_logger_name
 import resource_pack_packer.settings
+from resource_pack_packer.selectors import parse_minecraft_identifier
+from resource_pack_packer.tree import PackTree
+from resource_pack_packer.util.copy import walk_files
+from resource_pack_packer.util.manifest import hash_file
+
+
+# The least amount of files that are sent to a worker at once
+MIN_CHUNK_SIZE = 64
+VALIDATION_CACHE_VERSION = 2
 
 
 class AssetType(Enum):
@@ -52,24 +62,164 @@ class AssetType(Enum):
                 return os.path.join("minecraft", "assets", "sounds.schema.json")
 
 
-def validate(pack: str, logger_name: str):
+class AssetIndex:
+    """
+    Every model, blockstate and texture that can be referenced, so references can be checked without the disk.
+    """
+
+    def __init__(self, files: set[str], namespaces: set[str], deleted: Optional[Callable[[str], bool]] = None):
+        """
+        :param files: The relative path of every asset
+        :param namespaces: The namespaces whose assets are all known
+        :param deleted: Returns True for assets that were deleted from the pack on purpose
+        """
+        self.files = files
+        self.namespaces = namespaces
+        self.deleted = deleted
+
+    def has(self, path: str) -> Optional[bool]:
+        """
+        :param path: The relative path of an asset
+        :return: If the asset exists, or None if its namespace isn't known or it was deleted on purpose
+        """
+        if path.split(os.sep)[1] not in self.namespaces:
+            return None
+        if path in self.files:
+            return True
+        # Deleted textures are expected to come from another pack
+        if self.deleted is not None and self.deleted(path):
+            return None
+        return False
+
+    @staticmethod
+    def create(pack: PackTree, mc_version: Optional[str] = None,
+               deleted: Optional[Callable[[str], bool]] = None) -> "AssetIndex":
+        """
+        Indexes a pack along with the game's assets, if they've been extracted to dev/<mc_version>
+        :param pack: The pack to index
+        :param mc_version: The version of the game the pack is built for
+        :param deleted: Returns True for assets that were deleted from the pack on purpose, like deleted textures
+        :return: The index
+        """
+        files = set()
+        namespaces = set()
+
+        for file in pack.files():
+            split_file = file.split(os.sep)
+
+            if len(split_file) > 3 and split_file[0] == "assets" and split_file[2] in ("models", "blockstates",
+                                                                                       "textures"):
+                files.add(file)
+                namespaces.add(split_file[1])
+
+        working_directory = resource_pack_packer.settings.MAIN_SETTINGS.get_property("locations", "working_directory")
+        game_dir = None
+        if mc_version is not None and working_directory is not None:
+            game_dir = os.path.join(working_directory, "dev", mc_version)
+
+        if game_dir is not None and os.path.isdir(os.path.join(game_dir, "assets")):
+            for file, _ in walk_files(os.path.join(game_dir, "assets")):
+                split_file = file.split(os.sep)
+
+                if len(split_file) > 2 and split_file[1] in ("models", "blockstates", "textures"):
+                    files.add(os.path.join("assets", file))
+                    namespaces.add(split_file[0])
+        # The game's own assets can't be checked without them
+        else:
+            namespaces.discard("minecraft")
+
+        return AssetIndex(files, namespaces, deleted)
+
+
+class ValidationCache:
+    """
+    Remembers the warnings of every validated file, so that files that haven't changed aren't validated again.
+    """
+
+    def __init__(self, results: Optional[dict] = None):
+        """
+        :param results: The key and warnings of each file from the last validation
+        """
+        self.results = {} if results is None else results
+        self.hits = 0
+        self._used = {}
+
+    def get(self, file: str, key: str) -> Optional[dict]:
+        """
+        :param file: The path of the file
+        :param key: The hash of the file's contents and schema
+        :return: The warnings and references from the last time the file was validated, or None if it changed
+        """
+        result = self.results.get(file)
+
+        if result is None or result["key"] != key:
+            return None
+
+        self._used[file] = result
+        self.hits += 1
+        return result
+
+    def set(self, file: str, key: str, result: dict):
+        self._used[file] = {"key": key, **result}
+
+    def save(self, src: str):
+        # Files that weren't validated this time are dropped
+        if not os.path.exists(os.path.dirname(src)):
+            os.makedirs(os.path.dirname(src))
+
+        with open(src, "w", encoding="utf-8") as file:
+            json.dump({"version": VALIDATION_CACHE_VERSION, "results": self._used}, file, ensure_ascii=False)
+
+    @staticmethod
+    def load(src: str) -> "ValidationCache":
+        if not os.path.exists(src):
+            return ValidationCache()
+
+        try:
+            with open(src, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return ValidationCache()
+
+        if data.get("version") != VALIDATION_CACHE_VERSION:
+            return ValidationCache()
+
+        return ValidationCache(data["results"])
+
+
+def validate(pack: PackTree, logger_name: str, cache_dir: Optional[str] = None, mc_version: Optional[str] = None,
+             deleted: Optional[Callable[[str], bool]] = None, workers: Optional[int] = None):
+    """
+    Validates the blockstates, models and sound indexes of a pack
+    :param pack: The pack to validate
+    :param logger_name: The name of the build's logger
+    :param cache_dir: Where the results are cached between builds, if set
+    :param mc_version: The version of the game whose assets can be referenced
+    :param deleted: Returns True for files that were deleted from the pack on purpose, which aren't reported missing
+    :param workers: The max amount of processes, the cpu count if None
+    """
     logger = add_to_logger_name(logger_name, "validation")
+    cache = None if cache_dir is None else ValidationCache.load(cache_dir)
+    index = AssetIndex.create(pack, mc_version, deleted)
 
-    assets_dir = os.path.join(pack, "assets", "*")
+    assets_dir = os.path.join("assets", "*")
 
     # Blockstates
     logger.info("Validating blockstates...")
-    validate_assets(assets_dir, AssetType.BLOCKSTATE, "json", logger)
+    validate_assets(pack, assets_dir, AssetType.BLOCKSTATE, "json", logger, cache, index, workers)
     logger.info("Validated blockstates.")
 
     # Models
     logger.info("Validating models...")
-    validate_assets(assets_dir, AssetType.MODEL, "json", logger)
+    validate_assets(pack, assets_dir, AssetType.MODEL, "json", logger, cache, index, workers)
     logger.info("Validated models.")
 
     # Sound index
-    validate_asset(os.path.join(assets_dir, AssetType.get_path(
-        AssetType.SOUND_INDEX)), AssetType.SOUND_INDEX, logger)
+    validate_assets(pack, assets_dir, AssetType.SOUND_INDEX, "json", logger, cache, index, workers)
+
+    if cache is not None:
+        cache.save(cache_dir)
+        logger.info(f"Reused {cache.hits} validation results.")
 
 
 def get_schema(asset_type: AssetType) -> dict:
@@ -78,22 +228,105 @@ def get_schema(asset_type: AssetType) -> dict:
     return parsed_schema
 
 
+# Each process only compiles a schema once
+_validators: dict[AssetType, jsonschema.protocols.Validator] = {}
+_schema_hashes: dict[AssetType, str] = {}
+
+
+def get_schema_hash(asset_type: AssetType) -> str:
+    """
+    :param asset_type: The type of asset
+    :return: The sha256 hex digest of the asset's schema file
+    """
+    if asset_type not in _schema_hashes:
+        _schema_hashes[asset_type] = hash_file(os.path.join(resource_pack_packer.settings.PROGRAM_PATH, "schema",
+                                                            AssetType.get_schema_path(asset_type)))
+    return _schema_hashes[asset_type]
+
+
+def get_validator(asset_type: AssetType) -> jsonschema.protocols.Validator:
+    """
+    Gets a validator for an asset's schema. The schema is only loaded and checked the first time.
+
+    :param asset_type: The type of asset
+    :return: The validator
+    """
+    validator = _validators.get(asset_type)
+
+    if validator is None:
+        schema = get_schema(asset_type)
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        validator = validator_class(schema)
+        _validators[asset_type] = validator
+    return validator
+
+
+def _get_data(pack: PackTree, file: str):
+    # Json that was already parsed during the build isn't parsed again
+    data = pack.get_cached_json(file)
+    if data is not None:
+        return data
+
+    # Packs on disk are read by the validation workers
+    if pack.on_disk:
+        return None
+    return pack.read_bytes(file)
+
+
 @singledispatch
-def validate_asset(assets_dir: str, asset_type: AssetType, logger: logging.Logger, schema: Optional[dict] = None) -> bool:
+def validate_asset(assets_dir: str, asset_type: AssetType, logger: logging.Logger, schema: Optional[dict] = None,
+                   data=None) -> bool:
+    """
+    Validates an asset against its schema.
+
+    :param assets_dir: The path of the asset
+    :param asset_type: The type of asset
+    :param logger: Where warnings are logged
+    :param schema: The asset's schema. The compiled schema is used if not set
+    :param data: The asset's parsed json or raw bytes. It's read from the path if not set
+    :return: If the asset matched its schema
+    """
     if schema is None:
-        schema = get_schema(asset_type)
+        validator = get_validator(asset_type)
+    else:
+        validator = jsonschema.validators.validator_for(schema)(schema)
 
-    file = os.path.join(assets_dir)
+    matches, warnings, _ = _check_asset(assets_dir, asset_type, validator, data)
 
-    if os.path.exists(file):
-        with open(file, "r") as raw_data:
-            data = json.load(raw_data)
+    for warning in warnings:
+        logger.warning(warning)
+    return matches
 
-        try:
-            jsonschema.validate(data, schema)
-        except jsonschema.ValidationError as e:
-            logger.warning(f"{file} didn't match schema:\n{e.message}")
-            return False
+
+def _check_asset(file: str, asset_type: AssetType, validator: jsonschema.protocols.Validator,
+                 data=None, name: Optional[str] = None) -> tuple[bool, list[str], list[list]]:
+    """
+    :param file: The path of the asset
+    :param asset_type: The type of asset
+    :param validator: The validator of the asset's schema
+    :param data: The asset's parsed json or raw bytes. It's read from the path if not set
+    :param name: How the asset is named in warnings, the path if not set
+    :return: If the asset matched its schema, the warnings and the references to other assets
+    """
+    if name is None:
+        name = file
+
+    warnings = []
+    references = []
+
+    if data is not None or os.path.exists(file):
+        if data is None:
+            with open(file, "r") as raw_file:
+                data = json.load(raw_file)
+        elif isinstance(data, bytes):
+            data = json.loads(data.decode("utf-8"))
+
+        # The same error that jsonschema.validate would raise
+        error = jsonschema.exceptions.best_match(validator.iter_errors(data))
+        if error is not None:
+            warnings.append(f"{name} didn't match schema:\n{error.message}")
+            return False, warnings, references
 
         # Asset specific checks
         match asset_type:
@@ -106,25 +339,136 @@ def validate_asset(assets_dir: str, asset_type: AssetType, logger: logging.Logge
                             for face in element["faces"].values():
                                 # Texture
                                 if "texture" in face and face["texture"] == "#missing":
-                                    logger.warning(
-                                        f"Missing texture in: {file}")
+                                    warnings.append(f"Missing texture in: {name}")
+
+        references = _get_references(asset_type, data)
+
+    return True, warnings, references
+
 
-    return True
+def _is_builtin_model(identifier: str) -> bool:
+    # Both builtin/generated and minecraft:builtin/generated are built in
+    namespace, _, path = identifier.rpartition(":")
+    return namespace in ("", "minecraft") and path.startswith("builtin/")
 
 
-def validate_assets(asset_dir: str, asset_type: AssetType, extension: str, logger: logging.Logger):
-    files = glob(os.path.join(
+def _get_references(asset_type: AssetType, data) -> list[list]:
+    """
+    Finds the other assets that an asset depends on
+    :param asset_type: The type of asset
+    :param data: The asset's parsed json
+    :return: The kind, identifier and possible paths of each reference
+    """
+    references = []
+
+    match asset_type:
+        case AssetType.MODEL:
+            # Built in models don't have files
+            if "parent" in data and not _is_builtin_model(data["parent"]):
+                references.append(["parent model", data["parent"],
+                                   [parse_minecraft_identifier(data["parent"], "models", "json")]])
+
+            if "textures" in data:
+                for texture in data["textures"].values():
+                    # Texture variables
+                    if not texture.startswith("#"):
+                        references.append(["texture", texture,
+                                           [parse_minecraft_identifier(texture, "textures", "png")]])
+        case AssetType.BLOCKSTATE:
+            models = []
+
+            if "variants" in data:
+                for variant in data["variants"].values():
+                    models += variant if isinstance(variant, list) else [variant]
+
+            if "multipart" in data:
+                for case in filter(lambda c: "apply" in c, data["multipart"]):
+                    models += case["apply"] if isinstance(case["apply"], list) else [case["apply"]]
+
+            for model in filter(lambda m: isinstance(m, dict) and "model" in m, models):
+                # Blockstates before 1.13 load models from the block folder
+                references.append(["model", model["model"], [
+                    parse_minecraft_identifier(model["model"], "models", "json"),
+                    parse_minecraft_identifier(model["model"], os.path.join("models", "block"), "json")
+                ]])
+
+    return references
+
+
+def validate_assets(pack: PackTree, asset_dir: str, asset_type: AssetType, extension: str, logger: logging.Logger,
+                    cache: Optional[ValidationCache] = None, index: Optional[AssetIndex] = None,
+                    workers: Optional[int] = None):
+    files = pack.glob(os.path.join(
         asset_dir, AssetType.get_path(asset_type)), recursive=True)
-    parsed_schema = get_schema(asset_type)
     filtered_files = []
 
     for file in files:
-        if os.path.isfile(file) and file.endswith(f".{extension}"):
-            filtered_files.append([file, asset_type, logger, parsed_schema])
+        if pack.isfile(file) and file.endswith(f".{extension}"):
+            filtered_files.append(file)
+
+    results = {}
+    keys = {}
+    pending_files = []
+
+    for file in filtered_files:
+        if cache is None:
+            pending_files.append((file, pack.relpath(file), _get_data(pack, file)))
+            continue
+
+        data = pack.read_bytes(file)
+        keys[file] = hashlib.sha256(get_schema_hash(asset_type).encode("utf-8") + data).hexdigest()
+        cached_result = cache.get(file, keys[file])
+
+        # Unchanged files only have their old warnings logged again
+        if cached_result is not None:
+            results[file] = cached_result
+        else:
+            cached_data = pack.get_cached_json(file)
+            pending_files.append((file, pack.relpath(file), data if cached_data is None else cached_data))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunk_size = max(MIN_CHUNK_SIZE, math.ceil(len(pending_files) / (workers * 4)))
+    chunks = []
+
+    for i in range(0, len(pending_files), chunk_size):
+        chunks.append((asset_type, pending_files[i:i + chunk_size]))
+
+    # A single chunk isn't worth starting a pool for
+    if len(chunks) <= 1 or workers == 1:
+        chunk_results = map(_validate_chunk, chunks)
+    else:
+        with Pool(processes=min(workers, len(chunks))) as p:
+            chunk_results = p.map(_validate_chunk, chunks)
+
+    for chunk, chunk_result in zip(chunks, chunk_results):
+        for (file, _, _), result in zip(chunk[1], chunk_result):
+            results[file] = result
+
+            if cache is not None:
+                cache.set(file, keys[file], result)
+
+    # Warnings are logged in the same order as the files
+    for file in filtered_files:
+        for warning in results[file]["warnings"]:
+            logger.warning(warning)
+
+        if index is not None:
+            for kind, identifier, paths in results[file]["references"]:
+                found = list(map(index.has, paths))
+
+                # References to namespaces that aren't known can't be checked
+                if True not in found and False in found:
+                    logger.warning(f"Missing {kind} {identifier} in: {pack.relpath(file)}")
 
-    with Pool(processes=os.cpu_count()) as p:
-        p.map(_validate_assets, filtered_files)
 
+def _validate_chunk(chunk: tuple[AssetType, list[tuple]]) -> list[dict]:
+    asset_type, files = chunk
+    validator = get_validator(asset_type)
+    results = []
 
-def _validate_assets(arg: list):
-    validate_asset(arg[0], arg[1], arg[2], arg[3])
+    # Warnings use the path relative to the pack, since in memory packs aren't on the disk
+    for file, name, data in files:
+        warnings, references = _check_asset(file, asset_type, validator, data, name)[1:]
+        results.append({"warnings": warnings, "references": references})
+    return results
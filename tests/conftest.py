@@ -0,0 +1,60 @@
+import json
+import os
+
+import pytest
+
+from resource_pack_packer.tree import DiskTree, MemoryTree, PackTree
+
+
+def _write_files(directory: str, files: dict):
+    """
+    Writes files into a directory
+    :param directory: The directory to write to
+    :param files: A dict of relative paths to bytes, text or json data
+    """
+    for file, data in files.items():
+        dest = os.path.join(directory, file)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        if isinstance(data, (dict, list)):
+            data = json.dumps(data, indent=4)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        with open(dest, "wb") as file_out:
+            file_out.write(data)
+
+
+@pytest.fixture
+def write_files():
+    """
+    Writes files into a directory
+    """
+    return _write_files
+
+
+@pytest.fixture
+def make_pack(tmp_path):
+    """
+    Creates source packs in a temporary directory
+    """
+    def make(files: dict, name: str = "src") -> str:
+        pack_dir = os.path.join(tmp_path, name)
+        os.makedirs(pack_dir, exist_ok=True)
+        _write_files(pack_dir, files)
+        return pack_dir
+    return make
+
+
+@pytest.fixture(params=["disk", "memory"])
+def make_tree(request, tmp_path, make_pack):
+    """
+    Creates pack trees of source packs, once on disk and once in memory
+    """
+    def make(files: dict) -> PackTree:
+        src = make_pack(files)
+
+        if request.param == "disk":
+            return DiskTree(src)
+        return MemoryTree.load(src, os.path.join(tmp_path, "pack"))
+    return make
@@ -0,0 +1,144 @@
+import os
+import zipfile
+
+import pytest
+
+from resource_pack_packer.util import archive
+from resource_pack_packer.util.archive import UTF8_FLAG, ZIP_EPOCH, ZipWriter, get_fixed_date_time, write_checksum
+from resource_pack_packer.util.manifest import hash_file
+
+DATE_TIME = (2001, 2, 3, 4, 5, 6)
+MEMBERS = {
+    "pack.mcmeta": b'{"pack": {"pack_format": 15, "description": ""}}',
+    "assets/minecraft/textures/block/stone.png": bytes(range(256)) * 4,
+    "assets/minecraft/lang/ünïcode.json": "{\"key\": \"välue\"}".encode("utf-8") * 100,
+    "empty.txt": b""
+}
+
+
+def _write(dest: str, members: dict = None, **kwargs) -> str:
+    with ZipWriter(dest, workers=2, **kwargs) as zip_writer:
+        for member, data in (members or MEMBERS).items():
+            zip_writer.add_data(member, data, DATE_TIME)
+    return dest
+
+
+def _check(dest: str, members: dict = None) -> zipfile.ZipFile:
+    zip_file = zipfile.ZipFile(dest)
+    assert zip_file.testzip() is None
+    assert zip_file.namelist() == list((members or MEMBERS).keys())
+
+    for member, data in (members or MEMBERS).items():
+        assert zip_file.read(member) == data
+    return zip_file
+
+
+def test_round_trip(tmp_path):
+    src = os.path.join(tmp_path, "pack.mcmeta")
+    with open(src, "wb") as file:
+        file.write(MEMBERS["pack.mcmeta"])
+    dest = os.path.join(tmp_path, "out", "pack.zip")
+
+    with ZipWriter(dest, workers=2) as zip_writer:
+        zip_writer.add_file(src, "pack.mcmeta")
+        for member, data in list(MEMBERS.items())[1:]:
+            zip_writer.add_data(member, data, DATE_TIME)
+
+    with _check(dest) as zip_file:
+        assert zip_file.getinfo("assets/minecraft/textures/block/stone.png").compress_type == zipfile.ZIP_STORED
+        assert zip_file.getinfo("pack.mcmeta").compress_type == zipfile.ZIP_DEFLATED
+        assert zip_file.getinfo("empty.txt").date_time == DATE_TIME
+
+    assert zip_writer.stats.files == len(MEMBERS)
+    assert zip_writer.stats.size == sum(map(len, MEMBERS.values()))
+
+
+def test_matches_zipfile(tmp_path):
+    # Both deflate with the same settings, so only the record layout could differ
+    expected = os.path.join(tmp_path, "expected.zip")
+
+    with zipfile.ZipFile(expected, "w") as zip_file:
+        for member, data in MEMBERS.items():
+            info = zipfile.ZipInfo(member, DATE_TIME)
+            info.external_attr = 0o644 << 16
+            if not member.endswith(".png"):
+                info.compress_type = zipfile.ZIP_DEFLATED
+            zip_file.writestr(info, data)
+
+    with open(expected, "rb") as expected_file, open(_write(os.path.join(tmp_path, "pack.zip")), "rb") as file:
+        assert file.read() == expected_file.read()
+
+
+def test_utf8_names(tmp_path):
+    with _check(_write(os.path.join(tmp_path, "pack.zip"))) as zip_file:
+        assert zip_file.getinfo("assets/minecraft/lang/ünïcode.json").flag_bits & UTF8_FLAG
+        assert not zip_file.getinfo("pack.mcmeta").flag_bits & UTF8_FLAG
+
+
+def test_zip64_sizes_and_offsets(tmp_path, monkeypatch):
+    # Real zip64 members would need over 4 GiB of data
+    monkeypatch.setattr(archive, "ZIP64_LIMIT", 64)
+    dest = _write(os.path.join(tmp_path, "pack.zip"))
+
+    with _check(dest) as zip_file:
+        for info in zip_file.infolist():
+            assert (info.extract_version >= archive.ZIP64_VERSION) == (info.file_size > 64 or info.header_offset > 64)
+
+    with open(dest, "rb") as file:
+        # The central directory starts past the limit
+        assert b"PK\x06\x06" in file.read()
+
+
+@pytest.mark.parametrize("limit", [1, len(MEMBERS) - 1])
+def test_zip64_file_count(tmp_path, monkeypatch, limit):
+    monkeypatch.setattr(archive, "ZIP_FILECOUNT_LIMIT", limit)
+    dest = _write(os.path.join(tmp_path, "pack.zip"))
+
+    _check(dest).close()
+    with open(dest, "rb") as file:
+        assert b"PK\x06\x06" in file.read()
+
+
+def test_no_zip64_records_when_small(tmp_path):
+    with open(_write(os.path.join(tmp_path, "pack.zip")), "rb") as file:
+        assert b"PK\x06\x06" not in file.read()
+
+
+def test_stored_extensions(tmp_path):
+    dest = _write(os.path.join(tmp_path, "pack.zip"), stored_extensions=[".JSON"], compression_level=9)
+
+    with _check(dest) as zip_file:
+        assert zip_file.getinfo("assets/minecraft/lang/ünïcode.json").compress_type == zipfile.ZIP_STORED
+        assert zip_file.getinfo("assets/minecraft/textures/block/stone.png").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_fixed_date_time_is_deterministic(tmp_path):
+    first = _write(os.path.join(tmp_path, "first.zip"), fixed_date_time=ZIP_EPOCH)
+    second = _write(os.path.join(tmp_path, "second.zip"), fixed_date_time=ZIP_EPOCH)
+
+    with open(first, "rb") as first_file, open(second, "rb") as second_file:
+        assert first_file.read() == second_file.read()
+
+    with _check(first) as zip_file:
+        assert set(map(lambda i: i.date_time, zip_file.infolist())) == {ZIP_EPOCH}
+        assert set(map(lambda i: i.external_attr, zip_file.infolist())) == {0o644 << 16}
+
+
+def test_source_date_epoch(monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    assert get_fixed_date_time() == ZIP_EPOCH
+
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1000000000")
+    assert get_fixed_date_time() == (2001, 9, 9, 1, 46, 40)
+
+    # Times before 1980 can't be stored
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "0")
+    assert get_fixed_date_time() == ZIP_EPOCH
+
+
+def test_write_checksum(tmp_path):
+    dest = _write(os.path.join(tmp_path, "pack.zip"))
+
+    assert write_checksum(dest) == hash_file(dest)
+    with open(dest + ".sha256", "r", encoding="utf-8") as file:
+        assert file.read() == f"{hash_file(dest)}  pack.zip\n"
@@ -0,0 +1,42 @@
+import os
+import random
+import struct
+import zlib
+
+from resource_pack_packer.benchmark.generator import BENCHMARK_CONFIG, BENCHMARK_PACK, generate_png, \
+    generate_workspace
+from resource_pack_packer.util.manifest import scan_files
+
+
+def test_generate_png():
+    png = generate_png(random.Random(0), 4)
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+
+    chunks = {}
+    offset = 8
+    while offset < len(png):
+        length, = struct.unpack(">I", png[offset:offset + 4])
+        chunk_type = png[offset + 4:offset + 8]
+        data = png[offset + 8:offset + 8 + length]
+        assert struct.unpack(">I", png[offset + 8 + length:offset + 12 + length])[0] == zlib.crc32(chunk_type + data)
+        chunks[chunk_type] = data
+        offset += length + 12
+
+    assert list(chunks.keys()) == [b"IHDR", b"IDAT", b"IEND"]
+    assert struct.unpack(">II", chunks[b"IHDR"][:8]) == (4, 4)
+    # A filter byte and four rgba pixels per row
+    assert len(zlib.decompress(chunks[b"IDAT"])) == 4 * (1 + 4 * 4)
+
+
+def test_workspace_is_the_same_for_a_seed(tmp_path):
+    scans = []
+
+    for name in ("first", "second"):
+        working_directory, minecraft_directory = generate_workspace(os.path.join(tmp_path, name), 2, 5, seed=1)
+        scans.append(list(map(lambda f: (f[0], f[1]["hash"]), scan_files(os.path.join(tmp_path, name)).items())))
+
+        assert os.path.isfile(os.path.join(working_directory, "configs", BENCHMARK_CONFIG))
+        assert os.path.isfile(os.path.join(minecraft_directory, "resourcepacks", BENCHMARK_PACK, "pack.mcmeta"))
+
+    assert sorted(scans[0]) == sorted(scans[1])
+    assert any(map(lambda f: f[0].endswith(".rpp.json"), scans[0]))
@@ -0,0 +1,25 @@
+import pytest
+
+from resource_pack_packer.configs import RunOptions
+
+
+def _run_option(**options) -> RunOptions:
+    data = {"configs": "*", "minify_json": True, "delete_empty_folders": False, "out_dir": "out"}
+    return RunOptions.parse({"test": data | options})[0]
+
+
+@pytest.mark.parametrize("options, in_memory", [
+    ({"zip_pack": True}, True),
+    ({"zip_pack": False}, False),
+    # Incremental builds need a pack on disk
+    ({"zip_pack": True, "incremental": True}, False),
+    ({"zip_pack": True, "in_memory": False}, False),
+    ({"zip_pack": False, "in_memory": True}, True)
+])
+def test_zipped_packs_are_built_in_memory(options, in_memory):
+    assert _run_option(**options).in_memory == in_memory
+
+
+def test_config_workers():
+    assert _run_option(zip_pack=True).config_workers is None
+    assert _run_option(zip_pack=True, config_workers=2).config_workers == 2
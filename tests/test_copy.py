@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from resource_pack_packer.util.copy import CopyMode, copy_files, copy_tree, is_hidden, walk_files
+from resource_pack_packer.util.manifest import scan_files
+
+HIDDEN_FILES = [".DS_Store", os.path.join(".git", "config"), os.path.join("assets", "minecraft", ".hidden.json")]
+PACK_FILES = [
+    "pack.mcmeta",
+    os.path.join("assets", "minecraft", "models", "block", "stone.json"),
+    os.path.join("assets", "minecraft", "textures", "block", "stone.png")
+]
+
+
+@pytest.fixture
+def src(make_pack):
+    return make_pack(dict(map(lambda f: (f, b"{}"), HIDDEN_FILES + PACK_FILES)))
+
+
+def _read_all(directory: str) -> dict:
+    files = {}
+    for file, size in walk_files(directory):
+        with open(os.path.join(directory, file), "rb") as file_in:
+            files[file] = file_in.read()
+    return files
+
+
+def test_walk_skips_hidden_files(src):
+    assert sorted(map(lambda f: f[0], walk_files(src))) == sorted(PACK_FILES)
+    assert sorted(scan_files(src).keys()) == sorted(PACK_FILES)
+
+
+def test_is_hidden():
+    assert all(map(is_hidden, HIDDEN_FILES))
+    assert not any(map(is_hidden, PACK_FILES))
+
+
+@pytest.mark.parametrize("mode", list(CopyMode))
+def test_copy_tree(tmp_path, src, mode):
+    dest = os.path.join(tmp_path, "dest")
+    stats = copy_tree(src, dest, mode, workers=2)
+
+    assert stats.files == len(PACK_FILES)
+    assert stats.size == 2 * len(PACK_FILES)
+    assert _read_all(dest) == _read_all(src)
+
+
+def test_copy_tree_exclude(tmp_path, src):
+    dest = os.path.join(tmp_path, "dest")
+    stats = copy_tree(src, dest, exclude=lambda f: f.endswith(".png"))
+
+    assert stats.files == len(PACK_FILES) - 1
+    assert sorted(_read_all(dest).keys()) == sorted(PACK_FILES[:2])
+
+
+def test_hardlinks_skip_rewritten_files(tmp_path, src):
+    dest = os.path.join(tmp_path, "dest")
+    copy_tree(src, dest, CopyMode.HARDLINK)
+
+    # Json files are rewritten in place by later stages
+    for file in PACK_FILES:
+        linked = os.path.samefile(os.path.join(src, file), os.path.join(dest, file))
+        assert linked == file.endswith(".png")
+
+
+def test_copy_replaces_existing_files(tmp_path, src, write_files):
+    dest = os.path.join(tmp_path, "dest")
+    write_files(dest, {"pack.mcmeta": b"old"})
+
+    copy_files(src, dest, [("pack.mcmeta", 2)])
+    assert _read_all(dest) == {"pack.mcmeta": b"{}"}
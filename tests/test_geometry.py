@@ -0,0 +1,85 @@
+import copy
+import random
+
+import pytest
+
+from resource_pack_packer.util import geometry
+from resource_pack_packer.util.geometry import add_margins, flip_elements, get_cube_direction, translate_elements
+
+
+def _elements(count: int) -> list[dict]:
+    # Cubes on every side of the block, in the center and floating, with int and float positions
+    rng = random.Random(1)
+    positions = [([0, 0, 0], [16, 16, 16]), ([0, 0, 0], [16, 1, 16]), ([0, 15, 0], [16, 16, 16]),
+                 ([0, 0, 0], [16, 16, 1]), ([0, 0, 15], [16, 16, 16]), ([0, 0, 0], [1, 16, 16]),
+                 ([15, 0, 0], [16, 16, 16]), ([4, 4, 4], [12.5, 12, 12]), ([-2, 4, 4], [8, 20, 8])]
+    elements = []
+    for i in range(count):
+        from_pos, to_pos = positions[i % len(positions)]
+        elements.append({"from": list(from_pos), "to": list(to_pos), "faces": {}, "name": rng.random()})
+    return elements
+
+
+def _both(monkeypatch, function, *args) -> tuple[list[dict], list[dict]]:
+    # Runs with and without numpy on copies of the same elements
+    pytest.importorskip("numpy")
+    loop_args = copy.deepcopy(args)
+    function(*args)
+
+    monkeypatch.setattr(geometry, "numpy", None)
+    function(*loop_args)
+    return args[0], loop_args[0]
+
+
+def _types(elements: list[dict]) -> list:
+    return list(map(lambda e: list(map(type, e["from"] + e["to"])), elements))
+
+
+@pytest.mark.parametrize("direction, from_pos, to_pos", [
+    ("center", [0, 0, 0], [16, 16, 16]),
+    ("down", [0, 0, 0], [16, 1, 16]),
+    ("up", [0, 16, 0], [16, 17, 16]),
+    ("north", [0, 0, -1], [16, 16, 0]),
+    ("east", [16, 0, 0], [17, 16, 16]),
+    (None, [4, 4, 4], [12, 12, 12])
+])
+def test_cube_direction(direction, from_pos, to_pos):
+    assert get_cube_direction(from_pos, to_pos) == direction
+
+
+@pytest.mark.parametrize("offset", [[1, 2, 3], [0.5, -1, 2]])
+def test_translate_matches_loop(monkeypatch, offset):
+    vectorized, loop = _both(monkeypatch, translate_elements, _elements(geometry.MIN_VECTORIZED_ELEMENTS), offset)
+
+    assert vectorized == loop
+    assert _types(vectorized) == _types(loop)
+
+
+def test_flip_matches_loop(monkeypatch):
+    vectorized, loop = _both(monkeypatch, flip_elements, _elements(geometry.MIN_VECTORIZED_ELEMENTS), [8, 8, 8.5],
+                             [True, False, True])
+
+    assert vectorized == loop
+    assert _types(vectorized) == _types(loop)
+
+
+def test_margins_match_loop(monkeypatch):
+    models = []
+    for i in range(4):
+        elements = _elements(geometry.MIN_VECTORIZED_ELEMENTS // 2)
+        models.append((elements, [0.01 * i, 0.02, 0.03, 0.04, 0.05, 0.06], list(map(lambda e: e["name"], elements))))
+    # A model selected twice is offset twice
+    models.append(models[0])
+
+    vectorized, loop = _both(monkeypatch, add_margins, models)
+
+    assert list(map(lambda m: m[0], vectorized)) == list(map(lambda m: m[0], loop))
+    assert vectorized[0][0][0]["from"] == [0, 0, 0]
+
+
+def test_small_batches_keep_ints():
+    elements = _elements(2)
+    translate_elements(elements, [1, 0, 0])
+
+    assert elements[0]["from"] == [1, 0, 0]
+    assert _types(elements) == [[int] * 6] * 2
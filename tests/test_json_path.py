@@ -0,0 +1,91 @@
+import pytest
+
+from resource_pack_packer.util.json_path import JsonPath
+
+
+def _model() -> dict:
+    return {
+        "textures": {"all": "test:block/a", "side": "test:block/b"},
+        "elements": [
+            {"faces": {"up": {"texture": "#all", "cullface": "up"}, "down": {"texture": "#side"}}},
+            {"faces": {"up": {"texture": "#all"}}}
+        ]
+    }
+
+
+def _values(path: str, root) -> list:
+    return list(map(lambda l: l[0][l[1]], JsonPath(path).find(root)))
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("textures/all", ["test:block/a"]),
+    ("elements/1/faces/up/texture", ["#all"]),
+    ("elements/-1/faces/up/texture", ["#all"]),
+    ("textures/*", ["test:block/a", "test:block/b"]),
+    ("elements/*/faces/*[texture=#all]/texture", ["#all", "#all"]),
+    ("elements/*/faces/*[cullface]/cullface", ["up"]),
+    ("textures/missing", []),
+    ("elements/2/faces", [])
+])
+def test_find(path, expected):
+    assert _values(path, _model()) == expected
+
+
+def test_descendants_are_in_order():
+    assert list(filter(lambda v: isinstance(v, str) and v.startswith("#"), _values("elements/**", _model()))) == \
+           ["#all", "#side", "#all"]
+
+
+def test_invalid_path():
+    with pytest.raises(ValueError):
+        JsonPath("textures/all[side")
+
+
+def test_set_creates_missing_keys():
+    model = _model()
+    JsonPath("display/gui/scale").set(model, [1, 1, 1])
+
+    assert model["display"] == {"gui": {"scale": [1, 1, 1]}}
+
+
+def test_set_with_wildcard_doesnt_create_keys():
+    model = _model()
+    JsonPath("display/*/scale").set(model, [1, 1, 1])
+    JsonPath("display/gui/scale").set(model, [1, 1, 1], add=False)
+
+    assert "display" not in model
+
+
+def test_set_merges_every_match():
+    model = _model()
+    JsonPath("elements/*/faces/up").set(model, {"tintindex": 0}, merge=True)
+
+    assert model["elements"][0]["faces"]["up"] == {"texture": "#all", "cullface": "up", "tintindex": 0}
+    assert model["elements"][1]["faces"]["up"] == {"texture": "#all", "tintindex": 0}
+
+
+def test_set_copies_data():
+    model = _model()
+    data = {"texture": "#all"}
+    JsonPath("elements/*/faces/north").set(model, data)
+    model["elements"][0]["faces"]["north"]["texture"] = "#side"
+
+    assert model["elements"][1]["faces"]["north"] == {"texture": "#all"}
+    assert data == {"texture": "#all"}
+
+
+def test_replace():
+    model = _model()
+    model["elements"][0]["faces"]["up"]["rotation"] = 90
+    JsonPath("elements/0/faces/up/*").replace(model, "^#", "#new_")
+    JsonPath("textures/missing").replace(model, "a", "b")
+
+    assert model["elements"][0]["faces"]["up"] == {"texture": "#new_all", "cullface": "up", "rotation": 90}
+    assert "missing" not in model["textures"]
+
+
+def test_replace_list():
+    root = {"list": ["a", "b", 1]}
+    JsonPath("list/*").replace(root, "[ab]", "c")
+
+    assert root["list"] == ["c", "c", 1]
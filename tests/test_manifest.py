@@ -0,0 +1,93 @@
+import os
+import shutil
+
+from resource_pack_packer.util.manifest import BuildManifest, hash_data, scan_files, update_scan
+
+FILES = {
+    "pack.mcmeta": {"pack": {"pack_format": 15, "description": ""}},
+    os.path.join("assets", "test", "textures", "block", "stone.png"): b"stone",
+    os.path.join("assets", "test", "models", "block", "stone.json"): {"parent": "block/cube_all"}
+}
+
+
+def test_diff(make_pack, write_files):
+    pack_dir = make_pack(FILES)
+    manifest = BuildManifest("inputs", scan_files(pack_dir), [])
+
+    write_files(pack_dir, {
+        "pack.mcmeta": {"pack": {"pack_format": 18, "description": ""}},
+        os.path.join("assets", "test", "lang", "en_us.json"): {}
+    })
+    os.remove(os.path.join(pack_dir, "assets", "test", "textures", "block", "stone.png"))
+
+    changed, added, removed = manifest.diff(scan_files(pack_dir, manifest.files))
+    assert changed == {"pack.mcmeta"}
+    assert added == {os.path.join("assets", "test", "lang", "en_us.json")}
+    assert removed == {os.path.join("assets", "test", "textures", "block", "stone.png")}
+
+
+def test_unchanged_files_reuse_hashes(make_pack):
+    pack_dir = make_pack(FILES)
+    previous = scan_files(pack_dir)
+    previous["pack.mcmeta"]["hash"] = "cached"
+
+    assert scan_files(pack_dir, previous)["pack.mcmeta"]["hash"] == "cached"
+
+
+def test_save_and_load(tmp_path, make_pack):
+    src = os.path.join(tmp_path, "manifests", "pack", "config.json")
+    manifest = BuildManifest(hash_data({"b": 1, "a": [2]}), scan_files(make_pack(FILES)), ["pack.mcmeta"])
+    manifest.save(src)
+
+    loaded = BuildManifest.load(src)
+    assert loaded.inputs == hash_data({"a": [2], "b": 1})
+    assert loaded.files == manifest.files
+    assert loaded.touched == {"pack.mcmeta"}
+
+
+def test_invalid_manifest_is_ignored(tmp_path, write_files):
+    src = os.path.join(tmp_path, "config.json")
+    assert BuildManifest.load(src) is None
+
+    with open(src, "w") as file:
+        file.write("{")
+    assert BuildManifest.load(src) is None
+
+    write_files(tmp_path, {"config.json": {"version": 0, "inputs": "", "files": {}, "touched": []}})
+    assert BuildManifest.load(src) is None
+
+
+def test_update_scan_only_scans_changed_paths(make_pack, write_files):
+    pack_dir = make_pack(FILES)
+    previous = scan_files(pack_dir)
+    previous["pack.mcmeta"]["hash"] = "cached"
+    texture = os.path.join("assets", "test", "textures", "block", "stone.png")
+    lang_dir = os.path.join(pack_dir, "assets", "test", "lang")
+
+    write_files(pack_dir, {
+        texture: b"granite",
+        os.path.join("assets", "test", "lang", "en_us.json"): {},
+        os.path.join("assets", "test", "lang", ".en_us.json.swp"): b""
+    })
+    os.remove(os.path.join(pack_dir, "assets", "test", "models", "block", "stone.json"))
+
+    files = update_scan(pack_dir, previous, [
+        os.path.join(pack_dir, texture),
+        lang_dir,
+        os.path.join(pack_dir, "assets", "test", "models", "block", "stone.json"),
+        os.path.join(lang_dir, ".en_us.json.swp"),
+        os.path.dirname(pack_dir)
+    ])
+
+    # Files that aren't in the changed paths aren't hashed again
+    assert files["pack.mcmeta"]["hash"] == "cached"
+    assert files == {**scan_files(pack_dir), "pack.mcmeta": files["pack.mcmeta"]}
+
+
+def test_update_scan_of_removed_folder(make_pack):
+    pack_dir = make_pack(FILES)
+    previous = scan_files(pack_dir)
+    shutil.rmtree(os.path.join(pack_dir, "assets", "test", "textures"))
+
+    files = update_scan(pack_dir, previous, [os.path.join(pack_dir, "assets", "test", "textures")])
+    assert files == scan_files(pack_dir)
@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from resource_pack_packer.tree import DiskTree
+from resource_pack_packer.util.minify import MIN_CHUNK_SIZE, MinifyCache, minify_data, minify_files
+
+MODELS = os.path.join("assets", "test", "models", "block")
+LANG = os.path.join("assets", "test", "lang", "en_us.lang")
+FILES = {
+    os.path.join(MODELS, "a.json"): {"parent": "block/cube_all", "textures": {"all": "test:block/ä"}},
+    os.path.join(MODELS, "invalid.json"): "{",
+    "pack.mcmeta": {"pack": {"pack_format": 3}},
+    LANG: "# Comment\n\ntile.a.name=A\r\n\ntile.b.name=B",
+    os.path.join("assets", "test", "textures", "a.png"): b"png"
+}
+
+
+def _minify(pack, files, **kwargs) -> int:
+    return minify_files(pack, files, logging.getLogger("test.minify"), **kwargs)
+
+
+def _minify_in_worker(root: str) -> int:
+    pack = DiskTree(root)
+    minified = _minify(pack, pack.files(), workers=2)
+    pack.flush()
+    return minified
+
+
+def test_minify_data():
+    assert minify_data("a.json", b'{\n    "a": [1, 2],\n    "b": "\\u00e4"\n}') == '{"a": [1, 2], "b": "ä"}'.encode()
+    assert minify_data("a.json", b"{") is None
+    assert minify_data("en_us.lang", b"# Comment\n\na=A\r\n\nb=B") == b"a=A\r\nb=B"
+
+
+def test_long_numbers_match_stdlib():
+    data = b'{"a": 12345678901234567890, "b": 0.1}'
+    assert minify_data("a.json", data) == json.dumps(json.loads(data)).encode()
+
+
+def test_minify_files(make_tree):
+    pack = make_tree(FILES)
+    # Json that's already parsed is only written again
+    pack.read_json("pack.mcmeta")
+
+    assert _minify(pack, pack.files()) == 3
+    pack.flush()
+
+    assert pack.read_bytes(os.path.join(MODELS, "a.json")) == \
+           '{"parent": "block/cube_all", "textures": {"all": "test:block/ä"}}'.encode()
+    assert pack.read_bytes("pack.mcmeta") == b'{"pack": {"pack_format": 3}}'
+    assert pack.read_bytes(LANG) == b"tile.a.name=A\r\ntile.b.name=B"
+    assert pack.read_bytes(os.path.join(MODELS, "invalid.json")) == b"{"
+
+
+def test_cache_skips_minified_files(make_tree, tmp_path):
+    pack = make_tree(FILES)
+    src = os.path.join(tmp_path, "cache", "config.json")
+    _minify(pack, pack.files(), cache_dir=src)
+
+    assert len(MinifyCache.load(src).minified) == 3
+    assert _minify(pack, pack.files(), cache_dir=src) == 0
+
+
+def test_minify_pool_inside_config_process(make_pack):
+    # Configs are built in these processes, which have to be able to start their own pool
+    files = {}
+    for i in range(MIN_CHUNK_SIZE * 2 + 10):
+        files[os.path.join(MODELS, f"{i:03}.json")] = {"parent": "block/cube"}
+    root = make_pack(files)
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(_minify_in_worker, root).result() == len(files)
+    with open(os.path.join(root, MODELS, "000.json"), "rb") as file:
+        assert file.read() == b'{"parent": "block/cube"}'
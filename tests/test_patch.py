@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+from types import SimpleNamespace
+
+from resource_pack_packer.patch import Patch
+
+MODELS = os.path.join("assets", "test", "models", "block")
+FILES = {
+    os.path.join(MODELS, "a.json"): {"parent": "block/cube_all"},
+    os.path.join(MODELS, "b.json"): {"parent": "block/cube_all"}
+}
+PACK_INFO = SimpleNamespace(block_files=None)
+LOGGER = logging.getLogger("test.patch")
+
+
+def _mixin(models: list[str], location: str, data, merge: bool = False, file_selector: dict = None) -> dict:
+    if file_selector is None:
+        file_selector = {"type": "identifier", "arguments": {"models": models}}
+
+    return {
+        "file_selector": file_selector,
+        "selector": {"type": "path", "arguments": {"location": location}},
+        "modifiers": [{"type": "set", "arguments": {"data": data, "merge": merge}}]
+    }
+
+
+def _run_mixins(pack, mixins: list[dict], files: set[str] = None):
+    Patch({"type": "mixin_json", "patch": {"mixins": mixins}}, "test").run(pack, LOGGER, PACK_INFO, None, files)
+    pack.flush()
+
+
+def _read(pack, name: str) -> dict:
+    return json.loads(pack.read_bytes(os.path.join(MODELS, name)))
+
+
+def test_set(make_tree):
+    pack = make_tree(FILES)
+    _run_mixins(pack, [_mixin(["test:block/a"], "textures", {"all": "test:block/a"})])
+
+    assert _read(pack, "a.json") == {"parent": "block/cube_all", "textures": {"all": "test:block/a"}}
+    assert _read(pack, "b.json") == FILES[os.path.join(MODELS, "b.json")]
+
+
+def test_overlapping_mixins_dont_share_data(make_tree):
+    pack = make_tree(FILES)
+    data = {"x": "1"}
+    _run_mixins(pack, [
+        _mixin(["test:block/a", "test:block/b"], "textures", data),
+        _mixin(["test:block/a"], "textures", {"y": "2"}, merge=True)
+    ])
+
+    assert _read(pack, "a.json")["textures"] == {"x": "1", "y": "2"}
+    assert _read(pack, "b.json")["textures"] == {"x": "1"}
+    # The patch itself isn't changed either
+    assert data == {"x": "1"}
+
+
+def test_files_are_written_once(make_tree, monkeypatch):
+    pack = make_tree(FILES)
+    writes = []
+    write_json = pack.write_json
+    monkeypatch.setattr(pack, "write_json", lambda path, *args, **kwargs: writes.append(pack.relpath(path)) or
+                        write_json(path, *args, **kwargs))
+    _run_mixins(pack, [
+        _mixin(["test:block/a", "test:block/b"], "textures", {"x": "1"}),
+        _mixin(["test:block/a"], "textures", {"y": "2"}, merge=True),
+        _mixin(["test:block/a"], "display", {})
+    ])
+
+    assert sorted(writes) == sorted(FILES.keys())
+    assert _read(pack, "a.json") == {"parent": "block/cube_all", "textures": {"x": "1", "y": "2"}, "display": {}}
+
+
+def test_blockstate_selectors_see_earlier_mixins(make_tree):
+    blockstate = os.path.join("assets", "test", "blockstates", "cube.json")
+    pack = make_tree({**FILES, blockstate: {"multipart": [{"apply": {"model": "test:block/a"}}]}})
+    _run_mixins(pack, [
+        _mixin([], "multipart", [{"apply": {"model": "test:block/b"}}],
+               file_selector={"type": "file", "arguments": {"files": [blockstate]}}),
+        _mixin([], "textures", {"all": "test:block/b"},
+               file_selector={"type": "blockstate", "arguments": {"blockstate": "test:cube"}})
+    ])
+
+    assert "textures" not in _read(pack, "a.json")
+    assert _read(pack, "b.json")["textures"] == {"all": "test:block/b"}
+
+
+def test_get_files(make_tree):
+    blockstate = os.path.join("assets", "test", "blockstates", "cube.json")
+    pack = make_tree({**FILES, blockstate: {"multipart": [{"apply": {"model": "test:block/b"}}]}})
+    patch = Patch({"type": "mixin_json", "patch": {"mixins": [
+        _mixin(["test:block/a"], "textures", {}),
+        _mixin([], "textures", {}, file_selector={"type": "blockstate", "arguments": {"blockstate": "test:cube"}})
+    ]}}, "test")
+
+    selected, read = patch.get_files(pack, PACK_INFO, LOGGER)
+    assert selected == set(FILES.keys())
+    assert read == {blockstate}
+    # Nothing is changed
+    assert _read(pack, "a.json") == FILES[os.path.join(MODELS, "a.json")]
+
+
+def test_patches_can_be_limited_to_files(make_tree):
+    pack = make_tree(FILES)
+    _run_mixins(pack, [_mixin(["test:block/a", "test:block/b"], "textures", {"all": "test:block/c"})],
+                {os.path.join(MODELS, "b.json")})
+
+    assert _read(pack, "a.json") == FILES[os.path.join(MODELS, "a.json")]
+    assert _read(pack, "b.json")["textures"] == {"all": "test:block/c"}
+
+
+def test_limited_margins_get_the_same_offsets(make_tree):
+    files = dict(map(lambda f: (f, {"elements": [{"from": [0, 0, 0], "to": [16, 0, 16], "faces": {}}]}), FILES))
+    patch = Patch({"type": "modifier", "patch": {"type": "model_margin", "arguments": {
+        "file_selector": {"type": "path", "arguments": {"path": MODELS}},
+        "offset": 0.01, "random_offset": 0.005, "seed": 3
+    }}}, "test")
+    assert patch.get_files(make_tree(files), PACK_INFO, LOGGER) == (set(files.keys()), set(files.keys()))
+
+    full_pack = make_tree(files)
+    patch.run(full_pack, LOGGER, PACK_INFO, None)
+    full_pack.flush()
+    # Packs on disk are made in the same folder
+    full_models = dict(map(lambda n: (n, _read(full_pack, n)), ["a.json", "b.json"]))
+
+    # Whichever model is selected second still gets its offsets after the first model's
+    for name, other_name in [("a.json", "b.json"), ("b.json", "a.json")]:
+        limited_pack = make_tree(files)
+        patch.run(limited_pack, LOGGER, PACK_INFO, None, {os.path.join(MODELS, name)})
+        limited_pack.flush()
+
+        assert _read(limited_pack, name) == full_models[name]
+        assert _read(limited_pack, name) != files[os.path.join(MODELS, name)]
+        assert _read(limited_pack, other_name) == files[os.path.join(MODELS, other_name)]
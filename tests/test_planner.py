@@ -0,0 +1,74 @@
+import logging
+import os
+
+import pytest
+
+from resource_pack_packer.configs import Config
+from resource_pack_packer.patch import PatchFile
+from resource_pack_packer.planner import BuildPlan, get_config_workers, get_stage_workers
+
+
+def _config(name: str, patches: list[str], textures: dict = None) -> Config:
+    data = {"mc_versions": ["1.20.1"], "pack_format": 15}
+    if textures is not None:
+        data["textures"] = textures
+
+    config = Config(data, name, logging.getLogger("test.planner"))
+    config.patches = list(map(lambda p: PatchFile([], p), patches))
+    return config
+
+
+def test_shares_common_patches():
+    configs = [_config("a", ["base", "1.20", "extra"]), _config("b", ["base", "1.20"]), _config("c", ["base", "1.19"])]
+    plan = BuildPlan.create(configs)
+
+    assert list(map(lambda p: p.name, plan.patches)) == ["base"]
+    assert not plan.preprocess
+    assert plan.shares_work()
+    assert list(map(lambda p: p.name, plan.get_patches(configs[0]))) == ["1.20", "extra"]
+    assert str(plan) == "copy, patch base"
+
+
+def test_shares_preprocessors_after_every_patch():
+    plan = BuildPlan.create([_config("a", ["base"]), _config("b", ["base"])])
+
+    assert plan.preprocess
+    assert plan.get_patches(plan.config) == []
+
+
+def test_different_textures_share_nothing():
+    configs = [_config("a", ["base"], {"delete": True}), _config("b", ["base"], {"delete": True, "ignore": ["Block"]})]
+    plan = BuildPlan.create(configs)
+
+    assert not plan.shares_work()
+    assert list(map(lambda p: p.name, plan.get_patches(configs[1]))) == ["base"]
+
+
+def test_shared_texture_deletion():
+    plan = BuildPlan.create([_config("a", [], {"delete": True, "ignore": ["Block"]}),
+                             _config("b", [], {"delete": True, "ignore": ["block"]})])
+
+    assert plan.shares_work()
+    assert str(plan) == "copy, delete textures, preprocessors"
+
+
+@pytest.mark.parametrize("config_count, on_disk, workers, expected", [
+    (1, False, None, 1),
+    (100, False, None, 4),
+    (100, True, None, 8),
+    (6, True, None, 6),
+    (100, True, 3, 3),
+    (2, False, 3, 2),
+    (5, False, 0, 1)
+])
+def test_config_workers(monkeypatch, config_count, on_disk, workers, expected):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    assert get_config_workers(config_count, on_disk, workers) == expected
+
+
+def test_stage_workers_split_the_cpus(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+
+    assert get_stage_workers(1) == 8
+    assert get_stage_workers(3) == 2
+    assert get_stage_workers(16) == 1
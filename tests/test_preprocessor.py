@@ -0,0 +1,165 @@
+import logging
+import os
+
+import pytest
+
+from resource_pack_packer.preprocessor import Model, ModelResolver, PreprocessorGraph
+
+MODELS = os.path.join("assets", "test", "models", "block")
+RPP_MODELS = os.path.join("assets", "test", "models", "rpp")
+
+ELEMENT = {"from": [0, 0, 0], "to": [16, 16, 16], "faces": {}}
+
+
+def _model(name: str) -> str:
+    return os.path.join(MODELS, f"{name}.json")
+
+
+def test_elements_come_from_closest_parent(make_tree):
+    pack = make_tree({
+        _model("base"): {"elements": [ELEMENT]},
+        _model("middle"): {"parent": "test:block/base"},
+        _model("child"): {"parent": "test:block/middle"}
+    })
+    resolver = ModelResolver(pack)
+
+    assert resolver.get_elements("test:block/child") == [ELEMENT]
+    assert resolver.find("test:block/child") == pack.abspath(_model("child"))
+
+
+def test_shared_parents_are_read_once(make_tree, monkeypatch):
+    pack = make_tree({
+        _model("base"): {"elements": [ELEMENT]},
+        _model("a"): {"parent": "test:block/base"},
+        _model("b"): {"parent": "test:block/base"}
+    })
+    reads = []
+    read_json = pack.read_json
+    monkeypatch.setattr(pack, "read_json", lambda path: reads.append(path) or read_json(path))
+    resolver = ModelResolver(pack)
+
+    resolver.get_elements("test:block/a")
+    resolver.get_elements("test:block/b")
+    assert sorted(reads) == [_model("a"), _model("b"), _model("base")]
+
+
+def test_parent_cycle_raises(make_tree):
+    pack = make_tree({
+        _model("a"): {"parent": "test:block/b"},
+        _model("b"): {"parent": "test:block/a"}
+    })
+
+    with pytest.raises(ValueError, match="cycle"):
+        ModelResolver(pack).get_elements("test:block/a")
+
+
+def test_written_models_are_resolved_again(make_tree):
+    pack = make_tree({
+        _model("base"): {"elements": [ELEMENT]},
+        _model("child"): {"parent": "test:block/base"}
+    })
+    resolver = ModelResolver(pack)
+    resolver.get_elements("test:block/child")
+
+    pack.write_json(_model("base"), {"elements": []})
+    resolver.invalidate(pack.abspath(_model("base")))
+    assert resolver.get_elements("test:block/child") == []
+
+
+def test_models_dont_share_parent_elements(make_tree):
+    pack = make_tree({
+        _model("base"): {"elements": [ELEMENT]},
+        _model("child"): {"parent": "test:block/base"}
+    })
+    resolver = ModelResolver(pack)
+
+    model = Model.parse_file(_model("child"), pack, resolver)
+    model.elements[0]["from"] = [1, 1, 1]
+    assert resolver.get_elements("test:block/base") == [ELEMENT]
+
+
+def _translate(identifier: str, model: str, x: float) -> dict:
+    return {"identifier": identifier, "modify": {"model": model, "type": "translate", "arguments": {"x": x}}}
+
+
+def _rpp_models(models: list[dict]) -> dict:
+    return dict(map(lambda m: (os.path.join(RPP_MODELS, f"{m[0]}.rpp.json"), m[1]), enumerate(models)))
+
+
+def _rpp_files(count: int) -> list[str]:
+    return list(map(lambda i: os.path.join(RPP_MODELS, f"{i}.rpp.json"), range(count)))
+
+
+def _run_graph(pack, count: int) -> PreprocessorGraph:
+    graph = PreprocessorGraph(pack, _rpp_files(count))
+    graph.run(logging.getLogger("test.preprocessor"), workers=4)
+    return graph
+
+
+def test_later_writers_wait_for_readers(make_tree):
+    # The first model reads the base model before the second one rewrites it
+    pack = make_tree({
+        _model("base"): {"elements": [ELEMENT]},
+        _model("cube"): {"elements": [ELEMENT]},
+        **_rpp_models([_translate("test:block/moved", "test:block/base", 1),
+                       _translate("test:block/base", "test:block/cube", 4)])
+    })
+    graph = _run_graph(pack, 2)
+
+    assert graph.dependencies == [set(), {0}]
+    assert pack.read_json(_model("moved"))["elements"][0]["from"] == [1, 0, 0]
+    assert pack.read_json(_model("base"))["elements"][0]["from"] == [4, 0, 0]
+    assert pack.glob(os.path.join(RPP_MODELS, "*.json")) == []
+
+
+def test_parents_of_written_models_are_followed(make_tree):
+    # The middle model is written with the grandparent as its parent, which a later model fills in
+    pack = make_tree({
+        _model("grand"): {"textures": {}},
+        _model("plain"): {"parent": "test:block/grand"},
+        _model("cube"): {"elements": [ELEMENT]},
+        **_rpp_models([{"identifier": "test:block/middle", "mixin": {"models": ["test:block/plain"]}},
+                       _translate("test:block/grand", "test:block/cube", 2),
+                       _translate("test:block/moved", "test:block/middle", 3)])
+    })
+    graph = _run_graph(pack, 3)
+
+    assert graph.dependencies == [set(), {0}, {0, 1}]
+    assert pack.read_json(_model("middle"))["parent"] == "test:block/grand"
+    assert pack.read_json(_model("moved"))["elements"][0]["from"] == [5, 0, 0]
+
+
+def test_only_affected_models_run_again(make_tree):
+    pack = make_tree({
+        _model("base"): {"elements": [ELEMENT]},
+        _model("cube"): {"elements": [ELEMENT]},
+        **_rpp_models([_translate("test:block/moved", "test:block/base", 1),
+                       _translate("test:block/flipped", "test:block/cube", 2),
+                       _translate("test:block/top", "test:block/moved", 3)])
+    })
+    graph = PreprocessorGraph(pack, _rpp_files(3))
+
+    # Models that read a model written by an affected model run again too
+    assert graph.get_affected({_model("base")}) == [0, 2]
+    assert graph.get_affected({_model("cube")}) == [1]
+    assert graph.get_affected({os.path.join("assets", "test", "lang", "en_us.json")}) == []
+
+    graph.run(logging.getLogger("test.preprocessor"), workers=4, models=[0, 2])
+    assert pack.read_json(_model("top"))["elements"][0]["from"] == [4, 0, 0]
+    assert not pack.isfile(_model("flipped"))
+    assert pack.isfile(os.path.join(RPP_MODELS, "1.rpp.json"))
+
+
+def test_models_read_before_being_written_cant_run_again(make_tree):
+    pack = make_tree({
+        _model("base"): {"parent": "test:block/cube"},
+        _model("cube"): {"elements": [ELEMENT]},
+        **_rpp_models([_translate("test:block/moved", "test:block/base", 1),
+                       _translate("test:block/cube", "test:block/cube", 4)])
+    })
+    graph = PreprocessorGraph(pack, _rpp_files(2))
+
+    # The pack only has the cube after it was moved, which the first model didn't see
+    assert graph.get_affected({_model("base")}) is None
+    # A changed file that a model writes was already replaced
+    assert graph.get_affected({_model("cube")}) is None
@@ -0,0 +1,26 @@
+from resource_pack_packer.util.regex import RegexCache
+
+
+def test_patterns_are_compiled_once():
+    cache = RegexCache()
+
+    assert cache.compile("a+") is cache.compile("a+")
+    assert cache.compile("a+", 2) is not cache.compile("a+")
+    assert (cache.compiles, cache.saved) == (2, 2)
+    assert str(cache) == "2 compiled, 2 compiles saved"
+
+    cache.reset_stats()
+    assert (cache.compiles, cache.saved) == (0, 0)
+
+
+def test_least_recently_used_is_dropped():
+    cache = RegexCache(max_size=2)
+    a = cache.compile("a")
+    cache.compile("b")
+    cache.compile("a")
+    cache.compile("c")
+
+    assert cache.compile("a") is a
+    assert cache.compiles == 3
+    cache.compile("b")
+    assert cache.compiles == 4
@@ -0,0 +1,51 @@
+import logging
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from resource_pack_packer.selectors import FileSelector, parse_minecraft_identifier
+
+MODELS = os.path.join("assets", "test", "models", "block")
+BLOCKSTATE = os.path.join("assets", "test", "blockstates", "cube.json")
+
+
+@pytest.mark.parametrize("identifier, expected", [
+    ("block/stone", os.path.join("assets", "minecraft", "models", "block", "stone.json")),
+    ("minecraft:block/stone", os.path.join("assets", "minecraft", "models", "block", "stone.json")),
+    ("my_mod:block/x", os.path.join("assets", "my_mod", "models", "block", "x.json")),
+    ("ns-1.2:block/x", os.path.join("assets", "ns-1.2", "models", "block", "x.json"))
+])
+def test_parse_identifier(identifier, expected):
+    assert parse_minecraft_identifier(identifier, "models", "json") == expected
+
+
+def _select(pack, selector: dict) -> list[str]:
+    files = FileSelector.parse(selector, pack).run(SimpleNamespace(block_files=None), logging.getLogger("test"))
+    return list(map(pack.relpath, files))
+
+
+def test_path_selector_is_reused_until_files_are_added(make_tree):
+    pack = make_tree({os.path.join(MODELS, "a.json"): {}})
+    selector = {"type": "path", "arguments": {"path": MODELS}}
+
+    assert _select(pack, selector) == [os.path.join(MODELS, "a.json")]
+    pack.write_json(os.path.join(MODELS, "a.json"), {"parent": "block/cube"})
+    assert _select(pack, selector) == [os.path.join(MODELS, "a.json")]
+    assert (pack.changes.hits, pack.changes.misses) == (1, 1)
+
+    pack.write_json(os.path.join(MODELS, "b.json"), {})
+    assert _select(pack, selector) == [os.path.join(MODELS, "a.json"), os.path.join(MODELS, "b.json")]
+
+
+def test_blockstate_selector_sees_rewritten_blockstate(make_tree):
+    pack = make_tree({
+        BLOCKSTATE: {"multipart": [{"apply": {"model": "test:block/a"}}]},
+        os.path.join(MODELS, "a.json"): {},
+        os.path.join(MODELS, "b.json"): {}
+    })
+    selector = {"type": "blockstate", "arguments": {"blockstate": "test:cube"}}
+
+    assert _select(pack, selector) == [os.path.join(MODELS, "a.json")]
+    pack.write_json(BLOCKSTATE, {"multipart": [{"apply": {"model": "test:block/b"}}]})
+    assert _select(pack, selector) == [os.path.join(MODELS, "b.json")]
@@ -0,0 +1,73 @@
+import json
+import os
+
+import pytest
+
+from resource_pack_packer.util.timing import StageTimer, save_trace
+
+FILES = {"a.json": b"{}", "b.json": b"[1]"}
+
+
+def test_stage_times_add_up():
+    timer = StageTimer()
+
+    for _ in range(2):
+        with timer.stage("copy"):
+            pass
+    with pytest.raises(ValueError):
+        with timer.stage("patches"):
+            raise ValueError()
+
+    assert list(timer.stages.keys()) == ["copy", "patches"]
+    assert all(map(lambda t: t >= 0, timer.stages.values()))
+
+
+def test_nested_stages_are_spans():
+    timer = StageTimer("config", 2)
+
+    with timer.stage("patches"):
+        with timer.stage("patch", file="base") as args:
+            args["mixins"] = 3
+
+    assert list(timer.stages.keys()) == ["patches"]
+    assert list(map(lambda s: (s["name"], s["cat"], s["pid"]), timer.spans)) == \
+        [("patch", "substage", 2), ("patches", "stage", 2)]
+    assert timer.spans[0]["args"] == {"file": "base", "mixins": 3}
+
+
+def test_stage_counts_io(make_tree):
+    pack = make_tree(FILES)
+    timer = StageTimer()
+
+    with timer.stage("rewrite", pack):
+        for file in FILES:
+            pack.write_bytes(file, pack.read_bytes(file) * 2)
+        pack.remove("a.json")
+
+    assert timer.spans[0]["args"] == {"files_read": 2, "bytes_read": 5, "files_written": 2, "bytes_written": 10,
+                                      "files_removed": 1}
+
+
+def test_save_trace(tmp_path):
+    timers = [StageTimer("shared", 0), StageTimer("config", 1)]
+    for timer in timers:
+        with timer.stage("copy"):
+            pass
+
+    src = os.path.join(tmp_path, "traces", "trace.json")
+    save_trace(src, timers)
+
+    with open(src, "r", encoding="utf-8") as file:
+        events = json.load(file)["traceEvents"]
+    assert list(map(lambda e: (e["ph"], e["pid"]), events)) == [("M", 0), ("X", 0), ("M", 1), ("X", 1)]
+    assert events[2]["args"]["name"] == "config"
+
+
+def test_profile_top_level_stages(tmp_path):
+    timer = StageTimer(profile_dir=os.path.join(tmp_path, "profile"))
+
+    with timer.stage("patches"):
+        with timer.stage("patch"):
+            pass
+
+    assert os.listdir(os.path.join(tmp_path, "profile")) == ["patches.prof"]
@@ -0,0 +1,280 @@
+import json
+import os
+import re
+import zipfile
+from glob import glob
+
+import pytest
+
+from resource_pack_packer.tree import ChangeLog, DiskTree, MemoryTree, PackIndex, PackTree
+
+MODEL = os.path.join("assets", "test", "models", "block", "stone.json")
+TEXTURE = os.path.join("assets", "test", "textures", "block", "stone.png")
+FILES = {
+    "pack.mcmeta": {"pack": {"pack_format": 15, "description": ""}},
+    MODEL: {"parent": "block/cube_all", "textures": {"all": "test:block/stone"}},
+    TEXTURE: b"stone",
+    os.path.join("assets", "test", ".hidden.json"): {}
+}
+
+
+def test_pack_tree_is_abstract():
+    with pytest.raises(TypeError):
+        PackTree("pack")
+
+    class IncompleteTree(PackTree):
+        def isfile(self, path: str) -> bool:
+            return False
+
+    with pytest.raises(TypeError):
+        IncompleteTree("pack")
+
+
+def test_paths(make_tree):
+    pack = make_tree(FILES)
+
+    assert pack.relpath(os.path.join(pack.root, MODEL)) == MODEL
+    assert pack.abspath(MODEL) == os.path.join(pack.root, MODEL)
+    assert pack.isfile(MODEL)
+    assert pack.isdir(os.path.join("assets", "test"))
+    assert not pack.exists(os.path.join("assets", "other"))
+    assert sorted(pack.files()) == sorted(["pack.mcmeta", MODEL, TEXTURE])
+
+
+@pytest.mark.parametrize("pattern, recursive", [
+    (os.path.join("assets", "*"), False),
+    (os.path.join("assets", "*", "models", "**", "*.json"), True),
+    (os.path.join("assets", "**"), True),
+    (os.path.join("assets", "**", "*.png"), False),
+    ("*.mcmeta", False)
+])
+def test_glob_matches_disk(make_tree, pattern, recursive):
+    pack = make_tree(FILES)
+    # Globbing the source pack is the expected result
+    src = pack.source_dir if isinstance(pack, MemoryTree) else pack.root
+    expected = map(lambda f: os.path.join(pack.root, os.path.relpath(f, src)),
+                   glob(os.path.join(src, pattern), recursive=recursive))
+
+    assert sorted(map(os.path.normpath, pack.glob(pattern, recursive))) == sorted(expected)
+
+
+def test_read_and_write(make_tree):
+    pack = make_tree(FILES)
+
+    assert pack.read_json(MODEL) == FILES[MODEL]
+    assert pack.read_bytes(TEXTURE) == b"stone"
+
+    pack.write_json(MODEL, {"parent": "block/cube"})
+    pack.write_bytes(TEXTURE, b"changed")
+    assert pack.read_json(os.path.join(pack.root, MODEL)) == {"parent": "block/cube"}
+    assert pack.read_bytes(TEXTURE) == b"changed"
+
+
+def test_remove(make_tree):
+    pack = make_tree(FILES)
+    pack.remove(TEXTURE)
+    assert not pack.exists(TEXTURE)
+
+    pack.rmtree(os.path.join("assets", "test", "models"))
+    assert not pack.exists(os.path.join("assets", "test", "models"))
+    assert pack.files() == ["pack.mcmeta"]
+
+
+def test_memory_tree_only_writes_on_save(make_pack, tmp_path):
+    src = make_pack(FILES)
+    pack = MemoryTree.load(src, os.path.join(tmp_path, "pack"))
+    pack.write_json(MODEL, {})
+
+    assert pack.is_unmodified(TEXTURE)
+    assert not pack.is_unmodified(MODEL)
+    assert not os.path.exists(pack.root)
+
+    pack.save()
+    with open(os.path.join(pack.root, MODEL), "rb") as file:
+        assert file.read() == b"{}"
+    with open(os.path.join(src, MODEL), "rb") as file:
+        assert file.read() != b"{}"
+
+
+def test_memory_tree_write_zip(make_pack, tmp_path):
+    pack = MemoryTree.load(make_pack(FILES), os.path.join(tmp_path, "pack"))
+    pack.write_bytes(TEXTURE, b"changed")
+    dest = os.path.join(tmp_path, "pack.zip")
+    pack.write_zip(dest)
+
+    with zipfile.ZipFile(dest) as zip_file:
+        assert sorted(zip_file.namelist()) == sorted(map(lambda f: f.replace(os.sep, "/"), pack.files()))
+        assert zip_file.read(TEXTURE.replace(os.sep, "/")) == b"changed"
+
+
+def test_json_is_parsed_once(make_tree):
+    pack = make_tree(FILES)
+
+    assert pack.read_json(MODEL) is pack.read_json(os.path.join(pack.root, MODEL))
+    assert pack.get_cached_json(TEXTURE) is None
+    assert (pack.json_stats.hits, pack.json_stats.misses) == (1, 1)
+
+
+def test_json_is_written_on_flush(make_tree):
+    pack = make_tree(FILES)
+    data = pack.read_json(MODEL)
+    data["parent"] = "block/cube"
+
+    for _ in range(3):
+        pack.write_json(MODEL, data, indent="\t")
+    new_model = os.path.join("assets", "test", "models", "block", "new.json")
+    pack.write_json(new_model, {})
+
+    # Dirty documents are read back before they're flushed
+    assert pack.read_bytes(MODEL) == json.dumps(data, indent="\t").encode("utf-8")
+    assert new_model in pack.files()
+
+    pack.flush()
+    assert pack.json_stats.writes == 2
+    assert pack.read_json(MODEL) is data
+
+    pack.write_bytes(MODEL, b"{}")
+    assert pack.read_json(MODEL) == {}
+
+
+def test_deterministic_zip(make_pack, tmp_path):
+    zips = []
+
+    for name, added in (("first", ["a.txt", "z.txt"]), ("second", ["z.txt", "a.txt"])):
+        pack = MemoryTree.load(make_pack(FILES, name), os.path.join(tmp_path, "pack"))
+        # The order files were added in doesn't matter
+        for file in added:
+            pack.write_bytes(os.path.join("assets", file), b"added")
+        os.utime(os.path.join(pack.source_dir, TEXTURE), (0, 1000000000 * len(zips) + 315532800))
+        dest = os.path.join(tmp_path, f"{name}.zip")
+        pack.write_zip(dest, deterministic=True)
+        zips.append(dest)
+
+    with open(zips[0], "rb") as first, open(zips[1], "rb") as second:
+        assert first.read() == second.read()
+
+    with zipfile.ZipFile(zips[0]) as zip_file:
+        assert zip_file.namelist() == sorted(zip_file.namelist())
+
+
+def test_fork(make_tree, tmp_path):
+    pack = make_tree(FILES)
+    pack.write_json(MODEL, {"parent": "block/cube"})
+    fork = pack.fork(os.path.join(tmp_path, "fork"))
+
+    # Unflushed changes are part of the fork
+    assert fork.read_json(MODEL) == {"parent": "block/cube"}
+
+    fork.write_bytes(TEXTURE, b"fork")
+    fork.remove(MODEL)
+    fork.flush()
+    assert pack.read_bytes(TEXTURE) == b"stone"
+    assert pack.read_json(MODEL) == {"parent": "block/cube"}
+    assert sorted(fork.files()) == sorted(["pack.mcmeta", TEXTURE])
+
+
+def test_index_follows_changes(make_tree):
+    pack = make_tree(FILES)
+    new_file = os.path.join("assets", "test", "models", "block", "new.json")
+    pack.write_bytes(new_file, b"{}")
+
+    assert pack.glob(os.path.join("assets", "*", "models", "*", "n*.json")) == [pack.abspath(new_file)]
+
+    pack.remove(new_file)
+    assert not pack.isfile(new_file)
+    assert pack.glob(os.path.join("assets", "*", "models", "*", "n*.json")) == []
+
+    pack.rmtree(os.path.join("assets", "test"))
+    assert sorted(pack.files()) == ["pack.mcmeta"]
+    assert not pack.isdir(os.path.join("assets", "test", "models"))
+
+
+def test_index_glob_regex(make_tree):
+    pack = make_tree(FILES)
+    regex = re.compile(r"models/.*\.json")
+    matches = pack.glob(os.path.join("assets", "test", "**"), recursive=True, regex=regex)
+
+    assert matches == [pack.abspath(MODEL)]
+
+
+def test_index_folders_dont_match_siblings():
+    index = PackIndex(["a/x.json", "a-b/y.json", "a0/z.json", "ab/w.json"])
+
+    assert index.under("a") == ["a/x.json"]
+    assert index.remove_folder("a") == 1
+    assert index.files() == ["a-b/y.json", "a0/z.json", "ab/w.json"]
+
+
+def test_disk_tree_uses_known_files(make_pack):
+    root = make_pack(FILES)
+    pack = DiskTree(root, [MODEL])
+
+    assert pack.files() == [MODEL]
+    assert not pack.isfile(TEXTURE)
+
+
+def test_change_log():
+    changes = ChangeLog()
+    changes.record("a.json", True)
+    changes.set_result("key", ("a.json",), ["a.json"])
+
+    assert changes.get_result("key") == ("a.json",)
+    changes.record("b.json")
+    assert changes.get_result("key") == ("a.json",)
+    changes.record("a.json")
+    assert changes.get_result("key") is None
+    assert str(changes) == "2 hits, 1 misses"
+
+    changes.set_result("key", ("a.json",), [])
+    copied = changes.copy()
+    copied.record("c.json", True)
+    assert copied.get_result("key") is None
+    assert changes.get_result("key") == ("a.json",)
+
+
+def test_fork_keeps_change_log(make_tree, tmp_path):
+    pack = make_tree(FILES)
+    pack.changes.set_result("key", (), [])
+    fork = pack.fork(os.path.join(tmp_path, "fork"))
+
+    assert fork.changes.get_result("key") == ()
+
+
+def test_remove_empty_folders(make_tree):
+    # Built packs don't have hidden files
+    pack = make_tree({MODEL: {}, TEXTURE: b""})
+    assert pack.isdir(os.path.join("assets", "test", "models", "block"))
+    pack.remove(MODEL)
+
+    assert pack.remove_empty_folders() == 2
+    assert not pack.exists(os.path.join("assets", "test", "models"))
+    assert pack.isdir(os.path.join("assets", "test", "textures", "block"))
+    assert not os.path.isdir(os.path.join(pack.root, "assets", "test", "models"))
+    assert pack.remove_empty_folders() == 0
+
+
+def test_empty_folders_are_deepest_first():
+    index = PackIndex(["a/b/x.json"], ["a/c", "a/c/d", "e"])
+
+    assert index.get_empty_folders() == ["e", "a/c/d", "a/c"]
+
+
+def test_fork_excludes_files(make_tree, tmp_path):
+    pack = make_tree(FILES)
+    pack.changes.set_result("key", (), [])
+    fork = pack.fork(os.path.join(tmp_path, "fork"), exclude=lambda f: f == TEXTURE)
+
+    assert sorted(fork.files()) == sorted(["pack.mcmeta", MODEL])
+    assert not os.path.exists(fork.abspath(TEXTURE))
+    # Saved results might include the excluded files
+    assert fork.changes.get_result("key") is None
+    assert pack.isfile(TEXTURE)
+
+
+def test_get_size(make_tree):
+    pack = make_tree(FILES)
+    assert pack.get_size(TEXTURE) == len(b"stone")
+
+    # Json that hasn't been flushed yet is counted as it will be written
+    pack.write_json(MODEL, {"a": 1}, indent=None)
+    assert pack.get_size(MODEL) == len(b'{"a": 1}')
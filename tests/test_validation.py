@@ -0,0 +1,159 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from resource_pack_packer.tree import DiskTree
+from resource_pack_packer.validation import MIN_CHUNK_SIZE, AssetIndex, AssetType, ValidationCache, get_validator, \
+    validate, validate_assets
+
+MODELS = os.path.join("assets", "test", "models", "block")
+TEXTURES = os.path.join("assets", "test", "textures", "block")
+
+
+class _MessageHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord):
+        self.messages.append(record.getMessage())
+
+
+def _models(count: int) -> dict:
+    # Every third model doesn't match the schema
+    files = {}
+    for i in range(count):
+        files[os.path.join(MODELS, f"{i:03}.json")] = {"elements": "x"} if i % 3 == 0 else {"parent": "block/cube"}
+    return files
+
+
+def _validate(pack, asset_type: AssetType = AssetType.MODEL, **kwargs) -> list[str]:
+    logger = logging.getLogger("test.validation")
+    handler = _MessageHandler()
+    logger.addHandler(handler)
+
+    try:
+        validate_assets(pack, os.path.join("assets", "*"), asset_type, "json", logger, **kwargs)
+    finally:
+        logger.removeHandler(handler)
+    return handler.messages
+
+
+def _validate_in_worker(root: str) -> list[str]:
+    return _validate(DiskTree(root), workers=2)
+
+
+def test_validator_is_compiled_once():
+    assert get_validator(AssetType.MODEL) is get_validator(AssetType.MODEL)
+
+
+def test_schema_and_missing_texture_warnings(make_tree):
+    pack = make_tree({
+        os.path.join(MODELS, "invalid.json"): {"parent": 5},
+        os.path.join(MODELS, "missing.json"): {"elements": [{"from": [0, 0, 0], "to": [16, 16, 16],
+                                                             "faces": {"up": {"texture": "#missing"}}}]},
+        os.path.join(MODELS, "valid.json"): {"parent": "block/cube"}
+    })
+    warnings = _validate(pack)
+
+    assert len(warnings) == 2
+    assert warnings[0].startswith(f"{os.path.join(MODELS, 'invalid.json')} didn't match schema:")
+    assert warnings[1] == f"Missing texture in: {os.path.join(MODELS, 'missing.json')}"
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_chunks_keep_file_order(make_tree, workers):
+    pack = make_tree(_models(MIN_CHUNK_SIZE * 2 + 10))
+    warnings = _validate(pack, workers=workers)
+
+    expected = map(lambda i: os.path.join(MODELS, f"{i:03}.json"), range(0, MIN_CHUNK_SIZE * 2 + 10, 3))
+    assert list(map(lambda w: w.split(" ")[0], warnings)) == list(expected)
+
+
+def test_missing_references(make_tree):
+    pack = make_tree({
+        os.path.join(MODELS, "cube.json"): {"parent": "test:block/nope",
+                                            "textures": {"all": "test:block/cube", "side": "test:block/missing"}},
+        os.path.join(TEXTURES, "cube.png"): b""
+    })
+    warnings = _validate(pack, index=AssetIndex.create(pack))
+
+    assert warnings == [f"Missing parent model test:block/nope in: {os.path.join(MODELS, 'cube.json')}",
+                        f"Missing texture test:block/missing in: {os.path.join(MODELS, 'cube.json')}"]
+
+
+def test_missing_blockstate_models(make_tree):
+    blockstate = os.path.join("assets", "test", "blockstates", "cube.json")
+    pack = make_tree({
+        # Blockstates before 1.13 load models from the block folder
+        blockstate: {"multipart": [{"apply": {"model": "test:block/cube"}},
+                                   {"apply": [{"model": "test:cube"}, {"model": "test:block/nope"}]}]},
+        os.path.join(MODELS, "cube.json"): {}
+    })
+    warnings = _validate(pack, AssetType.BLOCKSTATE, index=AssetIndex.create(pack))
+
+    assert warnings == [f"Missing model test:block/nope in: {blockstate}"]
+
+
+def test_deleted_textures_are_not_missing(make_tree):
+    pack = make_tree({os.path.join(MODELS, "cube.json"): {"textures": {"all": "test:block/cube"}}})
+    index = AssetIndex.create(pack, deleted=lambda f: f.split(os.sep)[2] == "textures")
+
+    assert _validate(pack, index=index) == []
+
+
+@pytest.mark.parametrize("parent", ["builtin/generated", "minecraft:builtin/generated", "minecraft:builtin/entity"])
+def test_builtin_parents_are_not_missing(make_tree, parent):
+    pack = make_tree({os.path.join(MODELS, "item.json"): {"parent": parent}})
+    # The game's assets are known, but built in models have no files
+    index = AssetIndex(set(pack.files()), {"minecraft", "test"})
+
+    assert _validate(pack, index=index) == []
+
+
+def test_validation_pool_inside_config_process(make_pack):
+    # Configs are built in these processes, which have to be able to start their own pool
+    root = make_pack(_models(MIN_CHUNK_SIZE * 2 + 10))
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        warnings = executor.submit(_validate_in_worker, root).result()
+    assert len(warnings) == len(range(0, MIN_CHUNK_SIZE * 2 + 10, 3))
+
+
+def test_cache_skips_unchanged_files(make_tree, tmp_path):
+    pack = make_tree(_models(9))
+    src = os.path.join(tmp_path, "config.json")
+    cache = ValidationCache()
+    warnings = _validate(pack, cache=cache)
+    assert cache.hits == 0
+    cache.save(src)
+
+    pack.write_json(os.path.join(MODELS, "001.json"), {"elements": "x"})
+    cache = ValidationCache.load(src)
+    cached_warnings = _validate(pack, cache=cache)
+
+    assert cache.hits == 8
+    assert cached_warnings[0] == warnings[0]
+    assert len(cached_warnings) == len(warnings) + 1
+
+
+def test_cache_is_saved(make_tree, tmp_path):
+    pack = make_tree(_models(3))
+    src = os.path.join(tmp_path, "cache", "config.json")
+    validate(pack, "test", src)
+    assert ValidationCache.load(src).results.keys() == set(map(pack.abspath, _models(3).keys()))
+
+    # Files that are gone aren't kept
+    pack.remove(os.path.join(MODELS, "000.json"))
+    validate(pack, "test", src)
+    assert len(ValidationCache.load(src).results) == 2
+
+
+def test_invalid_cache_is_ignored(tmp_path, write_files):
+    src = os.path.join(tmp_path, "config.json")
+    assert ValidationCache.load(src).results == {}
+
+    write_files(tmp_path, {"config.json": {"version": -1, "results": {"a.json": {"key": "", "warnings": []}}}})
+    assert ValidationCache.load(src).results == {}
@@ -0,0 +1,39 @@
+import logging
+import os
+
+import pytest
+
+from resource_pack_packer.util.watch import FileWatcher, PollingWatcher, create_watcher
+
+
+@pytest.fixture
+def watched_dir(tmp_path):
+    os.makedirs(os.path.join(tmp_path, ".git"))
+    os.makedirs(os.path.join(tmp_path, "assets"))
+    return str(tmp_path)
+
+
+def _write(directory: str, name: str):
+    with open(os.path.join(directory, name), "wb") as file:
+        file.write(b"{}")
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_hidden_files_are_ignored(watched_dir, polling):
+    if polling:
+        watcher = PollingWatcher([watched_dir], 0.05)
+    else:
+        watcher = create_watcher([watched_dir], logging.getLogger("test.watch"))
+
+    with watcher:
+        _write(watched_dir, ".pack.mcmeta.swp")
+        _write(watched_dir, os.path.join(".git", "index"))
+        assert watcher._poll(0.2) == set()
+
+        _write(watched_dir, os.path.join("assets", "pack.json"))
+        assert os.path.join(watched_dir, "assets", "pack.json") in watcher.wait(0.1)
+
+
+def test_watcher_is_abstract(watched_dir):
+    with pytest.raises(TypeError):
+        FileWatcher([watched_dir])